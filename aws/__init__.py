@@ -2,7 +2,27 @@
 """
 AWS Fargate deployment package.
 """
-from .deploy import deploy_to_fargate
-from .config import load_config
+import importlib
 
-__all__ = ['deploy_to_fargate', 'load_config']
+# Public names -> the submodule defining them. They are imported on first use, so
+# running a submodule such as aws.fix_cloudfront doesn't load deploy (and boto3)
+_EXPORTS = {
+    'deploy_to_fargate': 'deploy',
+    'load_config': 'config',
+    'ConfigError': 'config',
+    'get_session': 'clients',
+    'make_client': 'clients',
+    'get_client': 'clients',
+    'get_account_id': 'clients',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
@@ -1,89 +1,340 @@
 #!/usr/bin/env python3
 """
 AWS Certificate Manager (ACM) certificate management.
+Pass clients from aws.clients.get_client so lookups share one session and
+connection pool.
 """
 import sys
 import time
+import itertools
+import threading
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from . import utils
 
 
-def find_certificate(acm_client, domain, region):
+# Maximum number of concurrent describe_certificate calls when indexing certificates
+DESCRIBE_WORKERS = 16
+
+# Seconds between describe_certificate calls while waiting for validation
+VALIDATION_POLL_INTERVAL = 10
+
+# Certificates in these states can be used (or will be usable once validated)
+CERTIFICATE_STATUSES = ['ISSUED', 'PENDING_VALIDATION']
+# list_certificates only returns RSA_2048 certificates unless key types are given
+CERTIFICATE_KEY_TYPES = [
+    'RSA_1024', 'RSA_2048', 'RSA_3072', 'RSA_4096',
+    'EC_prime256v1', 'EC_secp384r1', 'EC_secp521r1'
+]
+
+# find_certificate results cached per (region, domain) -> (timestamp, cert ARN or None)
+_CERT_CACHE = {}
+# Certificate indexes cached per region -> (timestamp, index) from build_certificate_index
+_INDEX_CACHE = {}
+_CERT_TTL = 300  # Seconds to keep an index, or remember that no certificate exists
+_CERT_TTL_FOUND = 3600  # Seconds to remember a found certificate
+
+# Found certificates are also remembered between runs in this cache file,
+# keyed "account/region/domain" -> {'arn': cert ARN, 'ts': timestamp}
+CERT_DISK_CACHE = 'acm.json'
+_CERT_TTL_DISK = 86400  # Each hit is re-checked with one describe_certificate
+_disk_lock = threading.Lock()
+
+# Lookups currently running, so concurrent callers share one result -> Future
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def _parse_domain(domain):
+    """
+    Split a domain into (is_subdomain, parent, wildcard).
+    test.example.com -> (True, 'example.com', '*.example.com');
+    apex domains like example.com -> (False, None, None).
+    """
+    parts = domain.split('.')
+    if len(parts) <= 2:
+        return False, None, None
+    parent = '.'.join(parts[1:])
+    return True, parent, '*.' + parent
+
+
+def _invalidate_cert_cache(region=None, domain=None):
+    """
+    Drop cached find_certificate results.
+    With no arguments the whole cache is cleared.
+    """
+    if region is None and domain is None:
+        _CERT_CACHE.clear()
+        _INDEX_CACHE.clear()
+        return
+    _CERT_CACHE.pop((region, domain), None)
+
+
+def _single_flight(key, fn):
+    """
+    Run fn() once per key at a time; concurrent callers with the same key
+    wait for the running call and get its result (or exception).
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+    if not owner:
+        return future.result()
+    
+    try:
+        result = fn()
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def find_certificate(acm_client, domain, region, account_id=None):
     """
     Find an existing ACM certificate for the domain.
     Checks for both exact matches and wildcard certificates.
     Returns the certificate ARN if found, None otherwise.
+    Results are cached in-process so repeated lookups don't hit ACM again, and
+    found certificates are cached on disk (per account_id, when given) for later runs.
     """
-    # ACM certificates are region-specific
-    # For CloudFront, certificates must be in us-east-1
-    # For ALB, certificates can be in any region
+    key = (region, domain)
+    cached = _CERT_CACHE.get(key)
+    if cached:
+        cached_at, cert_arn = cached
+        ttl = _CERT_TTL_FOUND if cert_arn else _CERT_TTL
+        if time.time() - cached_at < ttl:
+            return cert_arn
     
-    # Determine if this is a subdomain and what the wildcard would be
-    parts = domain.split('.')
-    is_subdomain = len(parts) > 2
-    wildcard_domain = None
-    if is_subdomain:
-        # For sub.example.com, wildcard would be *.example.com
-        wildcard_domain = '*.' + '.'.join(parts[1:])
-        parent_domain = '.'.join(parts[1:])
-    else:
-        parent_domain = domain
+    return _single_flight(
+        ('find', region, domain),
+        lambda: _find_certificate_uncached(acm_client, domain, region, account_id)
+    )
+
+
+def _find_certificate_uncached(acm_client, domain, region, account_id=None):
+    """
+    Look the domain up in the disk cache, then in the region's certificate index,
+    and cache the result.
+    """
+    disk_key = f"{account_id or ''}/{region}/{domain}"
+    cert_arn = _load_disk_certificate(acm_client, disk_key)
+    if cert_arn:
+        print(f"Found existing certificate (cached): {cert_arn}")
+        _CERT_CACHE[(region, domain)] = (time.time(), cert_arn)
+        return cert_arn
     
+    # ACM certificates are region-specific, so the index is per region
+    # (CloudFront certificates must be in us-east-1, ALB certificates can be anywhere)
     try:
-        paginator = acm_client.get_paginator('list_certificates')
-        for page in paginator.paginate():
-            for cert_summary in page.get('CertificateSummaryList', []):
-                cert_arn = cert_summary['CertificateArn']
-                
-                # Get certificate details to check domain
-                try:
-                    cert_details = acm_client.describe_certificate(CertificateArn=cert_arn)
-                    cert = cert_details['Certificate']
-                    
-                    # Check certificate status first
-                    status = cert.get('Status', '')
-                    if status not in ['ISSUED', 'PENDING_VALIDATION']:
-                        continue
-                    
-                    # Get all domain names covered by this certificate
-                    cert_domain = cert.get('DomainName', '')
-                    domain_names = cert.get('SubjectAlternativeNames', [])
-                    all_domains = [cert_domain] + domain_names
-                    
-                    # Check for exact match
-                    if domain in all_domains:
-                        print(f"Found existing certificate (exact match): {cert_arn} (Status: {status})")
-                        return cert_arn
-                    
-                    # Check for wildcard match
-                    for cert_domain_name in all_domains:
-                        if cert_domain_name.startswith('*.'):
-                            # Extract the base domain from wildcard (e.g., *.example.com -> example.com)
-                            cert_base = cert_domain_name[2:]  # Remove '*.'
-                            if domain.endswith('.' + cert_base) or domain == cert_base:
-                                print(f"Found existing wildcard certificate: {cert_arn} (covers {domain}, Status: {status})")
-                                return cert_arn
-                    
-                    # Check if this is a wildcard certificate that would cover our domain
-                    if wildcard_domain and wildcard_domain in all_domains:
-                        print(f"Found existing wildcard certificate: {cert_arn} (covers {domain}, Status: {status})")
-                        return cert_arn
-                        
-                except Exception as e:
-                    print(f"Note: Could not describe certificate {cert_arn}: {e}")
-                    continue
+        index = _get_certificate_index(acm_client, region, domain)
+        # A cached index may have stopped listing early for another domain
+        fill_certificate_index(index, domain)
     except Exception as e:
         print(f"Note: Error listing certificates: {e}")
+        # A listing that failed part-way can't be resumed
+        _INDEX_CACHE.pop(region, None)
+        return None
+    
+    cert_arn = _lookup_certificate(index, domain)
+    if cert_arn is None and index[2]:
+        # Only pay for describe calls when the summaries alone don't cover the domain
+        _single_flight(('expand', region), lambda: expand_certificate_index(acm_client, index))
+        cert_arn = _lookup_certificate(index, domain)
+    _CERT_CACHE[(region, domain)] = (time.time(), cert_arn)
+    if cert_arn:
+        _save_disk_certificate(disk_key, cert_arn)
+    return cert_arn
+
+
+def _load_disk_certificate(acm_client, disk_key):
+    """
+    Return the certificate ARN cached on disk for the key, if it is recent and
+    the certificate is still usable; stale or invalid entries are dropped.
+    """
+    entry = utils.load_json_cache(CERT_DISK_CACHE).get(disk_key)
+    if not entry:
+        return None
     
+    if time.time() - entry.get('ts', 0) < _CERT_TTL_DISK:
+        try:
+            cert = acm_client.describe_certificate(CertificateArn=entry['arn'])['Certificate']
+            if cert.get('Status') in CERTIFICATE_STATUSES:
+                return entry['arn']
+        except Exception:
+            pass  # Deleted, or not visible with these credentials
+    
+    with _disk_lock:
+        entries = utils.load_json_cache(CERT_DISK_CACHE)
+        entries.pop(disk_key, None)
+        utils.save_json_cache(CERT_DISK_CACHE, entries)
     return None
 
 
-def request_certificate(acm_client, domain, region, allow_create=False):
+def _save_disk_certificate(disk_key, cert_arn):
+    """
+    Remember a found certificate on disk for later runs.
+    """
+    with _disk_lock:
+        entries = utils.load_json_cache(CERT_DISK_CACHE)
+        entries[disk_key] = {'arn': cert_arn, 'ts': time.time()}
+        utils.save_json_cache(CERT_DISK_CACHE, entries)
+
+
+def build_certificate_index(acm_client, stop_at=None):
+    """
+    Build an index of the usable (issued or pending) certificates in the account.
+    Returns (exact, wild, truncated, state): exact maps every literal DomainName/SAN
+    to the certificate ARN, wild maps the base of every '*.example.com' entry
+    ('example.com') to the certificate ARN, and truncated lists certificates whose
+    summary didn't include all of their SANs (see expand_certificate_index).
+    If stop_at is given, listing stops at the first issued certificate for exactly
+    that domain; state then holds the unread summaries for fill_certificate_index.
+    """
+    state = {'summaries': _iter_cert_summaries(acm_client), 'issued': set(), 'lock': threading.Lock()}
+    index = ({}, {}, [], state)
+    fill_certificate_index(index, stop_at)
+    return index
+
+
+def fill_certificate_index(index, stop_at=None):
+    """
+    Read the rest of a partially built index's listing, or only up to the first
+    issued certificate for exactly stop_at. Does nothing once the index is complete.
+    """
+    state = index[3]
+    with state['lock']:
+        if state['summaries'] is None or stop_at in state['issued']:
+            return
+        for cert_summary in state['summaries']:
+            cert_arn = cert_summary['CertificateArn']
+            names = itertools.chain((cert_summary.get('DomainName', ''),), cert_summary.get('SubjectAlternativeNameSummaries', []))
+            _index_names(index, cert_arn, cert_summary['Status'], names)
+            # Describing certificates whose SAN list was cut short waits until a lookup misses
+            if cert_summary.get('HasAdditionalSubjectAlternativeNames'):
+                index[2].append(cert_arn)
+            # An issued exact match is the best possible answer, so stop paging
+            if stop_at in state['issued']:
+                return
+        state['summaries'] = None
+
+
+def _iter_cert_summaries(acm_client):
+    """
+    Yield the summaries of usable certificates one at a time, page by page.
+    """
+    # The summaries already carry the domain names and status, so filter server-side
+    paginator = acm_client.get_paginator('list_certificates')
+    pages = paginator.paginate(
+        CertificateStatuses=CERTIFICATE_STATUSES,
+        Includes={'keyTypes': CERTIFICATE_KEY_TYPES},
+        PaginationConfig={'PageSize': 100}
+    )
+    for page in pages:
+        for cert_summary in page.get('CertificateSummaryList', []):
+            if cert_summary.get('Status', '') in CERTIFICATE_STATUSES:
+                yield cert_summary
+
+
+def expand_certificate_index(acm_client, index):
+    """
+    Describe the truncated certificates in an index and add their full SAN lists.
+    """
+    exact, wild, truncated, _ = index
+    if not truncated:
+        return
+    
+    # Describe calls are bound by API round-trips, not CPU, so fan them out
+    with ThreadPoolExecutor(max_workers=min(DESCRIBE_WORKERS, len(truncated))) as executor:
+        futures = {
+            executor.submit(acm_client.describe_certificate, CertificateArn=cert_arn): cert_arn
+            for cert_arn in truncated
+        }
+        for future in as_completed(futures):
+            cert_arn = futures[future]
+            try:
+                cert = future.result()['Certificate']
+            except Exception as e:
+                print(f"Note: Could not describe certificate {cert_arn}: {e}")
+                continue
+            _index_names(index, cert_arn, cert.get('Status', ''), cert.get('SubjectAlternativeNames', []))
+    del truncated[:]
+
+
+def _index_names(index, cert_arn, status, names):
+    """
+    Add a certificate's domain names to an index from build_certificate_index.
+    """
+    exact, wild, _, state = index
+    for name in names:
+        if name.startswith('*.'):
+            target, name = wild, name[2:]
+        else:
+            target = exact
+            if status == 'ISSUED':
+                state['issued'].add(name)
+        # Prefer issued certificates when several cover the same name
+        if name not in target or status == 'ISSUED':
+            target[name] = cert_arn
+
+
+def _get_certificate_index(acm_client, region, stop_at=None):
+    """
+    Return the certificate index for the region, rebuilding it once the cached one expires.
+    A new index is only listed up to stop_at (see build_certificate_index).
+    """
+    cached = _INDEX_CACHE.get(region)
+    if cached and time.time() - cached[0] < _CERT_TTL:
+        return cached[1]
+    
+    def build():
+        index = build_certificate_index(acm_client, stop_at)
+        _INDEX_CACHE[region] = (time.time(), index)
+        return index
+    
+    # Lookups for different domains in the same region share one listing
+    return _single_flight(('index', region), build)
+
+
+def _lookup_certificate(index, domain):
+    """
+    Find the certificate covering the domain in a certificate index.
+    Checks for an exact match first, then wildcards on each parent domain
+    (sub.example.com -> *.example.com -> *.com).
+    """
+    exact, wild, _, _ = index
+    cert_arn = exact.get(domain)
+    if cert_arn:
+        print(f"Found existing certificate (exact match): {cert_arn}")
+        return cert_arn
+    
+    suffix = domain
+    while '.' in suffix:
+        suffix = suffix.split('.', 1)[1]
+        cert_arn = wild.get(suffix)
+        if cert_arn:
+            print(f"Found existing wildcard certificate: {cert_arn} (covers {domain})")
+            return cert_arn
+    
+    return None
+
+
+def request_certificate(acm_client, domain, region, allow_create=False, account_id=None):
     """
     Request an ACM certificate for the domain.
     For subdomains, requests a wildcard certificate (*.example.com) to cover all subdomains.
     Returns the certificate ARN.
     """
     # Check if certificate already exists
-    existing_cert = find_certificate(acm_client, domain, region)
+    existing_cert = find_certificate(acm_client, domain, region, account_id)
     if existing_cert:
         return existing_cert
     
@@ -92,15 +343,11 @@ def request_certificate(acm_client, domain, region, allow_create=False):
         sys.exit(1)
     
     # Determine if this is a subdomain and request wildcard certificate
-    parts = domain.split('.')
-    is_subdomain = len(parts) > 2
+    is_subdomain, parent_domain, wildcard_domain = _parse_domain(domain)
     
     if is_subdomain:
         # For subdomains, request wildcard certificate for parent domain
         # e.g., test.example.com -> *.example.com
-        parent_domain = '.'.join(parts[1:])
-        wildcard_domain = '*.' + parent_domain
-        
         print(f"Subdomain detected: {domain}")
         print(f"Requesting wildcard certificate: {wildcard_domain} (covers all {parent_domain} subdomains)")
         
@@ -114,6 +361,9 @@ def request_certificate(acm_client, domain, region, allow_create=False):
             )
             
             cert_arn = response['CertificateArn']
+            # The new certificate may cover domains we previously cached as missing
+            _invalidate_cert_cache()
+            _CERT_CACHE[(region, domain)] = (time.time(), cert_arn)
             print(f"Wildcard certificate requested: {cert_arn}")
             print(f"This certificate will cover {domain} and all other {parent_domain} subdomains")
             print("Certificate is pending validation. DNS records will be created for validation.")
@@ -136,6 +386,8 @@ def request_certificate(acm_client, domain, region, allow_create=False):
             )
             
             cert_arn = response['CertificateArn']
+            _invalidate_cert_cache()
+            _CERT_CACHE[(region, domain)] = (time.time(), cert_arn)
             print(f"Certificate requested: {cert_arn}")
             print("Certificate is pending validation. DNS records will be created for validation.")
             
@@ -176,37 +428,39 @@ def get_certificate_validation_records(acm_client, cert_arn):
         return []
 
 
-def wait_for_certificate_validation(acm_client, cert_arn, timeout_minutes=30):
+def wait_for_certificate_validation(acm_client, cert_arn, timeout_minutes=30, cancel_event=None):
     """
     Wait for certificate to be validated and issued.
-    Returns True if validated, False if timeout.
+    Returns True if validated, False if validation failed, timed out or
+    cancel_event (a threading.Event) was set.
     """
     print(f"Waiting for certificate validation (up to {timeout_minutes} minutes)...")
-    start_time = time.time()
-    timeout_seconds = timeout_minutes * 60
-    
-    while time.time() - start_time < timeout_seconds:
+    deadline = time.monotonic() + timeout_minutes * 60
+    while True:
+        # The client already retries throttling and transient errors
         try:
             cert_details = acm_client.describe_certificate(CertificateArn=cert_arn)
-            cert = cert_details['Certificate']
-            status = cert.get('Status', '')
-            
-            if status == 'ISSUED':
-                print("Certificate is now issued and ready to use!")
-                return True
-            elif status == 'FAILED':
-                print("Certificate validation failed!")
-                return False
-            elif status == 'PENDING_VALIDATION':
-                print(f"  Status: {status} (waiting for DNS validation...)")
-                time.sleep(30)  # Check every 30 seconds
-            else:
-                print(f"  Status: {status} (waiting...)")
-                time.sleep(30)
         except Exception as e:
             print(f"Error checking certificate status: {e}")
-            time.sleep(30)
-    
-    print(f"Warning: Certificate did not validate within {timeout_minutes} minutes")
-    print("You may need to wait longer or check DNS records manually")
-    return False
+            return False
+        status = cert_details['Certificate'].get('Status', '')
+        
+        if status == 'ISSUED':
+            print("Certificate is now issued and ready to use!")
+            return True
+        if status != 'PENDING_VALIDATION':
+            print(f"Certificate validation failed! (Status: {status})")
+            return False
+        
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"Warning: Certificate did not validate within {timeout_minutes} minutes (Status: {status})")
+            print("You may need to wait longer or check DNS records manually")
+            return False
+        
+        delay = min(VALIDATION_POLL_INTERVAL, remaining)
+        if cancel_event is None:
+            time.sleep(delay)
+        elif cancel_event.wait(delay):
+            print("Stopped waiting for certificate validation")
+            return False
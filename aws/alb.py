@@ -1,9 +1,91 @@
 #!/usr/bin/env python3
 """
 Application Load Balancer management.
+Pass clients from aws.clients.get_client so lookups share one session and
+connection pool.
 """
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Backoff bounds (seconds) when polling for tasks and target health; the cap keeps
+# the wait between the targets turning healthy and us noticing short
+POLL_MIN_DELAY = 5
+POLL_MAX_DELAY = 10
+
+# Health check settings for new target groups
+HEALTH_CHECK_INTERVAL = 30
+HEALTHY_THRESHOLD = 2
+UNHEALTHY_THRESHOLD = 3
+
+# Target health that won't recover on its own; if every target stays like this for
+# TERMINAL_FAILURE_WINDOW seconds, stop waiting. Targets also look like this while
+# ECS replaces a failed task: the old target drains and the new one only registers
+# after the old has failed UNHEALTHY_THRESHOLD checks, then has to pass
+# HEALTHY_THRESHOLD checks, so the window covers all of those
+TERMINAL_TARGET_STATES = {'unhealthy', 'unused', 'draining'}
+TERMINAL_TARGET_REASONS = {'Target.FailedHealthChecks', 'Target.DeregistrationInProgress', 'Elb.InternalError'}
+TERMINAL_FAILURE_WINDOW = HEALTH_CHECK_INTERVAL * (UNHEALTHY_THRESHOLD + HEALTHY_THRESHOLD)
+
+# Describe results reused within one process; names can be re-pointed at a new
+# resource by a delete/create so they expire, ARNs never change so they don't
+ALB_CACHE_TTL = 60
+_alb_cache = {}       # ALB name -> (timestamp, load balancer)
+_tg_cache = {}        # target group name -> (timestamp, target group)
+_listener_cache = {}  # ALB ARN -> {port: listener}
+
+
+def _invalidate_alb_cache():
+    """Forget every cached load balancer, target group and listener lookup."""
+    _alb_cache.clear()
+    _tg_cache.clear()
+    _listener_cache.clear()
+
+
+def _get_alb_cached(elbv2_client, name, ttl=ALB_CACHE_TTL):
+    """
+    Describe a load balancer by name, reusing a recent result.
+    LoadBalancerNotFoundException propagates and is never cached.
+    """
+    cached = _alb_cache.get(name)
+    if cached and time.time() - cached[0] < ttl:
+        return cached[1]
+    response = elbv2_client.describe_load_balancers(Names=[name])
+    alb = response['LoadBalancers'][0] if response['LoadBalancers'] else None
+    if alb:
+        _alb_cache[name] = (time.time(), alb)
+    return alb
+
+
+def _get_target_group_cached(elbv2_client, name, ttl=ALB_CACHE_TTL):
+    """
+    Describe a target group by name, reusing a recent result.
+    TargetGroupNotFoundException propagates and is never cached.
+    """
+    cached = _tg_cache.get(name)
+    if cached and time.time() - cached[0] < ttl:
+        return cached[1]
+    response = elbv2_client.describe_target_groups(Names=[name])
+    tg = response['TargetGroups'][0] if response['TargetGroups'] else None
+    if tg:
+        _tg_cache[name] = (time.time(), tg)
+    return tg
+
+
+def _get_listeners_cached(elbv2_client, alb_arn):
+    """
+    Describe the listeners of a load balancer as a {port: listener} dict,
+    cached by ALB ARN.
+    """
+    if alb_arn not in _listener_cache:
+        paginator = elbv2_client.get_paginator('describe_listeners')
+        _listener_cache[alb_arn] = {
+            listener['Port']: listener
+            for page in paginator.paginate(LoadBalancerArn=alb_arn)
+            for listener in page.get('Listeners', [])
+        }
+    return _listener_cache[alb_arn]
 
 
 def create_application_load_balancer(elbv2_client, ec2_client, app_name, vpc_id, subnet_ids, 
@@ -16,9 +98,8 @@ def create_application_load_balancer(elbv2_client, ec2_client, app_name, vpc_id,
     
     # Check if ALB already exists
     try:
-        response = elbv2_client.describe_load_balancers(Names=[alb_name])
-        if response['LoadBalancers']:
-            alb = response['LoadBalancers'][0]
+        alb = _get_alb_cached(elbv2_client, alb_name)
+        if alb:
             print(f"Using existing ALB: {alb_name}")
             return alb['LoadBalancerArn'], alb['DNSName']
     except elbv2_client.exceptions.LoadBalancerNotFoundException:
@@ -45,6 +126,9 @@ def create_application_load_balancer(elbv2_client, ec2_client, app_name, vpc_id,
         
         alb_arn = response['LoadBalancers'][0]['LoadBalancerArn']
         alb_dns = response['LoadBalancers'][0]['DNSName']
+        # A brand-new ALB has no listeners, so create_listener can skip its describe
+        _alb_cache[alb_name] = (time.time(), response['LoadBalancers'][0])
+        _listener_cache[alb_arn] = {}
         
         print(f"Created ALB: {alb_arn}")
         print(f"  DNS: {alb_dns}")
@@ -52,7 +136,7 @@ def create_application_load_balancer(elbv2_client, ec2_client, app_name, vpc_id,
         # Wait for ALB to be active
         print("Waiting for ALB to become active...")
         waiter = elbv2_client.get_waiter('load_balancer_available')
-        waiter.wait(LoadBalancerArns=[alb_arn])
+        waiter.wait(LoadBalancerArns=[alb_arn], WaiterConfig={'Delay': 10, 'MaxAttempts': 60})
         print("ALB is now active")
         
         return alb_arn, alb_dns
@@ -72,9 +156,8 @@ def create_target_group(elbv2_client, vpc_id, app_name, port=8080, protocol='HTT
     
     # Check if target group already exists
     try:
-        response = elbv2_client.describe_target_groups(Names=[tg_name])
-        if response['TargetGroups']:
-            tg = response['TargetGroups'][0]
+        tg = _get_target_group_cached(elbv2_client, tg_name)
+        if tg:
             tg_arn = tg['TargetGroupArn']
             
             # Check if health check path needs updating
@@ -85,6 +168,7 @@ def create_target_group(elbv2_client, vpc_id, app_name, port=8080, protocol='HTT
                     TargetGroupArn=tg_arn,
                     HealthCheckPath=health_check_path
                 )
+                _tg_cache.pop(tg_name, None)
                 print(f"Target group health check path updated")
             
             print(f"Using existing target group: {tg_name}")
@@ -109,16 +193,17 @@ def create_target_group(elbv2_client, vpc_id, app_name, port=8080, protocol='HTT
             TargetType='ip',  # For Fargate, use IP target type
             HealthCheckProtocol=protocol,
             HealthCheckPath=health_check_path,
-            HealthCheckIntervalSeconds=30,
+            HealthCheckIntervalSeconds=HEALTH_CHECK_INTERVAL,
             HealthCheckTimeoutSeconds=5,
-            HealthyThresholdCount=2,
-            UnhealthyThresholdCount=3,
+            HealthyThresholdCount=HEALTHY_THRESHOLD,
+            UnhealthyThresholdCount=UNHEALTHY_THRESHOLD,
             Matcher={
                 'HttpCode': '200'
             }
         )
         
         tg_arn = response['TargetGroups'][0]['TargetGroupArn']
+        _tg_cache[tg_name] = (time.time(), response['TargetGroups'][0])
         print(f"Created target group: {tg_arn}")
         print(f"  Health check path: {health_check_path}")
         
@@ -128,113 +213,125 @@ def create_target_group(elbv2_client, vpc_id, app_name, port=8080, protocol='HTT
         sys.exit(1)
 
 
+def _check_service_load_balancers(service, target_group_arn):
+    """
+    Verify the ECS service has a load balancer configured, warning if it points
+    at a different target group. Returns False if it has none.
+    """
+    load_balancers = service.get('loadBalancers', [])
+    if not load_balancers:
+        print(f"  ✗ ERROR: Service does not have a load balancer configured!")
+        print(f"  This is why tasks aren't registering. The service needs to be updated with load balancer config.")
+        return False
+    
+    print(f"  ✓ Service has {len(load_balancers)} load balancer(s) configured")
+    for lb in load_balancers:
+        print(f"    Target Group: {lb.get('targetGroupArn', 'N/A')}")
+        print(f"    Container: {lb.get('containerName', 'N/A')}:{lb.get('containerPort', 'N/A')}")
+        
+        # Verify it matches the expected target group
+        if lb.get('targetGroupArn') != target_group_arn:
+            print(f"    ⚠ WARNING: Target group ARN doesn't match expected!")
+            print(f"      Expected: {target_group_arn}")
+            print(f"      Actual:   {lb.get('targetGroupArn')}")
+    return True
+
+
 def wait_for_healthy_targets(elbv2_client, ecs_client, cluster_name, service_name, target_group_arn, timeout_minutes=10):
     """
     Wait for at least one healthy target in the target group.
-    First waits for ECS tasks to be running, then waits for target registration.
+    Polls ECS task counts and target health together until a target is healthy.
     """
     print(f"Waiting for targets to become healthy (up to {timeout_minutes} minutes)...")
-    start_time = time.time()
-    timeout_seconds = timeout_minutes * 60
-    check_interval = 15  # Check every 15 seconds
+    deadline = time.monotonic() + timeout_minutes * 60
     
-    # First, verify service has load balancer configured
-    print("  Step 0: Verifying service configuration...")
-    try:
-        services = ecs_client.describe_services(cluster=cluster_name, services=[service_name])
-        if services['services']:
-            service = services['services'][0]
-            load_balancers = service.get('loadBalancers', [])
+    # Poll ECS task counts and target health together: ECS registers tasks with the
+    # target group as soon as they start, so there's no need to wait between the two.
+    # The first describe_services response also verifies the load balancer config.
+    print("  Waiting for ECS tasks to run and register with the ALB...")
+    print(f"  Target Group ARN: {target_group_arn}")
+    delay = POLL_MIN_DELAY
+    last_state = None
+    failing_since = None
+    config_checked = False
+    task_counts = None
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        while time.monotonic() < deadline:
+            # Once every desired task is running, only target health can still change
+            services_future = None
+            if not task_counts or task_counts[0] < task_counts[1] or task_counts[1] == 0:
+                services_future = executor.submit(
+                    ecs_client.describe_services, cluster=cluster_name, services=[service_name]
+                )
+            health_future = executor.submit(
+                elbv2_client.describe_target_health, TargetGroupArn=target_group_arn
+            )
             
-            if not load_balancers:
-                print(f"  ✗ ERROR: Service does not have a load balancer configured!")
-                print(f"  This is why tasks aren't registering. The service needs to be updated with load balancer config.")
-                return False
+            if services_future:
+                try:
+                    services = services_future.result()
+                    if not services['services']:
+                        print(f"  ✗ ERROR: Service not found!")
+                        return False
+                    service = services['services'][0]
+                    if not config_checked:
+                        if not _check_service_load_balancers(service, target_group_arn):
+                            return False
+                        config_checked = True
+                    task_counts = (service.get('runningCount', 0), service.get('desiredCount', 0))
+                    print(f"  Tasks: {task_counts[0]}/{task_counts[1]} running")
+                except Exception as e:
+                    if not config_checked:
+                        print(f"  Error checking service configuration: {e}")
+                        return False
+                    print(f"  Error checking ECS service: {e}")
             
-            print(f"  ✓ Service has {len(load_balancers)} load balancer(s) configured")
-            for lb in load_balancers:
-                print(f"    Target Group: {lb.get('targetGroupArn', 'N/A')}")
-                print(f"    Container: {lb.get('containerName', 'N/A')}:{lb.get('containerPort', 'N/A')}")
-                
-                # Verify it matches the expected target group
-                if lb.get('targetGroupArn') != target_group_arn:
-                    print(f"    ⚠ WARNING: Target group ARN doesn't match expected!")
-                    print(f"      Expected: {target_group_arn}")
-                    print(f"      Actual:   {lb.get('targetGroupArn')}")
-        else:
-            print(f"  ✗ ERROR: Service not found!")
-            return False
-    except Exception as e:
-        print(f"  Error checking service configuration: {e}")
-        return False
-    
-    # First, wait for ECS tasks to be running
-    print("  Step 1: Waiting for ECS tasks to be running...")
-    tasks_running = False
-    while time.time() - start_time < timeout_seconds and not tasks_running:
-        try:
-            services = ecs_client.describe_services(cluster=cluster_name, services=[service_name])
-            if services['services']:
-                service = services['services'][0]
-                running_count = service.get('runningCount', 0)
-                desired_count = service.get('desiredCount', 0)
+            status_str = None
+            try:
+                targets = health_future.result().get('TargetHealthDescriptions', [])
                 
-                if running_count > 0 and running_count >= desired_count:
-                    print(f"  ✓ {running_count} task(s) are running")
-                    tasks_running = True
-                    break
+                if targets:
+                    healthy_count = sum(1 for t in targets if t['TargetHealth']['State'] == 'healthy')
+                    total_count = len(targets)
+                    
+                    # Show status of all targets
+                    status_summary = {}
+                    for target in targets:
+                        state = target['TargetHealth']['State']
+                        reason = target['TargetHealth'].get('Reason', '')
+                        status_key = f"{state}" + (f" ({reason})" if reason else "")
+                        status_summary[status_key] = status_summary.get(status_key, 0) + 1
+                    
+                    status_str = ", ".join([f"{count} {state}" for state, count in status_summary.items()])
+                    print(f"  Targets: {healthy_count}/{total_count} healthy [{status_str}]")
+                    
+                    if healthy_count > 0:
+                        print("  ✓ Targets are healthy!")
+                        return True
+                    
+                    if not all(t['TargetHealth']['State'] in TERMINAL_TARGET_STATES and
+                               t['TargetHealth'].get('Reason') in TERMINAL_TARGET_REASONS for t in targets):
+                        failing_since = None
+                    elif failing_since is None:
+                        failing_since = time.monotonic()
+                    elif time.monotonic() - failing_since >= TERMINAL_FAILURE_WINDOW:
+                        failing_for = int(time.monotonic() - failing_since)
+                        print(f"  ✗ All targets have been failing for {failing_for}s, giving up")
+                        print("  Check CloudWatch logs for container errors and that the health check path is served")
+                        return False
                 else:
-                    print(f"  Tasks: {running_count}/{desired_count} running...")
+                    failing_since = None
+                    print(f"  No targets registered yet (tasks may still be registering)...")
+            except Exception as e:
+                print(f"  Error checking target health: {e}")
             
-            time.sleep(check_interval)
-        except Exception as e:
-            print(f"  Error checking ECS service: {e}")
-            time.sleep(check_interval)
-    
-    if not tasks_running:
-        print(f"  Warning: Tasks not running within timeout")
-        return False
-    
-    # Now wait for targets to register and become healthy
-    print("  Step 2: Waiting for targets to register with ALB and become healthy...")
-    print(f"  Target Group ARN: {target_group_arn}")
-    elapsed = time.time() - start_time
-    remaining_timeout = timeout_seconds - elapsed
-    
-    # Give ECS a moment to start registering tasks (can take 30-60 seconds)
-    print("  Waiting for ECS to begin task registration (this can take 30-60 seconds)...")
-    time.sleep(30)
-    
-    while time.time() - start_time < timeout_seconds:
-        try:
-            response = elbv2_client.describe_target_health(TargetGroupArn=target_group_arn)
-            targets = response.get('TargetHealthDescriptions', [])
+            # Reset the backoff whenever tasks or targets change state
+            if (task_counts, status_str) != last_state:
+                delay = POLL_MIN_DELAY
+                last_state = (task_counts, status_str)
             
-            if targets:
-                healthy_count = sum(1 for t in targets if t['TargetHealth']['State'] == 'healthy')
-                total_count = len(targets)
-                
-                # Show status of all targets
-                status_summary = {}
-                for target in targets:
-                    state = target['TargetHealth']['State']
-                    reason = target['TargetHealth'].get('Reason', '')
-                    status_key = f"{state}" + (f" ({reason})" if reason else "")
-                    status_summary[status_key] = status_summary.get(status_key, 0) + 1
-                
-                status_str = ", ".join([f"{count} {state}" for state, count in status_summary.items()])
-                print(f"  Targets: {healthy_count}/{total_count} healthy [{status_str}]")
-                
-                if healthy_count > 0:
-                    print("  ✓ Targets are healthy!")
-                    return True
-            else:
-                print(f"  No targets registered yet (tasks may still be registering)...")
-            
-            time.sleep(check_interval)
-        except Exception as e:
-            print(f"  Error checking target health: {e}")
-            time.sleep(check_interval)
+            time.sleep(delay)
+            delay = min(delay * 2, POLL_MAX_DELAY)
     
     print(f"  Warning: No healthy targets found within {timeout_minutes} minutes")
     print("  Troubleshooting:")
@@ -253,33 +350,33 @@ def create_listener(elbv2_client, alb_arn, target_group_arn, allow_create=False)
     """
     # Check if listener already exists
     try:
-        response = elbv2_client.describe_listeners(LoadBalancerArn=alb_arn)
-        for listener in response.get('Listeners', []):
-            if listener['Port'] == 80:
-                # If listener already exists but points to a different target group, update it
-                listener_arn = listener['ListenerArn']
-                current_actions = listener.get('DefaultActions', [])
-                current_tg = None
-                if current_actions:
-                    action = current_actions[0]
-                    if action.get('Type') == 'forward':
-                        current_tg = action.get('TargetGroupArn')
-                if current_tg and current_tg != target_group_arn:
-                    print(f"HTTP listener exists on port 80 but points to a different target group.")
-                    print(f"Updating listener to forward to {target_group_arn} instead of {current_tg}...")
-                    elbv2_client.modify_listener(
-                        ListenerArn=listener_arn,
-                        DefaultActions=[
-                            {
-                                'Type': 'forward',
-                                'TargetGroupArn': target_group_arn
-                            }
-                        ]
-                    )
-                    print(f"Listener updated to use target group: {target_group_arn}")
-                else:
-                    print(f"Using existing HTTP listener on port 80")
-                return listener_arn
+        listener = _get_listeners_cached(elbv2_client, alb_arn).get(80)
+        if listener:
+            # If listener already exists but points to a different target group, update it
+            listener_arn = listener['ListenerArn']
+            current_actions = listener.get('DefaultActions', [])
+            current_tg = None
+            if current_actions:
+                action = current_actions[0]
+                if action.get('Type') == 'forward':
+                    current_tg = action.get('TargetGroupArn')
+            if current_tg and current_tg != target_group_arn:
+                print(f"HTTP listener exists on port 80 but points to a different target group.")
+                print(f"Updating listener to forward to {target_group_arn} instead of {current_tg}...")
+                elbv2_client.modify_listener(
+                    ListenerArn=listener_arn,
+                    DefaultActions=[
+                        {
+                            'Type': 'forward',
+                            'TargetGroupArn': target_group_arn
+                        }
+                    ]
+                )
+                _listener_cache.pop(alb_arn, None)
+                print(f"Listener updated to use target group: {target_group_arn}")
+            else:
+                print(f"Using existing HTTP listener on port 80")
+            return listener_arn
     except Exception as e:
         print(f"Note: Could not check for existing listeners: {e}")
     
@@ -303,6 +400,7 @@ def create_listener(elbv2_client, alb_arn, target_group_arn, allow_create=False)
         )
         
         listener_arn = response['Listeners'][0]['ListenerArn']
+        _listener_cache.pop(alb_arn, None)
         print(f"Created HTTP listener: {listener_arn}")
         
         return listener_arn
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Shared boto3 sessions and client configuration.
+"""
+import threading
+from functools import lru_cache
+import boto3
+import botocore.session
+from botocore.config import Config
+
+
+# Describe calls are fanned out over thread pools, so the HTTP pool must be
+# larger than botocore's default of 10 or the requests just queue on it.
+# Adaptive retries back off client-side when ACM/ELB start throttling.
+# Short connect/read timeouts turn a stalled connection into a retry instead of a hang.
+CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    connect_timeout=5,
+    read_timeout=30,
+    tcp_keepalive=True
+)
+
+# Sessions reused per (profile, region) -> boto3.Session
+_sessions = {}
+_sessions_lock = threading.Lock()
+# Credential providers shared by every session of a profile -> _SharedCredentialProvider
+_credential_providers = {}
+# Clients reused per (service, region, profile) -> client; boto3 clients are thread-safe
+_clients = {}
+
+
+class _SharedCredentialProvider:
+    """
+    Stands in for botocore's credential resolver so that every session of a
+    profile walks the provider chain (env, config, SSO, EC2 metadata) once and
+    shares the resulting, possibly refreshable, credentials object.
+    """
+    def __init__(self, resolver):
+        self._resolver = resolver
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._credentials = None
+    
+    def load_credentials(self):
+        with self._lock:
+            if not self._loaded:
+                self._credentials = self._resolver.load_credentials()
+                self._loaded = True
+        return self._credentials
+
+
+def get_session(profile=None, region=None):
+    """
+    Return the shared boto3 Session for a profile and region.
+    Every client created from it uses CLIENT_CONFIG unless given its own config.
+    Credentials are resolved once per profile, however many regions it is used in
+    (set AWS_EC2_METADATA_DISABLED=true off EC2 to skip the metadata probe entirely).
+    """
+    key = (profile, region)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            botocore_session = botocore.session.Session(profile=profile)
+            provider = _credential_providers.get(profile)
+            if provider is None:
+                provider = _SharedCredentialProvider(botocore_session.get_component('credential_provider'))
+                _credential_providers[profile] = provider
+            botocore_session.register_component('credential_provider', provider)
+            botocore_session.set_default_client_config(CLIENT_CONFIG)
+            session = boto3.Session(botocore_session=botocore_session, region_name=region)
+            _sessions[key] = session
+    return session
+
+
+def make_client(service, region=None, profile=None):
+    """
+    Create a boto3 client for the service from the shared session.
+    """
+    return get_session(profile, region).client(service, config=CLIENT_CONFIG)
+
+
+def get_client(service, region=None, profile=None):
+    """
+    Return the shared client for the service, creating it on first use.
+    """
+    key = (service, region, profile)
+    client = _clients.get(key)
+    if client is None:
+        client = make_client(service, region, profile)
+        with _sessions_lock:
+            client = _clients.setdefault(key, client)
+    return client
+
+
+@lru_cache(maxsize=32)
+def get_account_id(profile=None, region=None):
+    """
+    Return the AWS account ID for the profile's credentials.
+    The STS call is made once per (profile, region) for the life of the process.
+    """
+    return get_client('sts', region, profile).get_caller_identity().get('Account')
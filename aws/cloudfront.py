@@ -4,6 +4,325 @@ CloudFront distribution management.
 """
 import sys
 import time
+import copy
+import json
+import hashlib
+import threading
+from collections import defaultdict, deque
+from functools import lru_cache
+from botocore.exceptions import ClientError, WaiterError
+from . import utils
+
+
+_EMPTY = ()
+
+# Distribution summaries found by alias -> {'Id', 'DomainName', ...}, reused for the process
+_DIST_BY_ALIAS_CACHE = {}
+# Config and ETag already read while verifying a lookup, per distribution ID -> (config, etag);
+# used once by the next config read, since any update makes it stale
+_prefetched_configs = {}
+
+# CloudFront allows this many wildcard invalidations in progress per distribution
+MAX_INFLIGHT_INVALIDATIONS = 15
+# Invalidations created by this process, per distribution ID, oldest first
+_inflight_invalidations = defaultdict(deque)
+_invalidations_lock = threading.Lock()
+
+# Last config signature applied per distribution ID -> {'etag', 'sig', 'ts'}, kept between runs;
+# the ETag it left behind tells whether the distribution has been edited since
+ETAG_CACHE_FILE = 'cf_etag.json'
+_ETAG_CACHE_TTL = 86400
+_etag_cache_lock = threading.Lock()
+
+# Distributions found by alias -> {'Id', 'DomainName', 'ts'}, kept between runs
+DIST_INDEX_FILE = 'cf_index.json'
+_DIST_INDEX_TTL = 86400
+_dist_index_lock = threading.Lock()
+
+
+# Distribution config for an ALB origin with no caching: TTLs are 0 and all
+# headers are forwarded. The None fields are filled in per distribution.
+_CF_TEMPLATE = {
+    'CallerReference': None,
+    'Aliases': {
+        'Quantity': 1,
+        'Items': None
+    },
+    'DefaultRootObject': '',
+    'Origins': {
+        'Quantity': 1,
+        'Items': [
+            {
+                'Id': 'alb-origin',
+                'DomainName': None,
+                'CustomOriginConfig': {
+                    'HTTPPort': 80,
+                    'HTTPSPort': 443,
+                    'OriginProtocolPolicy': 'http-only',  # Use HTTP since ALB only has HTTP listener
+                    'OriginSslProtocols': {
+                        'Quantity': 1,
+                        'Items': ['TLSv1.2']
+                    },
+                    'OriginReadTimeout': 60,
+                    'OriginKeepaliveTimeout': 5
+                }
+            }
+        ]
+    },
+    'DefaultCacheBehavior': {
+        'TargetOriginId': 'alb-origin',
+        'ViewerProtocolPolicy': 'redirect-to-https',
+        'AllowedMethods': {
+            'Quantity': 7,
+            'Items': ['GET', 'HEAD', 'OPTIONS', 'PUT', 'POST', 'PATCH', 'DELETE'],
+            'CachedMethods': {
+                'Quantity': 2,
+                'Items': ['GET', 'HEAD']
+            }
+        },
+        'ForwardedValues': {
+            'QueryString': True,
+            'Cookies': {
+                'Forward': 'all'
+            },
+            'Headers': {
+                'Quantity': 1,
+                'Items': ['*']  # Forward all headers
+            },
+            'QueryStringCacheKeys': {
+                'Quantity': 0,
+                'Items': []
+            }
+        },
+        'MinTTL': 0,
+        'DefaultTTL': 0,  # No caching
+        'MaxTTL': 0,  # No caching
+        'Compress': True,
+        'SmoothStreaming': False,
+        'FieldLevelEncryptionId': ''
+    },
+    'Comment': None,
+    'Enabled': True,
+    'PriceClass': 'PriceClass_All',  # Use all edge locations worldwide for best performance
+    'ViewerCertificate': None,
+    'Restrictions': {
+        'GeoRestriction': {
+            'RestrictionType': 'none',
+            'Quantity': 0
+        }
+    },
+    'HttpVersion': 'http2and3',
+    'IsIPV6Enabled': True
+}
+
+
+def _invalidate_distribution_cache():
+    """Forget every cached distribution lookup."""
+    _DIST_BY_ALIAS_CACHE.clear()
+    _prefetched_configs.clear()
+
+
+def _iter_distributions(cloudfront_client):
+    """
+    Yield (aliases, distribution summary) for every distribution, page by page.
+    """
+    # 100 is the most list_distributions returns per page
+    paginator = cloudfront_client.get_paginator('list_distributions')
+    for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
+        # An empty account has no 'Items' at all, and distributions without aliases
+        # have an 'Aliases' block without 'Items'
+        for dist in page['DistributionList'].get('Items') or _EMPTY:
+            aliases = dist.get('Aliases')
+            yield tuple(aliases.get('Items') or _EMPTY) if aliases else _EMPTY, dist
+
+
+def find_distribution_by_alias(cloudfront_client, domain):
+    """
+    Return the summary of the distribution serving the domain, or None.
+    A distribution remembered on disk is verified with one get_distribution call;
+    otherwise listing stops as soon as it is found, caching the aliases seen on the way.
+    """
+    dist = _DIST_BY_ALIAS_CACHE.get(domain)
+    if dist:
+        return dist
+    
+    dist = _load_indexed_distribution(cloudfront_client, domain)
+    if dist:
+        _DIST_BY_ALIAS_CACHE[domain] = dist
+        return dist
+    
+    for aliases, dist in _iter_distributions(cloudfront_client):
+        # Remember every alias we pass so later lookups for other domains are free
+        for alias in aliases:
+            _DIST_BY_ALIAS_CACHE.setdefault(alias, dist)
+        if domain in aliases:
+            _save_indexed_distribution(domain, dist)
+            return dist
+    return None
+
+
+def _load_indexed_distribution(cloudfront_client, domain):
+    """
+    Return the distribution recorded on disk for the domain by an earlier run,
+    if the entry is recent and the distribution still serves the domain.
+    Stale or wrong entries are dropped so the caller falls back to listing.
+    """
+    entry = utils.load_json_cache(DIST_INDEX_FILE).get(domain)
+    if not entry:
+        return None
+    
+    if time.time() - entry.get('ts', 0) < _DIST_INDEX_TTL:
+        try:
+            response = cloudfront_client.get_distribution(Id=entry['Id'])
+            dist = response['Distribution']
+            aliases = dist['DistributionConfig'].get('Aliases', {}).get('Items') or _EMPTY
+            if domain in aliases:
+                _prefetched_configs[dist['Id']] = (dist['DistributionConfig'], response['ETag'])
+                return {'Id': dist['Id'], 'DomainName': dist['DomainName']}
+        except ClientError:
+            pass  # NoSuchDistribution, or not visible with these credentials
+    
+    with _dist_index_lock:
+        entries = utils.load_json_cache(DIST_INDEX_FILE)
+        entries.pop(domain, None)
+        utils.save_json_cache(DIST_INDEX_FILE, entries)
+    return None
+
+
+def _save_indexed_distribution(domain, dist):
+    """
+    Remember which distribution serves the domain for later runs.
+    """
+    with _dist_index_lock:
+        entries = utils.load_json_cache(DIST_INDEX_FILE)
+        entries[domain] = {'Id': dist['Id'], 'DomainName': dist['DomainName'], 'ts': time.time()}
+        utils.save_json_cache(DIST_INDEX_FILE, entries)
+
+
+def get_distribution_config(cloudfront_client, dist_id):
+    """
+    Return (DistributionConfig, ETag) for a distribution, reusing the copy read
+    when find_distribution_by_alias verified it instead of fetching it again.
+    """
+    prefetched = _prefetched_configs.pop(dist_id, None)
+    if prefetched:
+        return prefetched
+    response = cloudfront_client.get_distribution_config(Id=dist_id)
+    return response['DistributionConfig'], response['ETag']
+
+
+def _find_alb_origin(config):
+    """
+    Return the ALB origin of a distribution config: the one with Id 'alb-origin',
+    else the first whose Id mentions 'alb'. None if there is no such origin.
+    """
+    origins_by_id = {o['Id']: o for o in config.get('Origins', {}).get('Items', [])}
+    origin = origins_by_id.get('alb-origin')
+    if origin is None:
+        origin = next((o for origin_id, o in origins_by_id.items() if 'alb' in origin_id.lower()), None)
+    return origin
+
+
+@lru_cache(maxsize=32)
+def _desired_distribution_settings(certificate_arn):
+    """
+    The settings every distribution for an ALB should have, as an immutable tuple:
+    (certificate ARN or None, price class, ALB origin protocol policy).
+    """
+    # PriceClass_All uses every edge location; the ALB only has an HTTP listener
+    return (certificate_arn, 'PriceClass_All', 'http-only')
+
+
+def _viewer_certificate(certificate_arn):
+    """
+    ViewerCertificate block for a distribution using the ACM certificate, or
+    the default CloudFront certificate when there is none.
+    """
+    if not certificate_arn:
+        return {'CloudFrontDefaultCertificate': True}
+    return {
+        'ACMCertificateArn': certificate_arn,
+        'SSLSupportMethod': 'sni-only',
+        'MinimumProtocolVersion': 'TLSv1.2_2021',
+    }
+
+
+def _diff_distribution_config(config, desired):
+    """
+    Compare a DistributionConfig with _desired_distribution_settings.
+    Returns (config, changes): config is a copy with the fixes applied (or the
+    original if nothing differs), changes describes each fix for the log.
+    Never modifies the config passed in.
+    """
+    certificate_arn, price_class, origin_protocol = desired
+    updated = dict(config)
+    changes = []
+    
+    if certificate_arn and config['ViewerCertificate'].get('ACMCertificateArn') != certificate_arn:
+        changes.append("Updating CloudFront distribution with new certificate...")
+        updated['ViewerCertificate'] = _viewer_certificate(certificate_arn)
+    
+    if config.get('PriceClass', 'PriceClass_100') != price_class:
+        changes.append(f"Updating CloudFront distribution to use all edge locations ({price_class})...")
+        updated['PriceClass'] = price_class
+    
+    # Fix the ALB origin if it's set to https-only but the ALB only has an HTTP listener
+    origin = _find_alb_origin(config)
+    if origin and origin.get('CustomOriginConfig', {}).get('OriginProtocolPolicy', '') == 'https-only':
+        changes.append(f"Fixing origin protocol policy: changing from https-only to {origin_protocol}")
+        updated['Origins'] = copy.deepcopy(config['Origins'])
+        _find_alb_origin(updated)['CustomOriginConfig']['OriginProtocolPolicy'] = origin_protocol
+    
+    return (updated if changes else config), changes
+
+
+def _update_existing_distribution(cloudfront_client, dist_id, certificate_arn):
+    """
+    Bring an existing distribution's certificate, price class and ALB origin
+    protocol in line with what this deploy wants. Returns True if it was updated.
+    Skips fetching the config entirely when a previous run already left the
+    distribution in the wanted state, unless the lookup already read the live
+    ETag and it has changed since, meaning someone else edited the distribution.
+    """
+    desired = _desired_distribution_settings(certificate_arn)
+    signature = hashlib.sha256(json.dumps(desired).encode()).hexdigest()
+    entry = utils.load_json_cache(ETAG_CACHE_FILE).get(dist_id)
+    if entry and entry.get('sig') == signature and time.time() - entry.get('ts', 0) < _ETAG_CACHE_TTL:
+        prefetched = _prefetched_configs.get(dist_id)
+        if prefetched is None or prefetched[1] == entry.get('etag'):
+            _prefetched_configs.pop(dist_id, None)
+            return False
+    
+    for attempt in range(2):
+        current_config, etag = get_distribution_config(cloudfront_client, dist_id)
+        config, changes = _diff_distribution_config(current_config, desired)
+        for change in changes:
+            print(change)
+        needs_update = bool(changes)
+        
+        if not needs_update:
+            break
+        try:
+            response = cloudfront_client.update_distribution(
+                Id=dist_id,
+                DistributionConfig=config,
+                IfMatch=etag
+            )
+        except ClientError as e:
+            # Someone else changed the distribution since we read it; re-read and retry once
+            if attempt == 0 and e.response.get('Error', {}).get('Code') == 'PreconditionFailed':
+                continue
+            raise
+        etag = response.get('ETag', etag)
+        print("CloudFront distribution updated successfully")
+        print("Note: Distribution update may take 15-20 minutes to deploy")
+        break
+    
+    with _etag_cache_lock:
+        entries = utils.load_json_cache(ETAG_CACHE_FILE)
+        entries[dist_id] = {'etag': etag, 'sig': signature, 'ts': time.time()}
+        utils.save_json_cache(ETAG_CACHE_FILE, entries)
+    return needs_update
 
 
 def create_cloudfront_distribution(cloudfront_client, alb_dns_name, domain, region, allow_create=False, certificate_arn=None):
@@ -18,69 +337,26 @@ def create_cloudfront_distribution(cloudfront_client, alb_dns_name, domain, regi
     """
     distribution_name = f"{domain.replace('.', '-')}-cf"
     
-    # Check if distribution already exists (by checking comment/aliases)
-    # Note: CloudFront doesn't have a direct "get by name" API, so we'll list and search
+    # Check if distribution already exists (by checking aliases)
+    # Note: CloudFront doesn't have a direct "get by alias" API, so we list and search
     try:
-        paginator = cloudfront_client.get_paginator('list_distributions')
-        for page in paginator.paginate():
-            for dist in page.get('DistributionList', {}).get('Items', []):
-                if domain in dist.get('Aliases', {}).get('Items', []):
-                    dist_id = dist['Id']
-                    print(f"Using existing CloudFront distribution: {dist_id}")
-                    
-                    # Check if distribution needs updates (certificate or origin protocol)
-                    try:
-                        dist_config = cloudfront_client.get_distribution_config(Id=dist_id)
-                        config = dist_config['DistributionConfig']
-                        needs_update = False
-                        etag = dist_config['ETag']
-                        
-                        # Check and update certificate if needed
-                        if certificate_arn:
-                            current_cert = config['ViewerCertificate']
-                            if current_cert.get('ACMCertificateArn') != certificate_arn:
-                                print(f"Updating CloudFront distribution with new certificate...")
-                                config['ViewerCertificate'] = {
-                                    'ACMCertificateArn': certificate_arn,
-                                    'SSLSupportMethod': 'sni-only',
-                                    'MinimumProtocolVersion': 'TLSv1.2_2021',
-                                }
-                                needs_update = True
-                        
-                        # Check and update PriceClass to use all edge locations
-                        current_price_class = config.get('PriceClass', 'PriceClass_100')
-                        if current_price_class != 'PriceClass_All':
-                            print(f"Updating CloudFront distribution to use all edge locations (PriceClass_All)...")
-                            config['PriceClass'] = 'PriceClass_All'
-                            needs_update = True
-                        
-                        # Check and fix origin protocol policy (should be http-only for ALB with HTTP listener)
-                        origins = config.get('Origins', {}).get('Items', [])
-                        for origin in origins:
-                            if origin.get('Id') == 'alb-origin' or 'alb' in origin.get('Id', '').lower():
-                                custom_config = origin.get('CustomOriginConfig', {})
-                                current_policy = custom_config.get('OriginProtocolPolicy', '')
-                                
-                                # Fix if it's set to https-only but ALB only has HTTP listener
-                                if current_policy == 'https-only':
-                                    print(f"Fixing origin protocol policy: changing from https-only to http-only")
-                                    custom_config['OriginProtocolPolicy'] = 'http-only'
-                                    needs_update = True
-                        
-                        if needs_update:
-                            cloudfront_client.update_distribution(
-                                Id=dist_id,
-                                DistributionConfig=config,
-                                IfMatch=etag
-                            )
-                            print("CloudFront distribution updated successfully")
-                            print("Note: Distribution update may take 15-20 minutes to deploy")
-                    except Exception as e:
-                        print(f"Note: Could not update existing distribution: {e}")
-                    
-                    return dist['DomainName'], dist_id
+        dist = find_distribution_by_alias(cloudfront_client, domain)
     except Exception as e:
         print(f"Note: Could not check for existing distributions: {e}")
+        dist = None
+    
+    if dist:
+        dist_id = dist['Id']
+        print(f"Using existing CloudFront distribution: {dist_id}")
+        
+        # Check if distribution needs updates (certificate or origin protocol)
+        try:
+            if _update_existing_distribution(cloudfront_client, dist_id, certificate_arn):
+                _DIST_BY_ALIAS_CACHE.pop(domain, None)
+        except Exception as e:
+            print(f"Note: Could not update existing distribution: {e}")
+        
+        return dist['DomainName'], dist_id
     
     if not allow_create:
         print(f"CloudFront distribution does not exist and resource creation is disabled.")
@@ -89,92 +365,19 @@ def create_cloudfront_distribution(cloudfront_client, alb_dns_name, domain, regi
     print(f"Creating CloudFront distribution for domain: {domain}")
     
     # Create distribution configuration
-    # No caching: set TTL to 0 and forward all headers
-    distribution_config = {
-        'CallerReference': f"{domain}-{int(time.time())}",
-        'Aliases': {
-            'Quantity': 1,
-            'Items': [domain]
-        },
-        'DefaultRootObject': '',
-        'Origins': {
-            'Quantity': 1,
-            'Items': [
-                {
-                    'Id': 'alb-origin',
-                    'DomainName': alb_dns_name,
-                    'CustomOriginConfig': {
-                        'HTTPPort': 80,
-                        'HTTPSPort': 443,
-                        'OriginProtocolPolicy': 'http-only',  # Use HTTP since ALB only has HTTP listener
-                        'OriginSslProtocols': {
-                            'Quantity': 1,
-                            'Items': ['TLSv1.2']
-                        },
-                        'OriginReadTimeout': 60,
-                        'OriginKeepaliveTimeout': 5
-                    }
-                }
-            ]
-        },
-        'DefaultCacheBehavior': {
-            'TargetOriginId': 'alb-origin',
-            'ViewerProtocolPolicy': 'redirect-to-https',
-            'AllowedMethods': {
-                'Quantity': 7,
-                'Items': ['GET', 'HEAD', 'OPTIONS', 'PUT', 'POST', 'PATCH', 'DELETE'],
-                'CachedMethods': {
-                    'Quantity': 2,
-                    'Items': ['GET', 'HEAD']
-                }
-            },
-            'ForwardedValues': {
-                'QueryString': True,
-                'Cookies': {
-                    'Forward': 'all'
-                },
-                'Headers': {
-                    'Quantity': 1,
-                    'Items': ['*']  # Forward all headers
-                },
-                'QueryStringCacheKeys': {
-                    'Quantity': 0,
-                    'Items': []
-                }
-            },
-            'MinTTL': 0,
-            'DefaultTTL': 0,  # No caching
-            'MaxTTL': 0,  # No caching
-            'Compress': True,
-            'SmoothStreaming': False,
-            'FieldLevelEncryptionId': ''
-        },
-        'Comment': f'CloudFront distribution for {domain}',
-        'Enabled': True,
-        'PriceClass': 'PriceClass_All',  # Use all edge locations worldwide for best performance
-        'ViewerCertificate': (
-            {
-                'ACMCertificateArn': certificate_arn,
-                'SSLSupportMethod': 'sni-only',
-                'MinimumProtocolVersion': 'TLSv1.2_2021',
-            } if certificate_arn else {
-                'CloudFrontDefaultCertificate': True
-            }
-        ),
-        'Restrictions': {
-            'GeoRestriction': {
-                'RestrictionType': 'none',
-                'Quantity': 0
-            }
-        },
-        'HttpVersion': 'http2and3',
-        'IsIPV6Enabled': True
-    }
+    distribution_config = copy.deepcopy(_CF_TEMPLATE)
+    distribution_config['CallerReference'] = f"{domain}-{int(time.time())}"
+    distribution_config['Aliases']['Items'] = [domain]
+    distribution_config['Origins']['Items'][0]['DomainName'] = alb_dns_name
+    distribution_config['Comment'] = f'CloudFront distribution for {domain}'
+    distribution_config['ViewerCertificate'] = _viewer_certificate(certificate_arn)
     
     try:
         response = cloudfront_client.create_distribution(DistributionConfig=distribution_config)
         distribution_id = response['Distribution']['Id']
         distribution_domain = response['Distribution']['DomainName']
+        _DIST_BY_ALIAS_CACHE.pop(domain, None)
+        _save_indexed_distribution(domain, response['Distribution'])
         
         print(f"Created CloudFront distribution: {distribution_id}")
         print(f"  Domain: {distribution_domain}")
@@ -191,23 +394,17 @@ def wait_for_cloudfront_deployment(cloudfront_client, distribution_id, timeout_m
     Wait for CloudFront distribution to be deployed.
     """
     print(f"Waiting for CloudFront distribution {distribution_id} to deploy...")
-    start_time = time.time()
-    timeout_seconds = timeout_minutes * 60
-    
-    while time.time() - start_time < timeout_seconds:
-        try:
-            response = cloudfront_client.get_distribution(Id=distribution_id)
-            status = response['Distribution']['Status']
-            
-            if status == 'Deployed':
-                print("CloudFront distribution is deployed!")
-                return True
-            
-            print(f"  Status: {status} (waiting...)")
-            time.sleep(30)  # Check every 30 seconds
-        except Exception as e:
+    waiter = cloudfront_client.get_waiter('distribution_deployed')
+    try:
+        waiter.wait(
+            Id=distribution_id,
+            WaiterConfig={'Delay': 10, 'MaxAttempts': timeout_minutes * 6}
+        )
+        print("CloudFront distribution is deployed!")
+        return True
+    except WaiterError as e:
+        if e.last_response and 'Error' in e.last_response:
             print(f"Error checking CloudFront status: {e}")
-            time.sleep(30)
     
     print(f"Warning: CloudFront distribution did not deploy within {timeout_minutes} minutes")
     print("You may need to wait longer or check the AWS Console")
@@ -227,6 +424,7 @@ def invalidate_cloudfront_cache(cloudfront_client, distribution_id, paths=None):
     """
     if paths is None:
         paths = ['/*']  # Invalidate entire cache by default
+    paths = _coalesce_invalidation_paths(paths)
     
     # Create a unique caller reference using timestamp
     caller_reference = f"invalidation-{int(time.time())}"
@@ -235,19 +433,42 @@ def invalidate_cloudfront_cache(cloudfront_client, distribution_id, paths=None):
         print(f"Invalidating CloudFront cache for distribution {distribution_id}...")
         print(f"  Paths: {', '.join(paths)}")
         
-        response = cloudfront_client.create_invalidation(
-            DistributionId=distribution_id,
-            InvalidationBatch={
-                'Paths': {
-                    'Quantity': len(paths),
-                    'Items': paths
-                },
-                'CallerReference': caller_reference
-            }
-        )
+        while True:
+            try:
+                response = cloudfront_client.create_invalidation(
+                    DistributionId=distribution_id,
+                    InvalidationBatch={
+                        'Paths': {
+                            'Quantity': len(paths),
+                            'Items': paths
+                        },
+                        'CallerReference': caller_reference
+                    }
+                )
+                break
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') != 'TooManyInvalidationsInProgress':
+                    raise
+                # At the quota: wait for our oldest invalidation to finish, then retry
+                with _invalidations_lock:
+                    pending = _inflight_invalidations[distribution_id]
+                    oldest = pending.popleft() if pending else None
+                if oldest is None:
+                    raise
+                print(f"  Too many invalidations in progress, waiting for {oldest} to complete...")
+                cloudfront_client.get_waiter('invalidation_completed').wait(
+                    DistributionId=distribution_id,
+                    Id=oldest,
+                    WaiterConfig={'Delay': 10, 'MaxAttempts': 60}
+                )
         
         invalidation_id = response['Invalidation']['Id']
         status = response['Invalidation']['Status']
+        with _invalidations_lock:
+            pending = _inflight_invalidations[distribution_id]
+            pending.append(invalidation_id)
+            while len(pending) > MAX_INFLIGHT_INVALIDATIONS:
+                pending.popleft()
         
         print(f"✓ Cache invalidation created: {invalidation_id}")
         print(f"  Status: {status}")
@@ -257,3 +478,16 @@ def invalidate_cloudfront_cache(cloudfront_client, distribution_id, paths=None):
     except Exception as e:
         print(f"Error creating cache invalidation: {e}")
         raise
+
+
+def _coalesce_invalidation_paths(paths):
+    """
+    Drop duplicate paths and paths already covered by a wildcard in the list,
+    e.g. ['/a.html', '/*'] -> ['/*'] and ['/img/*', '/img/logo.png'] -> ['/img/*'].
+    """
+    unique = list(dict.fromkeys(paths))
+    prefixes = [p[:-1] for p in unique if p.endswith('*')]
+    return [
+        p for p in unique
+        if not any(p != prefix + '*' and p.startswith(prefix) for prefix in prefixes)
+    ]
@@ -2,18 +2,67 @@
 """
 Configuration loading and validation.
 """
+import os
+import copy
 import yaml
-import sys
 from .utils import parse_ephemeral_storage
 
+# Prefer the libyaml C parser; fall back to the pure-Python one
+try:
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
+
+
+# Validated configs by (absolute path, mtime, size), so re-loading an unchanged file skips YAML parsing
+_CFG_CACHE = {}
+
+# Required settings as (dotted path, error message)
+_REQUIRED_FIELDS = (
+    ('app_name', "'app_name' must be specified in the configuration"),
+    ('task.cpu', "'cpu' must be specified in the task configuration"),
+    ('task.memory', "'memory' must be specified in the task configuration"),
+    ('task.ephemeral_storage', "'ephemeral_storage' must be specified in the task configuration"),
+    ('aws.region', "'region' must be specified in the AWS configuration"),
+)
+
+
+class ConfigError(ValueError):
+    """
+    Raised by load_config when a configuration file is invalid.
+    The message lists every problem found, one per line.
+    """
+    def __init__(self, problems):
+        self.problems = list(problems)
+        super().__init__('\n'.join(f"Error: {problem}" for problem in self.problems))
+
+
+def _has_field(config, path):
+    """
+    Check whether a dotted path like 'task.cpu' is set in the config.
+    """
+    value = config
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return False
+        value = value[key]
+    return True
+
 
 def load_config(config_file):
     """
     Load configuration from YAML file.
+    Returns a fresh copy on every call, so callers may modify it.
+    Raises ConfigError listing every problem if the file is missing or invalid.
     """
     try:
-        with open(config_file, 'r') as f:
-            config = yaml.safe_load(f)
+        st = os.stat(config_file)
+        key = (os.path.abspath(config_file), st.st_mtime_ns, st.st_size)
+        if key in _CFG_CACHE:
+            return copy.deepcopy(_CFG_CACHE[key])
+        
+        with open(config_file, 'rb') as f:
+            config = yaml.load(f, Loader=_YAMLLoader)
         
         # Extract configuration values with defaults
         aws_config = config.get('aws', {})
@@ -22,15 +71,17 @@ def load_config(config_file):
         
         # Validate platform is set and is fargate
         if 'platform' not in config:
-            print("Error: 'platform' is required in the configuration file")
-            print("Please specify 'platform: \"fargate\"' or 'platform: \"fly\"'")
-            sys.exit(1)
+            raise ConfigError([
+                "'platform' is required in the configuration file\n"
+                "Please specify 'platform: \"fargate\"' or 'platform: \"fly\"'"
+            ])
         
         platform = config.get('platform', '').lower()
         if platform != 'fargate':
-            print(f"Error: This deployment script is for AWS Fargate, but platform is set to '{platform}'")
-            print("Please set 'platform: \"fargate\"' in your configuration file")
-            sys.exit(1)
+            raise ConfigError([
+                f"This deployment script is for AWS Fargate, but platform is set to '{platform}'\n"
+                "Please set 'platform: \"fargate\"' in your configuration file"
+            ])
         
         # Default IAM permissions if not specified
         default_iam_permissions = [
@@ -39,48 +90,31 @@ def load_config(config_file):
             'arn:aws:iam::aws:policy/AmazonS3FullAccess'
         ]
         
-        # Validate required fields
-        if 'app_name' not in config:
-            print("Error: 'app_name' must be specified in the configuration")
-            sys.exit(1)
-        if 'cpu' not in task_config:
-            print("Error: 'cpu' must be specified in the task configuration")
-            sys.exit(1)
-        if 'memory' not in task_config:
-            print("Error: 'memory' must be specified in the task configuration")
-            sys.exit(1)
-        if 'ephemeral_storage' not in task_config:
-            print("Error: 'ephemeral_storage' must be specified in the task configuration")
-            sys.exit(1)
-        
-        # Validate AWS configuration
-        if 'region' not in aws_config:
-            print("Error: 'region' must be specified in the AWS configuration")
-            sys.exit(1)
+        # Validate everything up front so every problem is reported in one run
+        problems = [message for path, message in _REQUIRED_FIELDS if not _has_field(config, path)]
         
         # Validate public configuration if provided
         if public_config:
             if 'domain' not in public_config:
-                print("Error: 'domain' must be specified in the public configuration")
-                sys.exit(1)
+                problems.append("'domain' must be specified in the public configuration")
             if 'mode' in public_config:
                 mode = public_config['mode']
                 if mode not in ['lightweight', 'production']:
-                    print("Error: 'mode' must be either 'lightweight' or 'production'")
-                    sys.exit(1)
+                    problems.append("'mode' must be either 'lightweight' or 'production'")
                 # Validate that lightweight mode requires exactly 1 replica
-                if mode == 'lightweight':
-                    replicas = task_config.get('replicas', 1)
-                    if replicas != 1:
-                        print("Error: invalid config - 'lightweight' mode requires replicas to be 1")
-                        sys.exit(1)
+                elif mode == 'lightweight' and task_config.get('replicas', 1) != 1:
+                    problems.append("invalid config - 'lightweight' mode requires replicas to be 1")
         
         # Parse ephemeral_storage (supports both integer and string formats like "21gb")
-        try:
-            ephemeral_storage = parse_ephemeral_storage(task_config['ephemeral_storage'])
-        except ValueError as e:
-            print(f"Error: {str(e)}")
-            sys.exit(1)
+        ephemeral_storage = None
+        if 'ephemeral_storage' in task_config:
+            try:
+                ephemeral_storage = parse_ephemeral_storage(task_config['ephemeral_storage'])
+            except ValueError as e:
+                problems.append(str(e))
+        
+        if problems:
+            raise ConfigError(problems)
         
         result = {
             'app_name': config['app_name'],
@@ -105,7 +139,9 @@ def load_config(config_file):
         if public_config and 'certificate_id' in public_config:
             result['certificate_id'] = public_config['certificate_id']
         
-        return result
+        _CFG_CACHE[key] = result
+        return copy.deepcopy(result)
+    except ConfigError:
+        raise
     except Exception as e:
-        print(f"Error loading configuration: {str(e)}")
-        sys.exit(1)
+        raise ConfigError([f"Could not load configuration: {str(e)}"]) from e
@@ -5,26 +5,120 @@ Supports both internal deployments and public-facing web apps.
 """
 import sys
 import time
-import boto3
-import urllib.request
-import urllib.error
+import socket
+import threading
+import urllib3
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from botocore.exceptions import ClientError, WaiterError
 from . import (
-    vpc, iam, logs, events, ecr, ecs, route53, cloudfront, alb, acm
+    vpc, iam, logs, events, ecr, ecs, route53, cloudfront, alb, acm, clients, utils
 )
-import boto3
+
+
+# CloudFront only accepts ACM certificates from us-east-1
+ACM_REGION = 'us-east-1'
+# Seconds between ECS task status checks while waiting for a lightweight app's task
+TASK_POLL_DELAY = 10
+# Seconds between list_tasks calls while the service has no tasks placed yet
+LIST_TASKS_DELAY = 2
+# Network interface IDs per describe_network_interfaces filter (EC2 allows 200 filter values)
+ENI_BATCH_SIZE = 200
+
+# Seconds to wait for each deployment HTTP check
+PROBE_TIMEOUT = 10
+# Seconds between quick checks for the first response after a deploy
+WARMUP_INTERVAL = 2
+# How long to wait for a new DNS record to resolve before probing; checks start
+# DNS_WAIT_MIN_INTERVAL apart and slow down linearly to DNS_WAIT_MAX_INTERVAL
+DNS_WAIT_TIMEOUT = 150
+DNS_WAIT_MIN_INTERVAL = 0.5
+DNS_WAIT_MAX_INTERVAL = 5
+# Connection pool shared by the deployment HTTP checks, so retries reuse connections
+_http = urllib3.PoolManager(
+    maxsize=4,
+    # Follow redirects (http -> https), but leave retrying to the caller's loop
+    retries=urllib3.Retry(connect=0, read=0, redirect=5),
+    headers={'User-Agent': 'Deployment-Test/1.0'}
+)
+
+
+def _list_service_tasks(ecs_client, cluster_name, service_name, deadline):
+    """
+    Return the ARNs of the service's tasks that are meant to be running,
+    retrying briefly until the scheduler has placed at least one or the deadline
+    (a time.monotonic() value) passes.
+    """
+    while True:
+        task_arns = ecs_client.list_tasks(
+            cluster=cluster_name, serviceName=service_name, desiredStatus='RUNNING'
+        )['taskArns']
+        if task_arns or time.monotonic() >= deadline:
+            return task_arns
+        print("  No tasks placed yet...")
+        time.sleep(LIST_TASKS_DELAY)
+
+
+def _eni_details(task):
+    """
+    Return (public IP, network interface ID) from a task's ENI attachment; either may be None.
+    """
+    for attachment in task.get('attachments', []):
+        if attachment['type'] == 'ElasticNetworkInterface':
+            details = {detail['name']: detail['value'] for detail in attachment.get('details', [])}
+            return details.get('publicIPv4Address'), details.get('networkInterfaceId')
+    return None, None
+
+
+def _find_public_ip(ec2_client, tasks):
+    """
+    Return the public IP of the first running task that has one, or None.
+    Tasks whose attachment details don't include the address are looked up
+    through their network interfaces, all in one filtered, paginated describe.
+    """
+    eni_ids = []
+    for task in tasks:
+        if task.get('lastStatus') != 'RUNNING':
+            continue
+        public_ip, eni_id = _eni_details(task)
+        if public_ip:
+            return public_ip
+        if eni_id:
+            eni_ids.append(eni_id)
+    
+    if not eni_ids:
+        return None
+    
+    public_ips = {}
+    try:
+        paginator = ec2_client.get_paginator('describe_network_interfaces')
+        for i in range(0, len(eni_ids), ENI_BATCH_SIZE):
+            pages = paginator.paginate(
+                Filters=[{'Name': 'network-interface-id', 'Values': eni_ids[i:i + ENI_BATCH_SIZE]}],
+                PaginationConfig={'PageSize': 100}
+            )
+            for page in pages:
+                for eni in page.get('NetworkInterfaces', []):
+                    if 'PublicIp' in eni.get('Association', {}):
+                        public_ips[eni['NetworkInterfaceId']] = eni['Association']['PublicIp']
+    except Exception as e:
+        print(f"  Note: Could not query ENI for public IP: {e}")
+    return next((public_ips[eni_id] for eni_id in eni_ids if eni_id in public_ips), None)
 
 
 def deploy_lightweight_public_app(session, config, subnet_ids, security_group_id, 
                                    task_definition_arn, cluster_name, service_name,
-                                   desired_count, use_spot, allow_create, port=8080):
+                                   desired_count, use_spot, allow_create, port=8080,
+                                   region=None, profile=None):
     """
     Deploy a lightweight public app where domain points directly to Fargate service.
     This requires the service to have a public IP and the domain to point to it.
     Note: Fargate tasks get ephemeral IPs, so this is only suitable for testing/internal use.
     """
     domain = config['public']['domain']
-    route53_client = session.client('route53')
-    ec2_client = session.client('ec2')
+    region = region or session.region_name
+    route53_client = clients.get_client('route53', region, profile)
+    ec2_client = clients.get_client('ec2', region, profile)
+    ecs_client = clients.get_client('ecs', region, profile)
     
     print(f"\n=== Deploying Lightweight Public App ===")
     print(f"Domain: {domain}")
@@ -34,131 +128,68 @@ def deploy_lightweight_public_app(session, config, subnet_ids, security_group_id
     # Ensure security group allows inbound traffic on the container port
     print(f"Ensuring security group allows inbound traffic on port {port}...")
     try:
-        # Check current security group rules
-        sg_info = ec2_client.describe_security_groups(GroupIds=[security_group_id])
-        if sg_info['SecurityGroups']:
-            sg = sg_info['SecurityGroups'][0]
-            existing_rules = sg.get('IpPermissions', [])
-            
-            # Check if port is already allowed
-            port_allowed = False
-            for rule in existing_rules:
-                if rule.get('FromPort') == port and rule.get('ToPort') == port:
-                    if rule.get('IpProtocol') in ['tcp', '-1']:
-                        port_allowed = True
-                        break
-            
-            if not port_allowed:
-                print(f"Adding inbound rule for port {port} to security group...")
-                ec2_client.authorize_security_group_ingress(
-                    GroupId=security_group_id,
-                    IpPermissions=[
-                        {
-                            'IpProtocol': 'tcp',
-                            'FromPort': port,
-                            'ToPort': port,
-                            'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
-                        }
-                    ]
-                )
-                print(f"Security group updated to allow inbound traffic on port {port}")
-            else:
-                print(f"Security group already allows inbound traffic on port {port}")
-    except ec2_client.exceptions.ClientError as e:
-        if 'InvalidPermission.Duplicate' in str(e):
+        # Adding a rule that already exists fails with InvalidPermission.Duplicate,
+        # so there's no need to read the current rules first
+        ec2_client.authorize_security_group_ingress(
+            GroupId=security_group_id,
+            IpPermissions=[
+                {
+                    'IpProtocol': 'tcp',
+                    'FromPort': port,
+                    'ToPort': port,
+                    'IpRanges': [{'CidrIp': '0.0.0.0/0'}]
+                }
+            ]
+        )
+        print(f"Security group updated to allow inbound traffic on port {port}")
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') == 'InvalidPermission.Duplicate':
             print(f"Security group already allows inbound traffic on port {port}")
         else:
             print(f"Warning: Could not update security group: {e}")
     
-    # Get the service to find its public IPs
-    ecs_client = session.client('ecs')
-    services = ecs_client.describe_services(cluster=cluster_name, services=[service_name])
-    
-    if not services['services']:
-        print("Error: Service not found")
-        sys.exit(1)
-    
-    service = services['services'][0]
-    
+    # The service was just created or updated, so go straight to its tasks
     # Wait for tasks to be running with public IPs
     print("Waiting for tasks to start and get public IPs...")
     timeout_minutes = 10
-    timeout_seconds = timeout_minutes * 60
-    start_time = time.time()
-    check_interval = 15  # Check every 15 seconds
+    deadline = time.monotonic() + timeout_minutes * 60
+    public_ip = None
     
-    while time.time() - start_time < timeout_seconds:
-        # Get running tasks
-        tasks = ecs_client.list_tasks(cluster=cluster_name, serviceName=service_name)
-        
-        if tasks['taskArns']:
-            # Get task details to find public IPs
-            task_details = ecs_client.describe_tasks(cluster=cluster_name, tasks=tasks['taskArns'])
-            
-            # Look for a task with a public IP
-            for task in task_details.get('tasks', []):
-                task_status = task.get('lastStatus', '')
-                
-                # Only check running tasks
-                if task_status == 'RUNNING':
-                    public_ip = None
-                    attachments = task.get('attachments', [])
-                    
-                    # Method 1: Check attachment details
-                    for attachment in attachments:
-                        if attachment['type'] == 'ElasticNetworkInterface':
-                            for detail in attachment.get('details', []):
-                                if detail['name'] == 'publicIPv4Address':
-                                    public_ip = detail['value']
-                                    break
-                            if public_ip:
-                                break
-                    
-                    # Method 2: If not found, try to get from network interfaces
-                    if not public_ip:
-                        # Get ENI ID from attachments
-                        eni_id = None
-                        for attachment in attachments:
-                            if attachment['type'] == 'ElasticNetworkInterface':
-                                for detail in attachment.get('details', []):
-                                    if detail['name'] == 'networkInterfaceId':
-                                        eni_id = detail['value']
-                                        break
-                                if eni_id:
-                                    break
-                        
-                        # Query EC2 for the ENI's public IP
-                        if eni_id:
-                            try:
-                                ec2_client = session.client('ec2')
-                                enis = ec2_client.describe_network_interfaces(NetworkInterfaceIds=[eni_id])
-                                if enis.get('NetworkInterfaces'):
-                                    eni = enis['NetworkInterfaces'][0]
-                                    if 'Association' in eni and 'PublicIp' in eni['Association']:
-                                        public_ip = eni['Association']['PublicIp']
-                            except Exception as e:
-                                print(f"  Note: Could not query ENI for public IP: {e}")
-                    
-                    if public_ip:
-                        print(f"Found running task with public IP: {public_ip}")
-                        
-                        # Create A record pointing to this IP
-                        route53.create_or_update_dns_record(
-                            route53_client, domain, public_ip, 
-                            record_type='A', allow_create=allow_create
-                        )
-                        print(f"DNS record created: {domain} -> {public_ip}")
-                        return
-                    else:
-                        print(f"  Task is RUNNING but no public IP found yet (checking attachments...)")
-                elif task_status in ['PENDING', 'PROVISIONING', 'ACTIVATING']:
-                    print(f"  Task status: {task_status} (waiting for RUNNING...)")
+    while public_ip is None and time.monotonic() < deadline:
+        task_arns = _list_service_tasks(ecs_client, cluster_name, service_name, deadline)
+        if not task_arns:
+            break
         
-        # If we get here, no running task with public IP found yet
-        elapsed = int(time.time() - start_time)
-        remaining = timeout_seconds - elapsed
-        print(f"  No running tasks with public IPs yet. Waiting... ({elapsed}s elapsed, {remaining}s remaining)")
-        time.sleep(check_interval)
+        remaining = deadline - time.monotonic()
+        try:
+            ecs_client.get_waiter('tasks_running').wait(
+                cluster=cluster_name,
+                tasks=task_arns,
+                WaiterConfig={'Delay': TASK_POLL_DELAY, 'MaxAttempts': max(1, int(remaining // TASK_POLL_DELAY))}
+            )
+        except WaiterError as e:
+            # A task stopped (crashed on start or replaced by a newer deployment)
+            # or we ran out of time; list the service's tasks again
+            print(f"  Tasks are not all RUNNING yet: {e}")
+            time.sleep(LIST_TASKS_DELAY)
+            continue
+        
+        task_details = ecs_client.describe_tasks(cluster=cluster_name, tasks=task_arns)
+        public_ip = _find_public_ip(ec2_client, task_details.get('tasks', []))
+        if public_ip is None:
+            print("  Task is RUNNING but no public IP found yet (checking attachments...)")
+            time.sleep(TASK_POLL_DELAY)
+    
+    if public_ip:
+        print(f"Found running task with public IP: {public_ip}")
+        
+        # Create A record pointing to this IP
+        route53.create_or_update_dns_record(
+            route53_client, domain, public_ip, 
+            record_type='A', allow_create=allow_create
+        )
+        print(f"DNS record created: {domain} -> {public_ip}")
+        return
     
     # Timeout reached
     print(f"\nWarning: No running tasks with public IPs found within {timeout_minutes} minutes.")
@@ -168,20 +199,85 @@ def deploy_lightweight_public_app(session, config, subnet_ids, security_group_id
     print("  3. Check CloudWatch logs for task startup errors")
 
 
+def _certificate_for_domain(acm_client, route53_client, domain, allow_create, account_id,
+                            cancel_event=None):
+    """
+    Find or request the CloudFront certificate for the domain, create its DNS
+    validation records and wait until it is issued. Returns the certificate ARN.
+    Setting cancel_event (a threading.Event) stops the wait for validation.
+    """
+    cert_arn = acm.request_certificate(acm_client, domain, ACM_REGION, allow_create, account_id)
+    
+    # Get validation records
+    validation_records = acm.get_certificate_validation_records(acm_client, cert_arn)
+    
+    if validation_records:
+        print(f"Creating DNS validation records in Route53...")
+        for validation_record in validation_records:
+            if validation_record['status'] != 'SUCCESS':
+                route53.create_validation_record(route53_client, validation_record, allow_create)
+        
+        # Wait for certificate validation
+        print(f"Waiting for certificate validation...")
+        acm.wait_for_certificate_validation(acm_client, cert_arn, timeout_minutes=30, cancel_event=cancel_event)
+    else:
+        cert_details = acm_client.describe_certificate(CertificateArn=cert_arn)
+        cert_status = cert_details['Certificate'].get('Status', '')
+        if cert_status == 'ISSUED':
+            print("Certificate is already issued and ready to use!")
+        else:
+            print(f"Waiting for certificate validation (current status: {cert_status})...")
+            if not acm.wait_for_certificate_validation(acm_client, cert_arn, timeout_minutes=30,
+                                                       cancel_event=cancel_event):
+                print("Error: Certificate did not validate in time. Cannot set up CDN.")
+                sys.exit(1)
+    return cert_arn
+
+
+def _start_certificate_request(region, profile, domain, allow_create, account_id):
+    """
+    Run _certificate_for_domain on a background thread, so DNS validation can
+    proceed while the image builds. Returns (future, cancel event); set the event
+    if the deploy fails so the thread stops waiting for validation. The thread is
+    a daemon, so it never holds up the process exiting either way.
+    """
+    future = Future()
+    cancel_event = threading.Event()
+    acm_client = clients.get_client('acm', ACM_REGION, profile)
+    route53_client = clients.get_client('route53', region, profile)
+    
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(_certificate_for_domain(
+                acm_client, route53_client, domain, allow_create, account_id, cancel_event
+            ))
+        except BaseException as e:
+            # Includes the SystemExit of a failed step; the caller re-raises it from result()
+            future.set_exception(e)
+    
+    threading.Thread(target=run, name='certificate-request', daemon=True).start()
+    return future, cancel_event
+
+
 def deploy_production_public_app(session, config, subnet_ids, security_group_id, vpc_id,
                                  task_definition_arn, cluster_name, service_name,
                                  desired_count, use_spot, allow_create, region, account_id, port, profile,
-                                 certificate_id=None):
+                                 certificate_id=None, certificate_future=None):
     """
     Deploy a production-ready public app with CloudFront -> ALB -> Fargate.
+    Returns (load balancer config, CDN future). The ALB and certificate are ready
+    on return; the CloudFront and DNS changes continue in the background so the
+    ECS service can be rolled out meanwhile, and the future resolves to
+    (CloudFront domain, CloudFront distribution ID).
+    certificate_future, if given, resolves to the certificate ARN (see _start_certificate_request).
     """
     domain = config['public']['domain']
-    route53_client = session.client('route53')
-    elbv2_client = session.client('elbv2')
+    route53_client = clients.get_client('route53', region, profile)
+    elbv2_client = clients.get_client('elbv2', region, profile)
     # CloudFront client can be in any region, but we'll use the deployment region
-    cloudfront_client = session.client('cloudfront')
-    ec2_client = session.client('ec2')
-    ecs_client = session.client('ecs')
+    cloudfront_client = clients.get_client('cloudfront', region, profile)
+    ec2_client = clients.get_client('ec2', region, profile)
     
     print(f"\n=== Deploying Production Public App ===")
     print(f"Domain: {domain}")
@@ -190,20 +286,25 @@ def deploy_production_public_app(session, config, subnet_ids, security_group_id,
     # Step 1: Create ALB security group
     alb_sg_id = vpc.create_alb_security_group(ec2_client, vpc_id, config['app_name'], allow_create)
     
-    # Step 2: Update Fargate security group to allow traffic from ALB
+    # Step 2: Create target group in the background; it doesn't depend on the ALB,
+    # so its describe/create overlaps the ALB lookup (or the wait for a new ALB)
+    tg_executor = ThreadPoolExecutor(max_workers=1)
+    tg_future = tg_executor.submit(
+        alb.create_target_group,
+        elbv2_client, vpc_id, config['app_name'], 
+        port=port, health_check_path='/api/health', allow_create=allow_create
+    )
+    tg_executor.shutdown(wait=False)
+    
+    # Step 3: Update Fargate security group to allow traffic from ALB
     vpc.update_fargate_security_group_for_alb(ec2_client, security_group_id, alb_sg_id, port)
     
-    # Step 3: Create ALB
+    # Step 4: Create ALB
     alb_arn, alb_dns = alb.create_application_load_balancer(
         elbv2_client, ec2_client, config['app_name'], vpc_id, 
         subnet_ids, alb_sg_id, allow_create
     )
-    
-    # Step 4: Create target group
-    tg_arn = alb.create_target_group(
-        elbv2_client, vpc_id, config['app_name'], 
-        port=port, health_check_path='/api/health', allow_create=allow_create
-    )
+    tg_arn = tg_future.result()
     
     # Step 5: Create ALB listener
     alb.create_listener(elbv2_client, alb_arn, tg_arn, allow_create)
@@ -221,23 +322,45 @@ def deploy_production_public_app(session, config, subnet_ids, security_group_id,
     print(f"  Container Port: {port}")
     print(f"  Note: Service will be created/updated with this configuration")
     
-    # Step 7: Request/get ACM certificate for CloudFront
+    # Step 7: Settle the certificate and check the CloudFront and DNS steps can go
+    # ahead, so a failure stops the deploy before the ECS service is touched
+    cert_arn, dns_record = _prepare_cdn(
+        route53_client, cloudfront_client, domain, account_id, allow_create, profile,
+        certificate_id, certificate_future
+    )
+    
+    # Steps 8-9 only create or update CloudFront and DNS, which the ECS service
+    # doesn't need, so run them in the background
+    cdn_executor = ThreadPoolExecutor(max_workers=1)
+    cdn_future = cdn_executor.submit(
+        _setup_cdn, route53_client, cloudfront_client, domain, alb_dns, region,
+        allow_create, cert_arn, dns_record
+    )
+    cdn_executor.shutdown(wait=False)
+    
+    # Return load balancer config for service creation, and the future for the
+    # CloudFront distribution (for invalidation and display)
+    return load_balancer_config, cdn_future
+
+
+def _prepare_cdn(route53_client, cloudfront_client, domain, account_id, allow_create, profile,
+                 certificate_id=None, certificate_future=None):
+    """
+    Do everything _setup_cdn can fail on up front: get the ACM certificate
+    issued, find the hosted zone and DNS record, and, when resources may not be
+    created, make sure the CloudFront distribution exists.
+    Returns (certificate ARN, prepared DNS record) for _setup_cdn.
+    """
+    # Request/get ACM certificate for CloudFront
     # CloudFront requires certificates to be in us-east-1
-    import boto3
-    acm_region = 'us-east-1'  # CloudFront requires us-east-1
-    acm_session = boto3.Session(profile_name=profile, region_name=acm_region)
-    acm_client = acm_session.client('acm')
+    acm_client = clients.get_client('acm', ACM_REGION, profile)
     
     print(f"\n=== Setting up SSL Certificate ===")
     
     # Check if a specific certificate ID was provided
     if certificate_id:
-        # Get account ID to construct the full ARN
-        sts_client = session.client('sts')
-        account_id = sts_client.get_caller_identity().get('Account')
-        
         # Construct certificate ARN from ID
-        cert_arn = f"arn:aws:acm:{acm_region}:{account_id}:certificate/{certificate_id}"
+        cert_arn = utils.build_arn('acm', ACM_REGION, account_id, f"certificate/{certificate_id}")
         
         # Verify the certificate exists and is valid
         try:
@@ -262,33 +385,34 @@ def deploy_production_public_app(session, config, subnet_ids, security_group_id,
         except Exception as e:
             print(f"Error verifying certificate: {e}")
             sys.exit(1)
+    elif certificate_future is not None:
+        # Requested when the deploy started, so validation overlapped the image build
+        cert_arn = certificate_future.result()
     else:
-        # Fall back to requesting/finding certificate by domain
-        cert_arn = acm.request_certificate(acm_client, domain, acm_region, allow_create)
-        
-        # Get validation records
-        validation_records = acm.get_certificate_validation_records(acm_client, cert_arn)
-        
-        if validation_records:
-            print(f"Creating DNS validation records in Route53...")
-            for validation_record in validation_records:
-                if validation_record['status'] != 'SUCCESS':
-                    route53.create_validation_record(route53_client, validation_record, allow_create)
-            
-            # Wait for certificate validation
-            print(f"Waiting for certificate validation...")
-            acm.wait_for_certificate_validation(acm_client, cert_arn, timeout_minutes=30)
-        else:
-            cert_details = acm_client.describe_certificate(CertificateArn=cert_arn)
-            cert_status = cert_details['Certificate'].get('Status', '')
-            if cert_status == 'ISSUED':
-                print("Certificate is already issued and ready to use!")
-            else:
-                print(f"Waiting for certificate validation (current status: {cert_status})...")
-                if not acm.wait_for_certificate_validation(acm_client, cert_arn, timeout_minutes=30):
-                    print("Error: Certificate did not validate in time. Cannot set up CDN.")
-                    sys.exit(1)
+        cert_arn = _certificate_for_domain(acm_client, route53_client, domain, allow_create, account_id)
+    
+    # Without allow_create a missing distribution can't be created later
+    if not allow_create:
+        try:
+            dist = cloudfront.find_distribution_by_alias(cloudfront_client, domain)
+        except Exception as e:
+            print(f"Note: Could not check for existing distributions: {e}")
+            dist = None
+        if not dist:
+            print(f"CloudFront distribution does not exist and resource creation is disabled.")
+            sys.exit(1)
     
+    dns_record = route53.prepare_dns_record(route53_client, domain, record_type='A', allow_create=allow_create)
+    return cert_arn, dns_record
+
+
+def _setup_cdn(route53_client, cloudfront_client, domain, alb_dns, region, allow_create,
+               cert_arn, dns_record):
+    """
+    Put CloudFront with the ACM certificate in front of the ALB and point the
+    domain at it, using the results of _prepare_cdn.
+    Returns (CloudFront domain, CloudFront distribution ID).
+    """
     # Step 8: Create CloudFront distribution with certificate
     # Use ALB DNS name (without http://)
     alb_dns_clean = alb_dns.rstrip('/')
@@ -300,7 +424,7 @@ def deploy_production_public_app(session, config, subnet_ids, security_group_id,
     # CloudFront distributions should use A record with ALIAS
     route53.create_or_update_dns_record(
         route53_client, domain, cf_domain, 
-        record_type='A', allow_create=allow_create
+        record_type='A', allow_create=allow_create, prepared=dns_record
     )
     
     print(f"\nProduction infrastructure setup complete!")
@@ -309,15 +433,95 @@ def deploy_production_public_app(session, config, subnet_ids, security_group_id,
     print(f"  ALB: {alb_dns}")
     print(f"  Note: CloudFront may take 15-20 minutes to fully deploy")
     
-    # Store CloudFront info for later display
-    config['_cloudfront_domain'] = cf_domain
-    config['_cloudfront_id'] = cf_id
-    
-    # Return load balancer config for service creation
-    return load_balancer_config
+    return cf_domain, cf_id
+
+
+def _probe_url(url):
+    """
+    Send a HEAD request to the URL (GET if HEAD isn't allowed). Returns (score, log lines):
+    1 for a 2xx/3xx response, 0.5 for a 4xx (the server is up but unhappy with the request), else 0.
+    """
+    lines = [f"\nTesting: {url}"]
+    score = 0
+    try:
+        # HEAD skips the body; connections are kept alive across retries by the pool
+        response = _http.request('HEAD', url, timeout=PROBE_TIMEOUT, redirect=True)
+        if response.status == 405:
+            response = _http.request('GET', url, timeout=PROBE_TIMEOUT, redirect=True, preload_content=False)
+            response.release_conn()
+        status_code = response.status
+        content_length = response.headers.get('Content-Length', 'unknown')
+        content_type = response.headers.get('Content-Type', 'unknown')
+        
+        if 200 <= status_code < 400:
+            lines.append(f"  ✓ SUCCESS - Status: {status_code}")
+            lines.append(f"    Content-Type: {content_type}")
+            lines.append(f"    Content-Length: {content_length}")
+            score = 1
+        else:
+            # HTTP errors (4xx, 5xx) - might still indicate the service is up
+            lines.append(f"  ⚠ HTTP Error: {status_code} {response.reason}")
+            if status_code < 500:
+                # 4xx errors mean the server is responding
+                lines.append(f"    Server is responding (client error)")
+                score = 0.5  # Partial success
+    except urllib3.exceptions.HTTPError as e:
+        reason = getattr(e, 'reason', None) or e
+        lines.append(f"  ✗ FAILED - {reason}")
+        lines.append(f"    This might be normal if DNS hasn't propagated yet")
+    except Exception as e:
+        lines.append(f"  ✗ FAILED - {str(e)}")
+    return score, lines
+
+
+def _wait_for_dns(domain):
+    """
+    Resolve the domain until it resolves or DNS_WAIT_TIMEOUT seconds have passed,
+    checking often at first, since a fresh record usually appears within seconds.
+    Returns True once it resolves.
+    """
+    deadline = time.monotonic() + DNS_WAIT_TIMEOUT
+    attempt = 0
+    while True:
+        try:
+            socket.gethostbyname(domain)
+            return True
+        except socket.gaierror:
+            if time.monotonic() >= deadline:
+                break
+            if attempt == 0:
+                print(f"\nWaiting for {domain} to resolve in DNS...")
+            attempt += 1
+            time.sleep(min(DNS_WAIT_MIN_INTERVAL * attempt, DNS_WAIT_MAX_INTERVAL))
+    print(f"  {domain} still doesn't resolve; probing anyway")
+    return False
 
 
-def test_deployment_http_requests(public_config, params):
+def _wait_for_first_response(url, max_wait):
+    """
+    Send a quick HEAD request to the URL every WARMUP_INTERVAL seconds until
+    anything answers or max_wait seconds have passed. Returns True if it answered.
+    Each request's connect and read together are cut off at the interval, so the
+    whole wait never runs past max_wait.
+    """
+    deadline = time.monotonic() + max_wait
+    while True:
+        started = time.monotonic()
+        remaining = deadline - started
+        if remaining <= 0:
+            return False
+        try:
+            _http.request('HEAD', url, timeout=urllib3.Timeout(total=min(WARMUP_INTERVAL, remaining)),
+                          redirect=False)
+            return True
+        except urllib3.exceptions.HTTPError:
+            # Sleep out whatever is left of this interval
+            pause = min(started + WARMUP_INTERVAL, deadline) - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+
+
+def test_deployment_http_requests(public_config, cloudfront_domain=None):
     """
     Test HTTP requests to the deployed domain to verify everything works.
     Retries every 10 seconds for up to 10 minutes if checks fail.
@@ -329,14 +533,6 @@ def test_deployment_http_requests(public_config, params):
     print("Testing Deployment with HTTP Requests")
     print("="*80)
     
-    # Wait a bit for services to be ready (especially for CloudFront)
-    if mode == 'production':
-        print("\nWaiting 30 seconds for CloudFront distribution to propagate...")
-        time.sleep(30)
-    else:
-        print("\nWaiting 15 seconds for service to be ready...")
-        time.sleep(15)
-    
     # Test URLs to try
     test_urls = []
     if mode == 'production':
@@ -349,51 +545,43 @@ def test_deployment_http_requests(public_config, params):
         test_urls.append(f"http://{domain}")
     
     # Also test CloudFront domain if available
-    if '_cloudfront_domain' in params:
-        test_urls.append(f"https://{params['_cloudfront_domain']}")
+    if cloudfront_domain:
+        test_urls.append(f"https://{cloudfront_domain}")
+    
+    # A record written moments ago may not resolve yet; every probe would just fail until it does
+    _wait_for_dns(domain)
+    
+    # Wait for the service to answer at all (especially CloudFront), but no longer than needed
+    if mode == 'production':
+        print("\nWaiting up to 30 seconds for CloudFront distribution to propagate...")
+        _wait_for_first_response(test_urls[0], 30)
+    else:
+        print("\nWaiting up to 15 seconds for service to be ready...")
+        _wait_for_first_response(test_urls[0], 15)
     
     total_tests = len(test_urls)
     max_retry_time = 600  # 10 minutes in seconds
     retry_interval = 10  # 10 seconds
-    start_time = time.time()
+    deadline = time.monotonic() + max_retry_time
     attempt = 1
     
     while True:
         print(f"\n--- Attempt {attempt} ---")
         success_count = 0
         
-        for url in test_urls:
-            print(f"\nTesting: {url}")
-            try:
-                # Create request with timeout
-                req = urllib.request.Request(url)
-                req.add_header('User-Agent', 'Deployment-Test/1.0')
-                
-                with urllib.request.urlopen(req, timeout=30) as response:
-                    status_code = response.getcode()
-                    content_length = response.headers.get('Content-Length', 'unknown')
-                    content_type = response.headers.get('Content-Type', 'unknown')
-                    
-                    if 200 <= status_code < 400:
-                        print(f"  ✓ SUCCESS - Status: {status_code}")
-                        print(f"    Content-Type: {content_type}")
-                        print(f"    Content-Length: {content_length}")
-                        success_count += 1
-                    else:
-                        print(f"  ⚠ WARNING - Status: {status_code}")
-                        print(f"    Content-Type: {content_type}")
-            except urllib.error.HTTPError as e:
-                # HTTP errors (4xx, 5xx) - might still indicate the service is up
-                print(f"  ⚠ HTTP Error: {e.code} {e.reason}")
-                if e.code < 500:
-                    # 4xx errors mean the server is responding
-                    print(f"    Server is responding (client error)")
-                    success_count += 0.5  # Partial success
-            except urllib.error.URLError as e:
-                print(f"  ✗ FAILED - {e.reason}")
-                print(f"    This might be normal if DNS hasn't propagated yet")
-            except Exception as e:
-                print(f"  ✗ FAILED - {str(e)}")
+        # Probe every URL at once and stop as soon as enough have answered;
+        # probes still running are abandoned rather than waited for
+        executor = ThreadPoolExecutor(max_workers=len(test_urls))
+        try:
+            futures = [executor.submit(_probe_url, url) for url in test_urls]
+            for future in as_completed(futures):
+                score, lines = future.result()
+                print("\n".join(lines))
+                success_count += score
+                if success_count >= total_tests * 0.5:
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         
         print("\n" + "-"*80)
         print(f"Test Results: {success_count}/{total_tests} successful")
@@ -405,8 +593,8 @@ def test_deployment_http_requests(public_config, params):
             return
         
         # Check if we've exceeded the retry time limit
-        elapsed_time = time.time() - start_time
-        if elapsed_time >= max_retry_time:
+        remaining_time = deadline - time.monotonic()
+        if remaining_time <= 0:
             print("✗ All tests failed after 10 minutes of retrying")
             print("  Please check:")
             print("  1. DNS propagation (can take a few minutes)")
@@ -416,7 +604,6 @@ def test_deployment_http_requests(public_config, params):
             return
         
         # Wait before retrying
-        remaining_time = max_retry_time - elapsed_time
         print(f"⚠ Some tests failed - retrying in {retry_interval} seconds...")
         print(f"  (Will continue retrying for up to {int(remaining_time)} more seconds)")
         print("  CloudFront can take 15-20 minutes to fully deploy")
@@ -425,6 +612,17 @@ def test_deployment_http_requests(public_config, params):
         attempt += 1
 
 
+def _invalidate_cloudfront(cloudfront_client, distribution_id):
+    """
+    Invalidate the distribution's cache; failures are reported but not fatal.
+    """
+    try:
+        cloudfront.invalidate_cloudfront_cache(cloudfront_client, distribution_id)
+    except Exception as e:
+        print(f"Warning: Failed to invalidate CloudFront cache: {e}")
+        print("  You may need to manually invalidate the cache or wait for TTL to expire")
+
+
 def deploy_to_fargate(config_dict=None, **kwargs):
     """
     Deploy the application to AWS Fargate with configurable settings.
@@ -452,6 +650,7 @@ def deploy_to_fargate(config_dict=None, **kwargs):
     iam_permissions = params.get('iam_permissions')
     custom_iam_policy = params.get('custom_iam_policy')
     dockerfile = params.get('dockerfile', 'Dockerfile')
+    build_context = params.get('build_context', '.')
     public_config = params.get('public')
     port = params.get('port', 8080)
     certificate_id = params.get('certificate_id')
@@ -467,19 +666,20 @@ def deploy_to_fargate(config_dict=None, **kwargs):
         sys.exit(1)
     
     # Use the specified profile for AWS credentials and region
-    session = boto3.Session(profile_name=profile, region_name=region)
+    session = clients.get_session(profile, region)
+    
+    region = session.region_name
     
-    # Initialize AWS clients
-    ecr_client = session.client('ecr')
-    ecs_client = session.client('ecs')
-    ec2_client = session.client('ec2')
-    iam_client = session.client('iam')
-    events_client = session.client('events')
-    logs_client = session.client('logs')
+    # Initialize AWS clients; the production steps below get the same shared ones
+    ecr_client = clients.get_client('ecr', region, profile)
+    ecs_client = clients.get_client('ecs', region, profile)
+    ec2_client = clients.get_client('ec2', region, profile)
+    iam_client = clients.get_client('iam', region, profile)
+    events_client = clients.get_client('events', region, profile)
+    logs_client = clients.get_client('logs', region, profile)
     
     # Configuration
-    region = session.region_name
-    account_id = session.client('sts').get_caller_identity().get('Account')
+    account_id = clients.get_account_id(profile, region)
     cluster_name = f"{app_name}-cluster"
     task_family = f"{app_name}-task"
     if service_name is None:
@@ -489,8 +689,16 @@ def deploy_to_fargate(config_dict=None, **kwargs):
     desired_count = replicas
     capacity_provider = 'FARGATE_SPOT' if use_spot else 'FARGATE'
     
+    certificate_future = certificate_cancel = None
     try:
-        # Step 0: Get VPC resources and ensure IAM role exists
+        # Request the certificate now so its DNS validation overlaps the image build
+        if public_config and public_config.get('mode', 'production') == 'production' and not certificate_id:
+            print(f"Requesting SSL certificate for {public_config['domain']} in the background...")
+            certificate_future, certificate_cancel = _start_certificate_request(
+                region, profile, public_config['domain'], allow_create, account_id
+            )
+        
+        # Step 0: Get VPC resources
         subnet_ids, security_group_id, vpc_id = vpc.get_default_vpc_resources(
             ec2_client, app_name, allow_create
         )
@@ -514,29 +722,37 @@ def deploy_to_fargate(config_dict=None, **kwargs):
                 'arn:aws:iam::aws:policy/AmazonS3FullAccess'
             ]
         
-        execution_role_arn = iam.ensure_ecs_execution_role(
-            iam_client, account_id, iam_permissions, custom_iam_policy, allow_create
-        )
-        
-        # Create CloudWatch log group
+        # Step 1: The IAM role, log group, ECR repository and ECS cluster don't
+        # depend on each other, so set them up at the same time
         log_group_name = f"/ecs/{app_name}"
-        logs.ensure_cloudwatch_log_group(logs_client, log_group_name, allow_create)
-        
-        # Step 1: Setup ECR repository
         repository_name = app_name.lower()
-        ecr.setup_ecr_repository(ecr_client, repository_name, allow_create)
-        
-        # Step 2: Build and push Docker image
-        image_name = ecr.build_and_push_image(
-            ecr_client, repository_name, region, profile, dockerfile
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            role_future = executor.submit(
+                iam.ensure_ecs_execution_role,
+                iam_client, account_id, iam_permissions, custom_iam_policy, allow_create
+            )
+            setup_futures = [
+                executor.submit(logs.ensure_cloudwatch_log_group, logs_client, log_group_name, allow_create),
+                executor.submit(ecr.setup_ecr_repository, ecr_client, repository_name, allow_create),
+                executor.submit(ecs.ensure_cluster, ecs_client, cluster_name, allow_create),
+            ]
+        # result() re-raises anything a step raised, including its sys.exit
+        execution_role_arn = role_future.result()
+        for future in setup_futures:
+            future.result()
+        
+        # Step 2: Enable event capture (needs the cluster). The app runs without it,
+        # so it is set up in the background and only checked once the deploy is done
+        events_executor = ThreadPoolExecutor(max_workers=1)
+        events_future = events_executor.submit(
+            events.enable_event_capture,
+            events_client, logs_client, cluster_name, region, account_id, allow_create
         )
+        events_executor.shutdown(wait=False)
         
-        # Step 3: Setup ECS cluster
-        ecs.ensure_cluster(ecs_client, cluster_name, allow_create)
-        
-        # Enable event capture
-        events.enable_event_capture(
-            events_client, logs_client, cluster_name, region, account_id, allow_create
+        # Step 3: Build and push Docker image
+        image_name = ecr.build_and_push_image(
+            ecr_client, repository_name, region, profile, dockerfile, build_context
         )
         
         # Step 4: Register task definition
@@ -547,18 +763,19 @@ def deploy_to_fargate(config_dict=None, **kwargs):
         )
         
         # Step 5: Handle public app deployment if configured
-        load_balancer_config = None
+        load_balancer_config = cdn_future = None
+        cf_domain = cf_id = None
         if public_config:
             mode = public_config.get('mode', 'production')
             
             if mode == 'production':
-                # For production, set up ALB first, then create service with load balancer
-                # deploy_production_public_app stores CloudFront info in params
-                load_balancer_config = deploy_production_public_app(
+                # For production, set up ALB first, then create service with load balancer;
+                # CloudFront and DNS are finished in the background while the service rolls out
+                load_balancer_config, cdn_future = deploy_production_public_app(
                     session, params, subnet_ids, security_group_id, vpc_id,
                     task_definition_arn, cluster_name, service_name,
                     desired_count, use_spot, allow_create, region, account_id, port, profile,
-                    certificate_id=certificate_id
+                    certificate_id=certificate_id, certificate_future=certificate_future
                 )
         
         # Step 6: Create or update ECS service
@@ -571,75 +788,87 @@ def deploy_to_fargate(config_dict=None, **kwargs):
         # Step 6.5: Wait for ALB targets to become healthy (for production mode)
         if load_balancer_config and public_config and public_config.get('mode') == 'production':
             print(f"\nWaiting for ECS tasks to register with ALB and become healthy...")
-            elbv2_client = session.client('elbv2')
+            elbv2_client = clients.get_client('elbv2', region, profile)
             alb.wait_for_healthy_targets(
                 elbv2_client, ecs_client, cluster_name, service_name,
                 load_balancer_config['targetGroupArn'], timeout_minutes=10
             )
         
-        # Step 6.6: Invalidate CloudFront cache so users get the new deployment immediately
-        if '_cloudfront_id' in params:
+        if cdn_future:
+            cf_domain, cf_id = cdn_future.result()
+        
+        # Step 6.6: Invalidate CloudFront cache so users get the new deployment immediately;
+        # it runs in the background while the remaining steps and HTTP checks proceed
+        invalidation_future = None
+        if cf_id:
             print(f"\n=== Invalidating CloudFront Cache ===")
-            try:
-                cloudfront_client = session.client('cloudfront')
-                cloudfront.invalidate_cloudfront_cache(cloudfront_client, params['_cloudfront_id'])
-            except Exception as e:
-                print(f"Warning: Failed to invalidate CloudFront cache: {e}")
-                print("  You may need to manually invalidate the cache or wait for TTL to expire")
+            invalidation_executor = ThreadPoolExecutor(max_workers=1)
+            invalidation_future = invalidation_executor.submit(
+                _invalidate_cloudfront, clients.get_client('cloudfront', region, profile), cf_id
+            )
+            invalidation_executor.shutdown(wait=False)
         
         # Step 7: Handle lightweight public app DNS (after service is created)
         if public_config and public_config.get('mode') == 'lightweight':
             deploy_lightweight_public_app(
                 session, params, subnet_ids, security_group_id,
                 task_definition_arn, cluster_name, service_name,
-                desired_count, use_spot, allow_create, port
+                desired_count, use_spot, allow_create, port, region, profile
             )
         
-        print("\nDeployment initiated successfully!")
-        print("All resources were created or updated automatically.")
-        print(f"Using subnets: {', '.join(subnet_ids)}")
-        print(f"Using security group: {security_group_id}")
-        print(f"Using execution role: {execution_role_arn}")
-        print(f"Deploying {desired_count} {'Spot ' if use_spot else ''}instances")
-        
-        # Print AWS Console links
-        print("\n" + "="*80)
-        print("AWS Console Links:")
-        print("="*80)
-        cluster_url = f"https://{region}.console.aws.amazon.com/ecs/v2/clusters/{cluster_name}/services?region={region}"
-        service_url = f"https://{region}.console.aws.amazon.com/ecs/v2/clusters/{cluster_name}/services/{service_name}?region={region}"
-        logs_url = f"https://{region}.console.aws.amazon.com/cloudwatch/home?region={region}#logsV2:log-groups/log-group/$252Fecs$252F{app_name}"
-        
-        print(f"\nCluster Overview:")
-        print(f"  {cluster_url}")
-        print(f"\nService Details:")
-        print(f"  {service_url}")
-        print(f"\nCloudWatch Logs:")
-        print(f"  {logs_url}")
+        # enable_event_capture exits on failure; by now the service is deployed, so only warn
+        try:
+            events_future.result()
+        except (Exception, SystemExit):
+            print("Warning: ECS event capture was not set up, see the error above")
+        
+        # Build the summary and AWS Console links, then write them in one go
+        console = f"https://{region}.console.aws.amazon.com"
+        lines = [
+            "\nDeployment initiated successfully!",
+            "All resources were created or updated automatically.",
+            f"Using subnets: {', '.join(subnet_ids)}",
+            f"Using security group: {security_group_id}",
+            f"Using execution role: {execution_role_arn}",
+            f"Deploying {desired_count} {'Spot ' if use_spot else ''}instances",
+            "\n" + "="*80,
+            "AWS Console Links:",
+            "="*80,
+            "\nCluster Overview:",
+            f"  {console}/ecs/v2/clusters/{cluster_name}/services?region={region}",
+            "\nService Details:",
+            f"  {console}/ecs/v2/clusters/{cluster_name}/services/{service_name}?region={region}",
+            "\nCloudWatch Logs:",
+            f"  {console}/cloudwatch/home?region={region}#logsV2:log-groups/log-group/$252Fecs$252F{app_name}",
+        ]
         
         if public_config:
-            print(f"\nPublic Domain:")
-            domain_url = f"http://{public_config['domain']}"
+            lines.append("\nPublic Domain:")
+            lines.append(f"  http://{public_config['domain']}")
             if public_config.get('mode') == 'production':
                 # For production, show both HTTP and HTTPS
-                print(f"  {domain_url}")
-                print(f"  https://{public_config['domain']}")
+                lines.append(f"  https://{public_config['domain']}")
                 # Show CloudFront URL if available
-                if '_cloudfront_domain' in params:
-                    print(f"\nCloudFront Distribution URL:")
-                    print(f"  https://{params['_cloudfront_domain']}")
-            else:
-                # For lightweight, just show HTTP
-                print(f"  {domain_url}")
+                if cf_domain:
+                    lines.append("\nCloudFront Distribution URL:")
+                    lines.append(f"  https://{cf_domain}")
         
-        print("\n" + "="*80 + "\n")
+        lines.append("\n" + "="*80 + "\n")
+        print("\n".join(lines))
         
         # Test HTTP requests to verify deployment
         if public_config:
-            test_deployment_http_requests(public_config, params)
+            test_deployment_http_requests(public_config, cf_domain)
+        
+        if invalidation_future:
+            invalidation_future.result()
         
     except Exception as e:
         print(f"Error during deployment: {str(e)}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        # Stop waiting for certificate validation if any step failed or was interrupted
+        if certificate_cancel is not None:
+            certificate_cancel.set()
@@ -2,30 +2,96 @@
 """
 Docker utilities for building and pushing images.
 """
+import os
+import socket
 import subprocess
 import sys
 import time
 
 
-def ensure_docker_running():
+# Seconds between daemon readiness checks while Docker Desktop starts
+SOCKET_POLL_INTERVAL = 0.25
+DOCKER_INFO_POLL_INTERVAL = 2
+DOCKER_START_TIMEOUT = 120
+
+
+def _docker_endpoints():
     """
-    Check if Docker daemon is running, and start Docker Desktop if it's not.
+    Addresses the Docker daemon API may be listening on, as socket.connect
+    arguments: a Unix socket path or a (host, port) pair. DOCKER_HOST wins if set
+    (TLS endpoints are left to the docker CLI); otherwise the standard Linux
+    socket and the Docker Desktop per-user socket.
+    """
+    docker_host = os.environ.get('DOCKER_HOST', '')
+    if docker_host.startswith('unix://'):
+        return [docker_host[len('unix://'):]]
+    if docker_host.startswith('tcp://') and not os.environ.get('DOCKER_TLS_VERIFY'):
+        host, _, port = docker_host[len('tcp://'):].rstrip('/').rpartition(':')
+        return [(host, int(port))] if host and port.isdigit() else []
+    if docker_host:
+        return []
+    return ['/var/run/docker.sock', os.path.expanduser('~/.docker/run/docker.sock')]
+
+
+def _ping_docker(endpoint):
+    """
+    Send GET /_ping to the daemon API. Returns True if it answered 200.
+    """
+    try:
+        if isinstance(endpoint, tuple):
+            sock = socket.create_connection(endpoint, timeout=1)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with sock:
+            if not isinstance(endpoint, tuple):
+                sock.settimeout(1)
+                sock.connect(endpoint)
+            sock.sendall(b"GET /_ping HTTP/1.0\r\nHost: docker\r\n\r\n")
+            status_line = sock.recv(64).split(b"\r\n", 1)[0]
+        return status_line.split(b" ")[1:2] == [b"200"]
+    except (OSError, AttributeError):
+        # Daemon not listening (yet), or no AF_UNIX on this platform
+        return False
+
+
+def _docker_info_ok():
+    """
+    Ask the docker CLI whether the daemon responds. Slower than the API ping,
+    but works for TLS hosts and contexts the endpoints above don't cover.
     """
     try:
-        # Check if Docker daemon is responding
         result = subprocess.run(
             ['docker', 'info'],
             capture_output=True,
             text=True,
             timeout=5
         )
-        
-        if result.returncode == 0:
+        return result.returncode == 0
+    except subprocess.TimeoutExpired:
+        return False
+
+
+def _docker_responding():
+    """
+    Check whether the Docker daemon responds, trying the cheap API ping first.
+    """
+    if any(_ping_docker(endpoint) for endpoint in _docker_endpoints()):
+        return True
+    return _docker_info_ok()
+
+
+def ensure_docker_running():
+    """
+    Check if Docker daemon is running, and start Docker Desktop if it's not.
+    """
+    try:
+        # Check if Docker daemon is responding
+        if _docker_responding():
             print("Docker daemon is running")
             return True
         else:
             print("Docker daemon is not responding, attempting to start Docker Desktop...")
-    except (subprocess.TimeoutExpired, FileNotFoundError):
+    except FileNotFoundError:
         print("Docker is not available, attempting to start Docker Desktop...")
     
     # Try to start Docker Desktop (macOS)
@@ -37,23 +103,22 @@ def ensure_docker_running():
         )
         print("Docker Desktop is starting, waiting for daemon to be ready... (if it hangs here, kill the script, open docker desktop, and try again)")
         
-        # Wait for Docker daemon to be ready (up to 60 seconds)
-        for i in range(60):
-            time.sleep(2)
-            try:
-                result = subprocess.run(
-                    ['docker', 'info'],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
+        # Wait for Docker daemon to be ready (up to DOCKER_START_TIMEOUT seconds).
+        # Poll the API often, since a ping is cheap; fall back to docker info now and then.
+        deadline = time.monotonic() + DOCKER_START_TIMEOUT
+        next_info_check = time.monotonic() + DOCKER_INFO_POLL_INTERVAL
+        while time.monotonic() < deadline:
+            time.sleep(SOCKET_POLL_INTERVAL)
+            if any(_ping_docker(endpoint) for endpoint in _docker_endpoints()):
+                print("Docker daemon is now running")
+                return True
+            if time.monotonic() >= next_info_check:
+                next_info_check = time.monotonic() + DOCKER_INFO_POLL_INTERVAL
+                if _docker_info_ok():
                     print("Docker daemon is now running")
                     return True
-            except subprocess.TimeoutExpired:
-                continue
         
-        print("Error: Docker daemon did not start within 60 seconds")
+        print(f"Error: Docker daemon did not start within {DOCKER_START_TIMEOUT} seconds")
         print("Please start Docker Desktop manually and try again.")
         sys.exit(1)
         
@@ -2,13 +2,24 @@
 """
 ECR repository management.
 """
+import base64
+import os
 import sys
+import threading
 import uuid
-import boto3
+from datetime import datetime, timedelta, timezone
 from . import utils
+from . import clients
 from . import docker
 
 
+# Registries docker is logged in to this session -> token expiry (tokens last 12 hours)
+_ecr_logins = {}
+_ecr_logins_lock = threading.Lock()
+# Log in again this long before the token expires
+LOGIN_EXPIRY_MARGIN = timedelta(minutes=5)
+
+
 def setup_ecr_repository(ecr_client, repository_name, allow_create=False):
     """
     Check if ECR repository exists, create if needed.
@@ -25,50 +36,60 @@ def setup_ecr_repository(ecr_client, repository_name, allow_create=False):
         print(f"Created ECR repository: {repository_name}")
 
 
-def build_and_push_image(ecr_client, repository_name, region, profile, dockerfile='Dockerfile'):
+def login_to_ecr(ecr_client, registry):
+    """
+    Log docker in to the ECR registry with a token from the ECR API.
+    The login is reused until shortly before the token expires.
+    """
+    with _ecr_logins_lock:
+        expires_at = _ecr_logins.get(registry)
+        if expires_at and datetime.now(timezone.utc) < expires_at - LOGIN_EXPIRY_MARGIN:
+            return
+        
+        print("Logging in to ECR...")
+        auth = ecr_client.get_authorization_token()['authorizationData'][0]
+        username, password = base64.b64decode(auth['authorizationToken']).decode().split(':', 1)
+        utils.run_command(
+            ['docker', 'login', '--username', username, '--password-stdin', registry],
+            "Failed to login to ECR",
+            input=password
+        )
+        _ecr_logins[registry] = auth['expiresAt']
+
+
+def build_and_push_image(ecr_client, repository_name, region, profile, dockerfile='Dockerfile',
+                         build_context='.'):
     """
     Build Docker image and push to ECR.
+    The context directory is passed to docker rather than changed into, and a
+    relative dockerfile is taken to be inside it.
     Returns the image URI.
     """
     # Get account ID
-    session = boto3.Session(profile_name=profile, region_name=region)
-    account_id = session.client('sts').get_caller_identity().get('Account')
+    account_id = clients.get_account_id(profile, region)
     
     # Generate a unique identifier for this deployment
     deployment_id = str(uuid.uuid4())[:8]
     image_tag = f"latest-{deployment_id}"
     image_name = f"{account_id}.dkr.ecr.{region}.amazonaws.com/{repository_name}:{image_tag}"
     
+    dockerfile_path = os.path.join(build_context, dockerfile)
+    
     # Ensure Docker is running
     docker.ensure_docker_running()
     
-    # Build Docker image
-    print(f"Building Docker image for linux/amd64 platform using {dockerfile}...")
-    utils.run_command(
-        f"docker build --platform=linux/amd64 -f {dockerfile} -t {repository_name}:{image_tag} .",
-        "Failed to build Docker image",
-        stream_output=True
-    )
-    
-    # Tag Docker image for ECR
-    print("Tagging Docker image for ECR...")
-    utils.run_command(
-        f"docker tag {repository_name}:{image_tag} {image_name}",
-        "Failed to tag Docker image"
-    )
-    
-    # Login to ECR
-    print("Logging in to ECR...")
-    utils.run_command(
-        f"aws ecr get-login-password --region {region} --profile {profile} | docker login --username AWS --password-stdin {account_id}.dkr.ecr.{region}.amazonaws.com",
-        "Failed to login to ECR"
-    )
+    # Log in before the build so BuildKit can push layers as soon as they're built
+    login_to_ecr(ecr_client, f"{account_id}.dkr.ecr.{region}.amazonaws.com")
     
-    # Push Docker image
-    print("Pushing Docker image to ECR...")
+    # Build and push Docker image in one BuildKit run (no shell), skipping
+    # provenance attestations, which cost a few seconds and aren't used here
+    print(f"Building and pushing Docker image for linux/amd64 platform using {dockerfile}...")
     utils.run_command(
-        f"docker push {image_name}",
-        "Failed to push Docker image to ECR",
+        [
+            'docker', 'buildx', 'build', '--platform=linux/amd64', '--provenance=false', '--push',
+            '-f', dockerfile_path, '-t', image_name, build_context
+        ],
+        "Failed to build and push Docker image to ECR",
         stream_output=True
     )
     
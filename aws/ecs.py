@@ -3,43 +3,72 @@
 ECS cluster, service, and task definition management.
 """
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+# Cluster configuration every deploy expects: Fargate capacity providers with no
+# default strategy, and Container Insights with enhanced observability
+CLUSTER_CAPACITY_PROVIDERS = ['FARGATE', 'FARGATE_SPOT']
+CLUSTER_SETTINGS = [
+    {
+        'name': 'containerInsights',
+        'value': 'enhanced'
+    },
+]
 
 
 def ensure_cluster(ecs_client, cluster_name, allow_create=False):
     """
-    Ensure ECS cluster exists.
+    Ensure ECS cluster exists with the expected capacity providers and settings.
+    Nothing is written when an existing cluster is already configured.
     """
-    clusters = ecs_client.describe_clusters(clusters=[cluster_name])
-    cluster_exists = bool(clusters['clusters'])
+    clusters = ecs_client.describe_clusters(clusters=[cluster_name], include=['SETTINGS'])
+    # A deleted cluster is still described for a while, as INACTIVE
+    cluster = next((c for c in clusters['clusters'] if c.get('status') != 'INACTIVE'), None)
     
-    if cluster_exists:
-        print(f"ECS cluster {cluster_name} already exists")
-    else:
+    if cluster is None:
         if not allow_create:
             print(f"ECS cluster '{cluster_name}' does not exist and resource creation is disabled.")
             sys.exit(1)
-            
-        ecs_client.create_cluster(clusterName=cluster_name)
+        
+        # A new cluster can be created fully configured
+        ecs_client.create_cluster(
+            clusterName=cluster_name,
+            capacityProviders=CLUSTER_CAPACITY_PROVIDERS,
+            defaultCapacityProviderStrategy=[],
+            settings=CLUSTER_SETTINGS
+        )
         print(f"Created ECS cluster: {cluster_name}")
+        print(f"Enabled Container Insights with enhanced observability on cluster: {cluster_name}")
+        return
     
-    # Enable Container Insights with enhanced observability
-    ecs_client.put_cluster_capacity_providers(
-        cluster=cluster_name,
-        capacityProviders=['FARGATE', 'FARGATE_SPOT'],
-        defaultCapacityProviderStrategy=[],
-    )
+    print(f"ECS cluster {cluster_name} already exists")
     
-    cluster_settings = [
-        {
-            'name': 'containerInsights',
-            'value': 'enhanced'
-        },
-    ]
+    # Only issue the updates the cluster actually needs; they're independent, so
+    # any that are needed go out together
+    current_settings = {setting['name']: setting['value'] for setting in cluster.get('settings', [])}
+    updates = []
+    if (set(cluster.get('capacityProviders', [])) != set(CLUSTER_CAPACITY_PROVIDERS)
+            or cluster.get('defaultCapacityProviderStrategy')):
+        updates.append((ecs_client.put_cluster_capacity_providers, {
+            'cluster': cluster_name,
+            'capacityProviders': CLUSTER_CAPACITY_PROVIDERS,
+            'defaultCapacityProviderStrategy': [],
+        }))
+    if any(current_settings.get(setting['name']) != setting['value'] for setting in CLUSTER_SETTINGS):
+        updates.append((ecs_client.update_cluster_settings, {
+            'cluster': cluster_name,
+            'settings': CLUSTER_SETTINGS,
+        }))
     
-    ecs_client.update_cluster_settings(
-        cluster=cluster_name,
-        settings=cluster_settings
-    )
+    if not updates:
+        print("Cluster capacity providers and Container Insights are already configured")
+        return
+    
+    with ThreadPoolExecutor(max_workers=len(updates)) as executor:
+        futures = [executor.submit(method, **kwargs) for method, kwargs in updates]
+        for future in as_completed(futures):
+            future.result()
     print(f"Enabled Container Insights with enhanced observability on cluster: {cluster_name}")
 
 
@@ -78,7 +107,7 @@ def register_task_definition(ecs_client, task_family, image_name, app_name, regi
         container_def['environment'] = [
             {'name': key, 'value': value} for key, value in environment_variables.items()
         ]
-        print(f"Adding environment variables: {', '.join(environment_variables.keys())}")
+        print(f"Adding environment variables: {', '.join(environment_variables)}")
     
     # Prepare task definition parameters
     task_def_params = {
@@ -94,7 +123,7 @@ def register_task_definition(ecs_client, task_family, image_name, app_name, regi
     
     # Add ephemeral storage configuration if specified
     if ephemeral_storage and ephemeral_storage >= 20:
-        storage_size = min(max(ephemeral_storage, 20), 200)
+        storage_size = min(ephemeral_storage, 200)
         task_def_params['ephemeralStorage'] = {
             'sizeInGiB': storage_size
         }
@@ -109,6 +138,32 @@ def register_task_definition(ecs_client, task_family, image_name, app_name, regi
     return task_definition_arn
 
 
+def _service_up_to_date(service, task_definition_arn, desired_count, capacity_provider,
+                        network_config, load_balancer_config):
+    """
+    True if the described service already runs the wanted task definition with the
+    wanted count, capacity provider, network and load balancer, and has settled.
+    """
+    current_vpc = service.get('networkConfiguration', {}).get('awsvpcConfiguration', {})
+    wanted_vpc = network_config['awsvpcConfiguration']
+    current_providers = [(s['capacityProvider'], s.get('weight')) for s in service.get('capacityProviderStrategy', [])]
+    current_lbs = [(lb.get('targetGroupArn'), lb.get('containerName'), lb.get('containerPort'))
+                   for lb in service.get('loadBalancers', [])]
+    wanted_lbs = [(lb['targetGroupArn'], lb['containerName'], lb['containerPort'])
+                  for lb in ([load_balancer_config] if load_balancer_config else [])]
+    return (
+        service.get('taskDefinition') == task_definition_arn
+        and service.get('desiredCount') == desired_count
+        and current_providers == [(capacity_provider, 1)]
+        and sorted(current_vpc.get('subnets', [])) == sorted(wanted_vpc['subnets'])
+        and current_vpc.get('securityGroups') == wanted_vpc['securityGroups']
+        and current_vpc.get('assignPublicIp') == wanted_vpc['assignPublicIp']
+        and (not load_balancer_config or current_lbs == wanted_lbs)
+        and service.get('runningCount') == desired_count
+        and len(service.get('deployments', [])) == 1
+    )
+
+
 def create_or_update_service(ecs_client, cluster_name, service_name, task_definition_arn,
                             desired_count, use_spot, subnet_ids, security_group_id,
                             allow_create=False, load_balancer_config=None):
@@ -137,13 +192,19 @@ def create_or_update_service(ecs_client, cluster_name, service_name, task_defini
         current_service = services['services'][0]
         current_load_balancers = current_service.get('loadBalancers', [])
         
-        # Update existing service
+        if _service_up_to_date(current_service, task_definition_arn, desired_count, capacity_provider,
+                               network_config, load_balancer_config):
+            print(f"Service {service_name} already runs {task_definition_arn} as configured, no changes")
+            return {'service': current_service}
+        
+        # Update existing service. A new task definition starts a deployment by
+        # itself; only a re-run of the same revision needs forcing
         update_params = {
             'cluster': cluster_name,
             'service': service_name,
             'taskDefinition': task_definition_arn,
             'desiredCount': desired_count,
-            'forceNewDeployment': True,
+            'forceNewDeployment': current_service.get('taskDefinition') == task_definition_arn,
             'capacityProviderStrategy': [
                 {
                     'capacityProvider': capacity_provider,
@@ -2,8 +2,13 @@
 """
 EventBridge event capture for ECS clusters.
 """
-import json
 import sys
+from . import logs
+from . import utils
+
+
+# EventBridge rules confirmed to exist in this process, by name
+_existing_rules = set()
 
 
 def enable_event_capture(events_client, logs_client, cluster_name, region, account_id, allow_create=False):
@@ -20,23 +25,18 @@ def enable_event_capture(events_client, logs_client, cluster_name, region, accou
     events_log_group_name = f"/aws/ecs/events/{cluster_name}"
     # EventBridge rule name for capturing ECS events
     rule_name = f"ecs-event-capture-{cluster_name}"
-    log_group_arn = f"arn:aws:logs:{region}:{account_id}:log-group:{events_log_group_name}"
-    rule_arn = f"arn:aws:events:{region}:{account_id}:rule/{rule_name}"
+    log_group_arn = utils.build_arn('logs', region, account_id, f"log-group:{events_log_group_name}")
+    rule_arn = utils.build_arn('events', region, account_id, f"rule/{rule_name}")
     
     # Step 1: Create or ensure CloudWatch Logs log group exists
     try:
-        existing = logs_client.describe_log_groups(logGroupNamePrefix=events_log_group_name)
-        existing = [lg for lg in existing['logGroups'] 
-                   if lg['logGroupName'] == events_log_group_name]
-        
-        if existing:
-            print(f"Using existing event capture log group: {events_log_group_name}")
-        else:
-            if not allow_create:
+        if not allow_create:
+            if not logs.log_group_exists(logs_client, events_log_group_name):
                 print(f"Event capture log group '{events_log_group_name}' does not exist and resource creation is disabled.")
                 sys.exit(1)
-            
-            print(f"Creating event capture log group: {events_log_group_name}")
+            print(f"Using existing event capture log group: {events_log_group_name}")
+        else:
+            # One call either way: it's created, or it already exists
             logs_client.create_log_group(logGroupName=events_log_group_name)
             
             # Set retention policy to 7 days (default for event capture)
@@ -46,7 +46,7 @@ def enable_event_capture(events_client, logs_client, cluster_name, region, accou
             )
             print(f"Created event capture log group with 7-day retention: {events_log_group_name}")
     except logs_client.exceptions.ResourceAlreadyExistsException:
-        print(f"Event capture log group already exists: {events_log_group_name}")
+        print(f"Using existing event capture log group: {events_log_group_name}")
     except Exception as e:
         print(f"Error creating event capture log group: {e}")
         sys.exit(1)
@@ -75,7 +75,7 @@ def enable_event_capture(events_client, logs_client, cluster_name, region, accou
     try:
         logs_client.put_resource_policy(
             policyName=f"EventBridge-{cluster_name}",
-            policyDocument=json.dumps(resource_policy)
+            policyDocument=utils.compact_json(resource_policy)
         )
         print(f"Set CloudWatch Logs resource policy for EventBridge")
     except Exception as e:
@@ -91,49 +91,34 @@ def enable_event_capture(events_client, logs_client, cluster_name, region, accou
             "ECS Container Instance State Change"
         ],
         "detail": {
-            "clusterArn": [f"arn:aws:ecs:{region}:{account_id}:cluster/{cluster_name}"]
+            "clusterArn": [utils.build_arn('ecs', region, account_id, f"cluster/{cluster_name}")]
         }
     }
     
     try:
-        # Check if rule already exists
-        try:
-            events_client.describe_rule(Name=rule_name)
-            print(f"EventBridge rule {rule_name} already exists, updating...")
-            
-            # Update the rule
-            events_client.put_rule(
-                Name=rule_name,
-                EventPattern=json.dumps(event_pattern),
-                State='ENABLED',
-                Description=f'Captures ECS events for cluster {cluster_name}'
-            )
-        except events_client.exceptions.ResourceNotFoundException:
-            if not allow_create:
+        # put_rule creates or updates by name, so the rule only has to be looked up
+        # first when creating it isn't allowed, and then once per process
+        if not allow_create and rule_name not in _existing_rules:
+            try:
+                events_client.describe_rule(Name=rule_name)
+            except events_client.exceptions.ResourceNotFoundException:
                 print(f"EventBridge rule '{rule_name}' does not exist and resource creation is disabled.")
                 sys.exit(1)
-            
-            print(f"Creating EventBridge rule: {rule_name}")
-            events_client.put_rule(
-                Name=rule_name,
-                EventPattern=json.dumps(event_pattern),
-                State='ENABLED',
-                Description=f'Captures ECS events for cluster {cluster_name}'
-            )
+            _existing_rules.add(rule_name)
         
-        # Step 4: Set up EventBridge target (CloudWatch Logs directly)
-        # Remove any existing targets first
-        try:
-            existing_targets = events_client.list_targets_by_rule(Rule=rule_name)
-            if existing_targets['Targets']:
-                target_ids = [target['Id'] for target in existing_targets['Targets']]
-                events_client.remove_targets(Rule=rule_name, Ids=target_ids)
-        except Exception:
-            pass  # No existing targets, that's fine
+        print(f"Creating or updating EventBridge rule: {rule_name}")
+        events_client.put_rule(
+            Name=rule_name,
+            EventPattern=utils.compact_json(event_pattern),
+            State='ENABLED',
+            Description=f'Captures ECS events for cluster {cluster_name}'
+        )
+        _existing_rules.add(rule_name)
         
-        # Add CloudWatch Logs as target - EventBridge can write directly
+        # Step 4: Set up EventBridge target (CloudWatch Logs directly)
+        # put_targets replaces the target with the same Id, so there's nothing to remove first
         target_id = f"ecs-events-{cluster_name}"
-        events_client.put_targets(
+        response = events_client.put_targets(
             Rule=rule_name,
             Targets=[
                 {
@@ -142,6 +127,9 @@ def enable_event_capture(events_client, logs_client, cluster_name, region, accou
                 }
             ]
         )
+        if response.get('FailedEntryCount'):
+            print(f"Error setting EventBridge target: {response['FailedEntries']}")
+            sys.exit(1)
         
         print(f"Enabled event capture for cluster: {cluster_name}")
         print(f"  EventBridge rule: {rule_name}")
@@ -4,15 +4,25 @@ Script to fix existing CloudFront distribution origin protocol policy.
 Run this to update an existing distribution to use HTTP instead of HTTPS for ALB origin.
 """
 import sys
-import boto3
 import argparse
 
+def _cloudfront_client(region, profile):
+    """
+    Return the shared CloudFront client. boto3 is only imported here, so
+    running the script with --help doesn't pay for loading it.
+    """
+    try:
+        from . import clients
+    except ImportError:
+        import clients  # Run directly as a script from this directory
+    return clients.get_client('cloudfront', region, profile)
+
+
 def fix_cloudfront_origin_protocol(distribution_id, region='us-east-2', profile='personal'):
     """
     Fix CloudFront distribution to use HTTP instead of HTTPS for ALB origin.
     """
-    session = boto3.Session(profile_name=profile, region_name=region)
-    cloudfront_client = session.client('cloudfront')
+    cloudfront_client = _cloudfront_client(region, profile)
     
     try:
         # Get current distribution config
@@ -20,32 +30,30 @@ def fix_cloudfront_origin_protocol(distribution_id, region='us-east-2', profile=
         config = dist_config['DistributionConfig']
         etag = dist_config['ETag']
         
-        # Find and update origin protocol policy
+        # Only write the config back when some origin actually needs changing
         origins = config.get('Origins', {}).get('Items', [])
-        updated = False
+        https_only = [
+            origin for origin in origins
+            if origin.get('CustomOriginConfig', {}).get('OriginProtocolPolicy') == 'https-only'
+        ]
+        if not https_only:
+            print("No changes needed - origin protocol policy is already correct")
+            return
         
-        for origin in origins:
-            custom_config = origin.get('CustomOriginConfig', {})
-            if custom_config:
-                current_policy = custom_config.get('OriginProtocolPolicy', '')
-                if current_policy == 'https-only':
-                    print(f"Found origin '{origin.get('Id')}' with https-only policy")
-                    print("Updating to http-only...")
-                    custom_config['OriginProtocolPolicy'] = 'http-only'
-                    updated = True
+        for origin in https_only:
+            print(f"Found origin '{origin.get('Id')}' with https-only policy")
+            print("Updating to http-only...")
+            origin['CustomOriginConfig']['OriginProtocolPolicy'] = 'http-only'
+        
+        # Update the distribution
+        cloudfront_client.update_distribution(
+            Id=distribution_id,
+            DistributionConfig=config,
+            IfMatch=etag
+        )
+        print(f"Successfully updated CloudFront distribution: {distribution_id}")
+        print("Note: Changes may take 15-20 minutes to deploy")
         
-        if updated:
-            # Update the distribution
-            cloudfront_client.update_distribution(
-                Id=distribution_id,
-                DistributionConfig=config,
-                IfMatch=etag
-            )
-            print(f"Successfully updated CloudFront distribution: {distribution_id}")
-            print("Note: Changes may take 15-20 minutes to deploy")
-        else:
-            print("No changes needed - origin protocol policy is already correct")
-            
     except Exception as e:
         print(f"Error updating CloudFront distribution: {e}")
         sys.exit(1)
@@ -4,6 +4,39 @@ IAM role management for ECS tasks.
 """
 import json
 import sys
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from . import utils
+
+
+# Attach/detach calls in flight at once; they're independent, but IAM is quick to throttle
+POLICY_SYNC_WORKERS = 4
+
+# Role policy sets already synced, per account and role -> {'sig', 'ts'}, kept between runs
+ROLE_CACHE_FILE = 'iam_roles.json'
+_ROLE_CACHE_TTL = 3600
+_role_cache_lock = threading.Lock()
+
+
+def _sync_role_policies(iam_client, role_name, policies_to_add, policies_to_remove):
+    """
+    Attach and detach the role's managed policies concurrently.
+    The first failure is raised once the calls have been issued.
+    """
+    calls = [(iam_client.attach_role_policy, "Attaching", arn) for arn in policies_to_add]
+    calls += [(iam_client.detach_role_policy, "Detaching", arn) for arn in policies_to_remove]
+    if not calls:
+        return
+    
+    with ThreadPoolExecutor(max_workers=min(POLICY_SYNC_WORKERS, len(calls))) as executor:
+        futures = []
+        for method, verb, policy_arn in calls:
+            print(f"{verb} policy: {policy_arn}")
+            futures.append(executor.submit(method, RoleName=role_name, PolicyArn=policy_arn))
+        for future in as_completed(futures):
+            future.result()
 
 
 def ensure_ecs_execution_role(iam_client, account_id, required_policies, custom_policy=None, allow_create=False):
@@ -14,14 +47,22 @@ def ensure_ecs_execution_role(iam_client, account_id, required_policies, custom_
     """
     role_name = 'ecsTaskExecutionRole'
     inline_policy_name = 'CustomResourcePermissions'
+    role_arn = utils.build_arn('iam', '', account_id, f'role/{role_name}')
+    
+    # Skip the IAM calls if a recent run already synced this exact policy set
+    cache_key = f"{account_id}/{role_name}"
+    signature = hashlib.sha256(
+        json.dumps([sorted(required_policies), custom_policy], sort_keys=True).encode()
+    ).hexdigest()
+    entry = utils.load_json_cache(ROLE_CACHE_FILE).get(cache_key)
+    if entry and entry.get('sig') == signature and time.time() - entry.get('ts', 0) < _ROLE_CACHE_TTL:
+        print(f"Using existing IAM role: {role_name} (policies synced recently)")
+        return role_arn
     
     try:
-        # Check if role exists
-        iam_client.get_role(RoleName=role_name)
-        print(f"Using existing IAM role: {role_name}")
-        
-        # Get currently attached policies
+        # Get currently attached policies; this raises NoSuchEntity if the role doesn't exist
         response = iam_client.list_attached_role_policies(RoleName=role_name)
+        print(f"Using existing IAM role: {role_name}")
         current_policies = {policy['PolicyArn'] for policy in response['AttachedPolicies']}
         
         # Convert required_policies to a set for comparison
@@ -31,21 +72,8 @@ def ensure_ecs_execution_role(iam_client, account_id, required_policies, custom_
         policies_to_add = required_policies_set - current_policies
         policies_to_remove = current_policies - required_policies_set
         
-        # Add missing policies
-        for policy_arn in policies_to_add:
-            print(f"Attaching policy: {policy_arn}")
-            iam_client.attach_role_policy(
-                RoleName=role_name,
-                PolicyArn=policy_arn
-            )
-        
-        # Remove policies not in config
-        for policy_arn in policies_to_remove:
-            print(f"Detaching policy: {policy_arn}")
-            iam_client.detach_role_policy(
-                RoleName=role_name,
-                PolicyArn=policy_arn
-            )
+        # Add missing policies and remove ones not in config
+        _sync_role_policies(iam_client, role_name, policies_to_add, policies_to_remove)
         
         if policies_to_add or policies_to_remove:
             print(f"IAM role policies synced. Added: {len(policies_to_add)}, Removed: {len(policies_to_remove)}")
@@ -62,15 +90,14 @@ def ensure_ecs_execution_role(iam_client, account_id, required_policies, custom_
             iam_client.put_role_policy(
                 RoleName=role_name,
                 PolicyName=inline_policy_name,
-                PolicyDocument=json.dumps(custom_policy)
+                PolicyDocument=utils.compact_json(custom_policy)
             )
             print("Custom inline policy updated")
         else:
             # Remove inline policy if it exists but is not in config
             try:
-                iam_client.get_role_policy(RoleName=role_name, PolicyName=inline_policy_name)
-                print(f"Removing custom inline policy: {inline_policy_name}")
                 iam_client.delete_role_policy(RoleName=role_name, PolicyName=inline_policy_name)
+                print(f"Removed custom inline policy: {inline_policy_name}")
             except iam_client.exceptions.NoSuchEntityException:
                 pass  # Policy doesn't exist, nothing to remove
             
@@ -95,16 +122,11 @@ def ensure_ecs_execution_role(iam_client, account_id, required_policies, custom_
         
         iam_client.create_role(
             RoleName=role_name,
-            AssumeRolePolicyDocument=json.dumps(trust_policy)
+            AssumeRolePolicyDocument=utils.compact_json(trust_policy)
         )
         
         # Attach all required policies
-        for policy_arn in required_policies:
-            print(f"Attaching policy: {policy_arn}")
-            iam_client.attach_role_policy(
-                RoleName=role_name,
-                PolicyArn=policy_arn
-            )
+        _sync_role_policies(iam_client, role_name, required_policies, ())
         
         # Add custom inline policy if provided
         if custom_policy:
@@ -114,10 +136,14 @@ def ensure_ecs_execution_role(iam_client, account_id, required_policies, custom_
             iam_client.put_role_policy(
                 RoleName=role_name,
                 PolicyName=inline_policy_name,
-                PolicyDocument=json.dumps(custom_policy)
+                PolicyDocument=utils.compact_json(custom_policy)
             )
         
         print(f"Created role {role_name} with {len(required_policies)} managed policies" + 
               (" and custom inline policy" if custom_policy else ""))
     
-    return f'arn:aws:iam::{account_id}:role/{role_name}'
+    with _role_cache_lock:
+        entries = utils.load_json_cache(ROLE_CACHE_FILE)
+        entries[cache_key] = {'sig': signature, 'ts': time.time()}
+        utils.save_json_cache(ROLE_CACHE_FILE, entries)
+    return role_arn
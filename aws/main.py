@@ -22,7 +22,11 @@ def main(config_file=None):
             sys.exit(1)
     
     # Load configuration from file
-    config_dict = config.load_config(config_file)
+    try:
+        config_dict = config.load_config(config_file)
+    except config.ConfigError as e:
+        print(e)
+        sys.exit(1)
     
     # Validate lightweight mode requires exactly 1 replica
     public_config = config_dict.get('public') or {}
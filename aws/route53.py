@@ -5,6 +5,19 @@ Route53 domain and DNS record management.
 import sys
 
 
+# Hosted zones seen while listing, by zone name without the trailing dot; zones are
+# looked up for the site domain and for each certificate validation record, so the
+# listing is shared. 'complete' is set once a listing has run to the last page.
+_hosted_zones = {}
+_hosted_zones_state = {'complete': False}
+
+
+def _invalidate_hosted_zone_cache():
+    """Forget every hosted zone seen so far."""
+    _hosted_zones.clear()
+    _hosted_zones_state['complete'] = False
+
+
 def find_hosted_zone(route53_client, domain):
     """
     Find the hosted zone for a given domain or subdomain.
@@ -14,31 +27,36 @@ def find_hosted_zone(route53_client, domain):
     - domain='sub.example.com' -> finds zone for 'example.com', returns record_name='sub'
     - domain='example.com' -> finds zone for 'example.com', returns record_name='@' or ''
     """
-    # Split domain into parts
+    # Split domain into parts; level 0 is the full domain, then each parent domain
     parts = domain.split('.')
+    levels = ['.'.join(parts[i:]) for i in range(len(parts))]
     
-    # Try to find hosted zone starting from full domain, then parent domains
-    for i in range(len(parts)):
-        # Try domain at this level (e.g., 'sub.example.com', then 'example.com', then 'com')
-        test_domain = '.'.join(parts[i:])
-        
-        # List hosted zones
+    # A zone for the full domain can't be beaten, and once every zone has been
+    # listed the cache is authoritative; otherwise list, stopping at an exact match
+    if domain not in _hosted_zones and not _hosted_zones_state['complete']:
         paginator = route53_client.get_paginator('list_hosted_zones')
-        for page in paginator.paginate():
+        for page in paginator.paginate(PaginationConfig={'PageSize': 100}):
             for zone in page['HostedZones']:
-                zone_name = zone['Name'].rstrip('.')
-                
-                # Check if this zone matches our domain
-                if zone_name == test_domain:
-                    # Determine the record name
-                    if i == 0:
-                        # Exact match - this is the apex domain
-                        record_name = domain
-                    else:
-                        # Subdomain - record name is the subdomain part
-                        record_name = '.'.join(parts[:i])
-                    
-                    return zone['Id'], record_name, zone_name
+                _hosted_zones.setdefault(zone['Name'].rstrip('.'), zone)
+            if domain in _hosted_zones:
+                break
+        else:
+            _hosted_zones_state['complete'] = True
+    
+    # Keep the deepest matching zone
+    for level, test_domain in enumerate(levels):
+        zone = _hosted_zones.get(test_domain)
+        if zone is None:
+            continue
+        
+        if level == 0:
+            # Exact match - this is the apex domain
+            record_name = domain
+        else:
+            # Subdomain - record name is the subdomain part
+            record_name = '.'.join(parts[:level])
+        
+        return zone['Id'], record_name, test_domain
     
     # No hosted zone found
     return None, None, None
@@ -67,17 +85,12 @@ def get_existing_record(route53_client, hosted_zone_id, record_name, record_type
         return None
 
 
-def create_or_update_dns_record(route53_client, domain, target_value, record_type='CNAME', ttl=0, allow_create=False):
+def prepare_dns_record(route53_client, domain, record_type='CNAME', allow_create=False):
     """
-    Create or update a DNS record for the given domain.
-    Only modifies CNAME, A, or AAAA records for the specific domain/subdomain.
-    
-    Args:
-        domain: The domain or subdomain (e.g., 'sub.example.com' or 'example.com')
-        target_value: The value to point to (e.g., CloudFront distribution domain or ALB DNS name)
-        record_type: 'CNAME', 'A', or 'AAAA'
-        ttl: TTL in seconds
-        allow_create: Whether to create or modify DNS records. If False, will exit if record needs to be created or updated.
+    Find the hosted zone and any existing record for the domain, exiting if the
+    record can't be written (no hosted zone, or allow_create is False).
+    Returns (hosted zone ID, full record name, existing record or None), which
+    create_or_update_dns_record takes as prepared= to skip repeating the lookups.
     """
     # Find the hosted zone
     hosted_zone_id, record_name, zone_name = find_hosted_zone(route53_client, domain)
@@ -104,12 +117,36 @@ def create_or_update_dns_record(route53_client, domain, target_value, record_typ
     # Check if record already exists
     existing_record = get_existing_record(route53_client, hosted_zone_id, full_record_name, record_type)
     
-    if existing_record:
-        # Check if resource creation/modification is allowed
-        if not allow_create:
+    # Check if resource creation/modification is allowed
+    if not allow_create:
+        if existing_record:
             print(f"DNS record '{full_record_name}' exists but resource modification is disabled.")
-            sys.exit(1)
-        
+        else:
+            print(f"DNS record '{full_record_name}' does not exist and resource creation is disabled.")
+        sys.exit(1)
+    
+    return hosted_zone_id, full_record_name, existing_record
+
+
+def create_or_update_dns_record(route53_client, domain, target_value, record_type='CNAME', ttl=0, allow_create=False,
+                                prepared=None):
+    """
+    Create or update a DNS record for the given domain.
+    Only modifies CNAME, A, or AAAA records for the specific domain/subdomain.
+    
+    Args:
+        domain: The domain or subdomain (e.g., 'sub.example.com' or 'example.com')
+        target_value: The value to point to (e.g., CloudFront distribution domain or ALB DNS name)
+        record_type: 'CNAME', 'A', or 'AAAA'
+        ttl: TTL in seconds
+        allow_create: Whether to create or modify DNS records. If False, will exit if record needs to be created or updated.
+        prepared: The result of prepare_dns_record for this domain and record type, if already looked up
+    """
+    hosted_zone_id, full_record_name, existing_record = (
+        prepared or prepare_dns_record(route53_client, domain, record_type, allow_create)
+    )
+    
+    if existing_record:
         # Update existing record
         print(f"Updating existing {record_type} record: {full_record_name}")
         
@@ -152,10 +189,6 @@ def create_or_update_dns_record(route53_client, domain, target_value, record_typ
         )
         print(f"Updated {record_type} record: {full_record_name} -> {target_value}")
     else:
-        if not allow_create:
-            print(f"DNS record '{full_record_name}' does not exist and resource creation is disabled.")
-            sys.exit(1)
-        
         # Create new record
         print(f"Creating new {record_type} record: {full_record_name}")
         
@@ -210,65 +243,48 @@ def create_validation_record(route53_client, validation_record, allow_create=Fal
     record_type = validation_record['type']
     record_value = validation_record['value']
     
-    # Extract domain from record name (validation records are like _abc123.example.com)
-    # Find the hosted zone
-    parts = record_name.split('.')
-    domain_found = False
-    
-    for i in range(len(parts)):
-        test_domain = '.'.join(parts[i:])
-        hosted_zone_id, _, zone_name = find_hosted_zone(route53_client, test_domain)
-        
-        if hosted_zone_id:
-            domain_found = True
-            # The record name should be relative to the zone
-            if i == 0:
-                full_record_name = record_name
-            else:
-                # This shouldn't happen for validation records, but handle it
-                full_record_name = record_name
-            
-            if not full_record_name.endswith('.'):
-                full_record_name += '.'
-            
-            # Check if record already exists
-            existing = get_existing_record(route53_client, hosted_zone_id, full_record_name, record_type)
-            
-            if existing:
-                # Record already exists, no modification needed
-                print(f"Validation record already exists: {full_record_name}")
-                return
-            
-            if not allow_create:
-                print(f"Validation record '{full_record_name}' does not exist and resource creation is disabled.")
-                sys.exit(1)
-            
-            print(f"Creating ACM validation record: {full_record_name}")
-            
-            change_batch = {
-                'Changes': [
-                    {
-                        'Action': 'UPSERT',
-                        'ResourceRecordSet': {
-                            'Name': full_record_name,
-                            'Type': record_type,
-                            'TTL': 0,
-                            'ResourceRecords': [
-                                {'Value': record_value}
-                            ]
-                        }
-                    }
-                ]
-            }
-            
-            route53_client.change_resource_record_sets(
-                HostedZoneId=hosted_zone_id,
-                ChangeBatch=change_batch
-            )
-            print(f"Created validation record: {full_record_name}")
-            return
-    
-    if not domain_found:
+    # Validation records are like _abc123.example.com; find_hosted_zone already
+    # walks the parent domains to the deepest zone that contains the record
+    hosted_zone_id, _, _ = find_hosted_zone(route53_client, record_name)
+    if not hosted_zone_id:
         print(f"Error: Could not find Route53 hosted zone for validation record: {record_name}")
         print("Please ensure the domain is managed by Route53 in this AWS account.")
         sys.exit(1)
+    
+    full_record_name = record_name + '.'
+    
+    # Check if record already exists
+    existing = get_existing_record(route53_client, hosted_zone_id, full_record_name, record_type)
+    
+    if existing:
+        # Record already exists, no modification needed
+        print(f"Validation record already exists: {full_record_name}")
+        return
+    
+    if not allow_create:
+        print(f"Validation record '{full_record_name}' does not exist and resource creation is disabled.")
+        sys.exit(1)
+    
+    print(f"Creating ACM validation record: {full_record_name}")
+    
+    change_batch = {
+        'Changes': [
+            {
+                'Action': 'UPSERT',
+                'ResourceRecordSet': {
+                    'Name': full_record_name,
+                    'Type': record_type,
+                    'TTL': 0,
+                    'ResourceRecords': [
+                        {'Value': record_value}
+                    ]
+                }
+            }
+        ]
+    }
+    
+    route53_client.change_resource_record_sets(
+        HostedZoneId=hosted_zone_id,
+        ChangeBatch=change_batch
+    )
+    print(f"Created validation record: {full_record_name}")
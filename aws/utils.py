@@ -5,22 +5,27 @@ Utility functions for deployment scripts.
 import subprocess
 import sys
 import re
+import os
+import json
+import tempfile
 
 
-def run_command(command, error_message, stream_output=False):
+def run_command(command, error_message, stream_output=False, input=None):
     """
-    Run a shell command and exit if it fails.
+    Run a command and exit if it fails.
     
     Args:
-        command: The shell command to run
+        command: The command to run: a shell string, or an argument list run directly without a shell
         error_message: Error message to display if command fails
         stream_output: If True, stream output in real-time instead of capturing it
+        input: Text to send to the command's stdin (captured mode only)
     """
+    shell = isinstance(command, str)
     if stream_output:
         # Stream output in real-time
         process = subprocess.Popen(
             command,
-            shell=True,
+            shell=shell,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             text=True,
@@ -48,7 +53,8 @@ def run_command(command, error_message, stream_output=False):
         # Capture output (original behavior)
         result = subprocess.run(
             command,
-            shell=True,
+            shell=shell,
+            input=input,
             capture_output=True,
             text=True
         )
@@ -98,3 +104,61 @@ def parse_ephemeral_storage(value):
             raise ValueError(f"Invalid ephemeral_storage format: {value}. Expected integer or string like '21gb'")
     
     raise ValueError(f"Invalid ephemeral_storage type: {type(value)}. Expected int or str")
+
+
+def build_arn(service, region, account_id, resource):
+    """
+    ARN of a resource in the standard AWS partition.
+    region is empty for global services such as IAM.
+    """
+    return f"arn:aws:{service}:{region}:{account_id}:{resource}"
+
+
+def compact_json(obj):
+    """
+    Serialize a policy or pattern document for an AWS API without the optional
+    whitespace, which counts against IAM's policy size limits.
+    """
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+def cache_path(name):
+    """
+    Path of a cache file shared between deploy runs.
+    Lives in ~/.cache/deploy unless DEPLOY_CACHE_DIR is set.
+    """
+    cache_dir = os.environ.get('DEPLOY_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'deploy')
+    return os.path.join(cache_dir, name)
+
+
+def load_json_cache(name):
+    """
+    Load a JSON cache file written by save_json_cache.
+    Returns an empty dict if it is missing or unreadable.
+    """
+    try:
+        with open(cache_path(name)) as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_json_cache(name, data):
+    """
+    Atomically write a JSON cache file, so concurrent deploys never read a partial file.
+    Failures are reported but never fatal - the cache is only an optimization.
+    """
+    path = cache_path(name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{name}.")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        print(f"Note: Could not write cache {path}: {e}")
@@ -5,6 +5,32 @@ VPC, subnet, and security group management.
 import sys
 
 
+# Security group IDs found or created by this process, by (VPC ID, group name)
+_security_group_ids = {}
+
+
+def _invalidate_security_group_cache():
+    """Forget every cached security group ID."""
+    _security_group_ids.clear()
+
+
+def _lookup_security_groups(ec2_client, vpc_id, group_names):
+    """
+    Look up several security groups by name in one call (the group-name filter
+    matches any of its values). Returns {name: group ID} for those that exist.
+    """
+    security_groups = ec2_client.describe_security_groups(
+        Filters=[
+            {'Name': 'vpc-id', 'Values': [vpc_id]},
+            {'Name': 'group-name', 'Values': list(group_names)}
+        ]
+    )
+    found = {sg['GroupName']: sg['GroupId'] for sg in security_groups['SecurityGroups']}
+    for name, sg_id in found.items():
+        _security_group_ids[(vpc_id, name)] = sg_id
+    return found
+
+
 def get_default_vpc_resources(ec2_client, app_name, allow_create=False):
     """
     Get default VPC, subnets, and create a security group if needed.
@@ -34,17 +60,13 @@ def get_default_vpc_resources(ec2_client, app_name, allow_create=False):
     
     print(f"Using subnets: {', '.join(subnet_ids)}")
     
-    # Check if security group for our app exists, create if allowed
+    # Check if security group for our app exists, create if allowed. The ALB's
+    # group is looked up in the same call so create_alb_security_group needn't
     app_sg_name = f'{app_name}-sg'
-    security_groups = ec2_client.describe_security_groups(
-        Filters=[
-            {'Name': 'vpc-id', 'Values': [default_vpc_id]},
-            {'Name': 'group-name', 'Values': [app_sg_name]}
-        ]
-    )
+    found = _lookup_security_groups(ec2_client, default_vpc_id, [app_sg_name, f'{app_name}-alb-sg'])
     
-    if security_groups['SecurityGroups']:
-        sg_id = security_groups['SecurityGroups'][0]['GroupId']
+    if app_sg_name in found:
+        sg_id = found[app_sg_name]
         print(f"Using existing security group: {sg_id}")
     else:
         if not allow_create:
@@ -58,6 +80,7 @@ def get_default_vpc_resources(ec2_client, app_name, allow_create=False):
             VpcId=default_vpc_id
         )
         sg_id = sg_response['GroupId']
+        _security_group_ids[(default_vpc_id, app_sg_name)] = sg_id
         
         # Add inbound rules - allow HTTP and HTTPS
         ec2_client.authorize_security_group_ingress(
@@ -88,16 +111,12 @@ def create_alb_security_group(ec2_client, vpc_id, app_name, allow_create=False):
     """
     sg_name = f'{app_name}-alb-sg'
     
-    # Check if security group exists
-    security_groups = ec2_client.describe_security_groups(
-        Filters=[
-            {'Name': 'vpc-id', 'Values': [vpc_id]},
-            {'Name': 'group-name', 'Values': [sg_name]}
-        ]
-    )
+    # Check if security group exists (usually already looked up with the app's group)
+    sg_id = _security_group_ids.get((vpc_id, sg_name))
+    if sg_id is None:
+        sg_id = _lookup_security_groups(ec2_client, vpc_id, [sg_name]).get(sg_name)
     
-    if security_groups['SecurityGroups']:
-        sg_id = security_groups['SecurityGroups'][0]['GroupId']
+    if sg_id:
         print(f"Using existing ALB security group: {sg_id}")
         return sg_id
     
@@ -112,6 +131,7 @@ def create_alb_security_group(ec2_client, vpc_id, app_name, allow_create=False):
         VpcId=vpc_id
     )
     sg_id = sg_response['GroupId']
+    _security_group_ids[(vpc_id, sg_name)] = sg_id
     
     # Allow HTTP and HTTPS from anywhere
     ec2_client.authorize_security_group_ingress(
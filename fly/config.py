@@ -6,14 +6,19 @@ import yaml
 import sys
 import os
 
+try:
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
+
 
 def load_config(config_file):
     """
     Load configuration from YAML file for Fly.io deployment.
     """
     try:
-        with open(config_file, 'r') as f:
-            config = yaml.safe_load(f)
+        with open(config_file, 'rb') as f:
+            config = yaml.load(f, Loader=_YAMLLoader)
         
         # Extract configuration values
         task_config = config.get('task', {})
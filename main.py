@@ -7,7 +7,11 @@ Note: Vercel deployment is currently disabled and needs to be tested.
 import sys
 import os
 import yaml
-import argparse
+
+try:
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
 
 # Add the current directory to the path so we can import aws and fly
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -18,8 +22,8 @@ def load_config(config_file):
     Load configuration from YAML file and determine platform.
     """
     try:
-        with open(config_file, 'r') as f:
-            config = yaml.safe_load(f)
+        with open(config_file, 'rb') as f:
+            config = yaml.load(f, Loader=_YAMLLoader)
         
         # Platform is required
         if 'platform' not in config:
@@ -41,22 +45,38 @@ def load_config(config_file):
         sys.exit(1)
 
 
-def main():
+def parse_config_arg(argv):
+    """
+    Return the --config value from the command line (default: deploy.yaml).
+    The plain invocations are matched by hand; argparse is only imported for
+    anything else (--help, typos) so that it reports usage the usual way.
+    """
+    if not argv:
+        return 'deploy.yaml'
+    if len(argv) == 2 and argv[0] == '--config' and not argv[1].startswith('-'):
+        return argv[1]
+    if len(argv) == 1 and argv[0].startswith('--config=') and len(argv[0]) > len('--config='):
+        return argv[0][len('--config='):]
+    
+    import argparse
     parser = argparse.ArgumentParser(description='Deploy app to Fargate, Fly.io, or S3 (Vercel is currently disabled)')
     parser.add_argument('--config', type=str, default='deploy.yaml', 
                        help='Path to YAML configuration file (default: deploy.yaml)')
-    
-    args = parser.parse_args()
+    return parser.parse_args(argv).config
+
+
+def main():
+    config_arg = parse_config_arg(sys.argv[1:])
     
     # Resolve config file path - only check current directory
-    config_path = args.config
+    config_path = config_arg
     if not os.path.isabs(config_path):
         # Check current directory (where the command is run from)
         current_dir_config = os.path.join(os.getcwd(), config_path)
         if os.path.exists(current_dir_config):
             config_path = current_dir_config
         else:
-            print(f"Error: Configuration file not found: {args.config}")
+            print(f"Error: Configuration file not found: {config_arg}")
             print(f"Looked in: {current_dir_config}")
             sys.exit(1)
     
@@ -4,6 +4,7 @@ CloudFront distribution management for S3 buckets.
 """
 import sys
 import time
+from aws import cloudfront as aws_cloudfront
 
 
 def create_cloudfront_distribution_for_s3(cloudfront_client, s3_bucket_name, s3_region, domain, region, allow_create=False, certificate_arn=None):
@@ -20,58 +21,56 @@ def create_cloudfront_distribution_for_s3(cloudfront_client, s3_bucket_name, s3_
     
     Returns the distribution domain name and ID.
     """
-    # Check if distribution already exists (by checking comment/aliases)
+    # Check if distribution already exists (by alias; uses the shared alias index)
     try:
-        paginator = cloudfront_client.get_paginator('list_distributions')
-        for page in paginator.paginate():
-            for dist in page.get('DistributionList', {}).get('Items', []):
-                if domain in dist.get('Aliases', {}).get('Items', []):
-                    dist_id = dist['Id']
-                    print(f"Using existing CloudFront distribution: {dist_id}")
-                    
-                    # Check if distribution needs updates
-                    try:
-                        dist_config = cloudfront_client.get_distribution_config(Id=dist_id)
-                        config = dist_config['DistributionConfig']
-                        needs_update = False
-                        etag = dist_config['ETag']
-                        
-                        # Check and update certificate if needed
-                        if certificate_arn:
-                            current_cert = config['ViewerCertificate']
-                            if current_cert.get('ACMCertificateArn') != certificate_arn:
-                                print(f"Updating CloudFront distribution with new certificate...")
-                                config['ViewerCertificate'] = {
-                                    'ACMCertificateArn': certificate_arn,
-                                    'SSLSupportMethod': 'sni-only',
-                                    'MinimumProtocolVersion': 'TLSv1.2_2021',
-                                }
-                                needs_update = True
-                        
-                        # Check and update cache TTL to 10 minutes (600 seconds)
-                        cache_behavior = config.get('DefaultCacheBehavior', {})
-                        if cache_behavior.get('DefaultTTL', 0) != 600:
-                            print(f"Updating CloudFront distribution cache TTL to 10 minutes...")
-                            cache_behavior['DefaultTTL'] = 600
-                            cache_behavior['MinTTL'] = 0
-                            cache_behavior['MaxTTL'] = 600
-                            config['DefaultCacheBehavior'] = cache_behavior
-                            needs_update = True
-                        
-                        if needs_update:
-                            cloudfront_client.update_distribution(
-                                Id=dist_id,
-                                DistributionConfig=config,
-                                IfMatch=etag
-                            )
-                            print("CloudFront distribution updated successfully")
-                            print("Note: Distribution update may take 15-20 minutes to deploy")
-                    except Exception as e:
-                        print(f"Note: Could not update existing distribution: {e}")
-                    
-                    return dist['DomainName'], dist_id
+        dist = aws_cloudfront.find_distribution_by_alias(cloudfront_client, domain)
     except Exception as e:
         print(f"Note: Could not check for existing distributions: {e}")
+        dist = None
+    
+    if dist:
+        dist_id = dist['Id']
+        print(f"Using existing CloudFront distribution: {dist_id}")
+        
+        # Check if distribution needs updates
+        try:
+            config, etag = aws_cloudfront.get_distribution_config(cloudfront_client, dist_id)
+            needs_update = False
+            
+            # Check and update certificate if needed
+            if certificate_arn:
+                current_cert = config['ViewerCertificate']
+                if current_cert.get('ACMCertificateArn') != certificate_arn:
+                    print(f"Updating CloudFront distribution with new certificate...")
+                    config['ViewerCertificate'] = {
+                        'ACMCertificateArn': certificate_arn,
+                        'SSLSupportMethod': 'sni-only',
+                        'MinimumProtocolVersion': 'TLSv1.2_2021',
+                    }
+                    needs_update = True
+            
+            # Check and update cache TTL to 10 minutes (600 seconds)
+            cache_behavior = config.get('DefaultCacheBehavior', {})
+            if cache_behavior.get('DefaultTTL', 0) != 600:
+                print(f"Updating CloudFront distribution cache TTL to 10 minutes...")
+                cache_behavior['DefaultTTL'] = 600
+                cache_behavior['MinTTL'] = 0
+                cache_behavior['MaxTTL'] = 600
+                config['DefaultCacheBehavior'] = cache_behavior
+                needs_update = True
+            
+            if needs_update:
+                cloudfront_client.update_distribution(
+                    Id=dist_id,
+                    DistributionConfig=config,
+                    IfMatch=etag
+                )
+                print("CloudFront distribution updated successfully")
+                print("Note: Distribution update may take 15-20 minutes to deploy")
+        except Exception as e:
+            print(f"Note: Could not update existing distribution: {e}")
+        
+        return dist['DomainName'], dist_id
     
     if not allow_create:
         print(f"CloudFront distribution does not exist and resource creation is disabled.")
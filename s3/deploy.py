@@ -3,7 +3,6 @@
 Main deployment orchestrator for AWS S3 static website hosting.
 """
 import sys
-import boto3
 import urllib.request
 import urllib.error
 import time
@@ -14,6 +13,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from aws import route53
 from aws import acm
 from aws import cloudfront
+from aws import clients
 from . import s3_bucket
 from . import cloudfront_s3
 
@@ -53,13 +53,11 @@ def deploy_to_s3(config_dict=None, **kwargs):
         print("Error: 'folder' parameter is required")
         sys.exit(1)
     
-    # Use the specified profile for AWS credentials and region
-    session = boto3.Session(profile_name=profile, region_name=region)
-    
-    # Initialize AWS clients
-    s3_client = session.client('s3')
-    route53_client = session.client('route53')
-    cloudfront_client = session.client('cloudfront')
+    # Initialize AWS clients for the profile and region; they share one session,
+    # and its pooling, keepalive and retry settings, with the rest of the deploy
+    s3_client = clients.get_client('s3', region, profile)
+    route53_client = clients.get_client('route53', region, profile)
+    cloudfront_client = clients.get_client('cloudfront', region, profile)
     
     # Configuration
     # Use user-specified bucket name, or generate one from app_name
@@ -125,16 +123,14 @@ def deploy_to_s3(config_dict=None, **kwargs):
             # Step 5.1: Request/get ACM certificate for CloudFront
             # CloudFront requires certificates to be in us-east-1
             acm_region = 'us-east-1'
-            acm_session = boto3.Session(profile_name=profile, region_name=acm_region)
-            acm_client = acm_session.client('acm')
+            acm_client = clients.get_client('acm', acm_region, profile)
             
             print(f"\n=== Setting up SSL Certificate ===")
             
             cert_arn = None
             if certificate_id:
                 # Get account ID to construct the full ARN
-                sts_client = session.client('sts')
-                account_id = sts_client.get_caller_identity().get('Account')
+                account_id = clients.get_account_id(profile, region)
                 
                 # Construct certificate ARN from ID
                 cert_arn = f"arn:aws:acm:{acm_region}:{account_id}:certificate/{certificate_id}"
@@ -211,40 +207,46 @@ def deploy_to_s3(config_dict=None, **kwargs):
                 record_type='A', allow_create=allow_create
             )
             
-            print(f"\nS3 deployment complete!")
-            print(f"  Domain: {domain}")
-            print(f"  S3 Bucket: {bucket_name}")
-            print(f"  CloudFront: {cf_domain}")
-            print(f"  Cache TTL: 10 minutes")
-            print(f"  Note: CloudFront may take 15-20 minutes to fully deploy")
-            
             # Store CloudFront info for later display
             params['_cloudfront_domain'] = cf_domain
             params['_cloudfront_id'] = cf_id
+            
+            lines = [
+                "\nS3 deployment complete!",
+                f"  Domain: {domain}",
+                f"  S3 Bucket: {bucket_name}",
+                f"  CloudFront: {cf_domain}",
+                "  Cache TTL: 10 minutes",
+                "  Note: CloudFront may take 15-20 minutes to fully deploy",
+            ]
         else:
             # No public domain - just show S3 bucket info
-            print(f"\nS3 deployment complete!")
-            print(f"  S3 Bucket: {bucket_name}")
-            print(f"  Note: No public domain configured. Access bucket directly or configure 'public' section.")
+            lines = [
+                "\nS3 deployment complete!",
+                f"  S3 Bucket: {bucket_name}",
+                "  Note: No public domain configured. Access bucket directly or configure 'public' section.",
+            ]
         
-        # Print AWS Console links
-        print("\n" + "="*80)
-        print("AWS Console Links:")
-        print("="*80)
+        # Add the AWS Console links, then write the summary in one go
         s3_url = f"https://s3.console.aws.amazon.com/s3/buckets/{bucket_name}?region={region}"
-        print(f"\nS3 Bucket:")
-        print(f"  {s3_url}")
+        lines += [
+            "\n" + "="*80,
+            "AWS Console Links:",
+            "="*80,
+            "\nS3 Bucket:",
+            f"  {s3_url}",
+        ]
         
         if public_config:
-            print(f"\nPublic Domain:")
-            domain_url = f"https://{public_config['domain']}"
-            print(f"  {domain_url}")
+            lines.append("\nPublic Domain:")
+            lines.append(f"  https://{public_config['domain']}")
             # Show CloudFront URL if available
             if '_cloudfront_domain' in params:
-                print(f"\nCloudFront Distribution URL:")
-                print(f"  https://{params['_cloudfront_domain']}")
+                lines.append("\nCloudFront Distribution URL:")
+                lines.append(f"  https://{params['_cloudfront_domain']}")
         
-        print("\n" + "="*80 + "\n")
+        lines.append("\n" + "="*80 + "\n")
+        print("\n".join(lines))
         
         # Test HTTP requests to verify deployment
         if public_config:
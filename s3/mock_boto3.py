@@ -8,7 +8,7 @@ import time
 from copy import deepcopy
 
 try:
-    from botocore.exceptions import ClientError
+    from botocore.exceptions import ClientError, WaiterError
 except ImportError:
     # Fallback if botocore not available
     class ClientError(Exception):
@@ -16,6 +16,11 @@ except ImportError:
             self.response = error_response
             self.operation_name = operation_name
 
+    class WaiterError(Exception):
+        def __init__(self, name, reason, last_response):
+            super().__init__(f"Waiter {name} failed: {reason}")
+            self.last_response = last_response
+
 
 def _client_error(code, message=""):
     return ClientError({"Error": {"Code": code, "Message": message}}, "Operation")
@@ -205,6 +210,24 @@ class MockCloudFrontClient:
 
         return Paginator(self._distributions)
 
+    def get_waiter(self, waiter_name):
+        if waiter_name not in ("distribution_deployed", "invalidation_completed"):
+            raise ValueError(f"Unknown waiter: {waiter_name}")
+
+        class Waiter:
+            def __init__(waiter_self, client):
+                waiter_self._client = client
+
+            def wait(waiter_self, Id=None, DistributionId=None, WaiterConfig=None):
+                if waiter_name == "invalidation_completed":
+                    # In-memory invalidations complete instantly
+                    return
+                response = waiter_self._client.get_distribution(Id=Id)
+                if response["Distribution"]["Status"] != "Deployed":
+                    raise WaiterError(waiter_name, "Max attempts exceeded", response)
+
+        return Waiter(self)
+
     def list_distributions(self, **kwargs):
         items = list(self._distributions.values())
         return {"DistributionList": {"Items": items, "Quantity": len(items), "IsTruncated": False}}
@@ -219,7 +242,7 @@ class MockCloudFrontClient:
         if Id not in self._distributions:
             raise _client_error("NoSuchDistribution", "Not found")
         d = self._distributions[Id]
-        return {"Distribution": {"Id": Id, "Status": d.get("Status", "Deployed"), "DomainName": d.get("DomainName", "d123.cloudfront.net"), "DistributionConfig": d["Config"]}}
+        return {"Distribution": {"Id": Id, "Status": d.get("Status", "Deployed"), "DomainName": d.get("DomainName", "d123.cloudfront.net"), "DistributionConfig": deepcopy(d["Config"])}, "ETag": d["ETag"]}
 
     def create_distribution(self, DistributionConfig=None):
         dist_id = f"E{self._next_id}"
@@ -241,10 +264,10 @@ class MockCloudFrontClient:
             raise _client_error("NoSuchDistribution", "Not found")
         self._distributions[Id]["Config"] = deepcopy(DistributionConfig)
         self._distributions[Id]["ETag"] = f"etag-{Id}-updated"
-        return {"Distribution": {"Id": Id, "Status": "InProgress"}}
+        return {"Distribution": {"Id": Id, "Status": "InProgress"}, "ETag": self._distributions[Id]["ETag"]}
 
     def create_invalidation(self, DistributionId=None, InvalidationBatch=None):
-        inv_id = f"I{int(time.time())}"
+        inv_id = f"I{len(self._invalidations) + 1}"
         self._invalidations.append({"Id": inv_id, "DistributionId": DistributionId, "Paths": InvalidationBatch.get("Paths", {}).get("Items", [])})
         return {"Invalidation": {"Id": inv_id, "Status": "InProgress"}}
 
@@ -284,12 +307,39 @@ class MockACMClient:
             def __init__(pag_self, certs):
                 pag_self._certs = list(certs.values())
 
-            def paginate(pag_self, **kwargs):
-                summary = [{"CertificateArn": c["CertificateArn"], "DomainName": c.get("DomainName", "")} for c in pag_self._certs]
+            def paginate(pag_self, CertificateStatuses=None, **kwargs):
+                summary = [
+                    {
+                        "CertificateArn": c["CertificateArn"],
+                        "DomainName": c.get("DomainName", ""),
+                        "Status": c.get("Status", "PENDING_VALIDATION"),
+                        # Like ACM, summaries can carry only the first SANs of a certificate
+                        "SubjectAlternativeNameSummaries": list(c.get("SubjectAlternativeNames", []))[:c.get("SummarySANLimit")],
+                        "HasAdditionalSubjectAlternativeNames": len(c.get("SubjectAlternativeNames", [])) > (c.get("SummarySANLimit") or len(c.get("SubjectAlternativeNames", []))),
+                    }
+                    for c in pag_self._certs
+                    if not CertificateStatuses or c.get("Status", "PENDING_VALIDATION") in CertificateStatuses
+                ]
                 yield {"CertificateSummaryList": summary}
 
         return Paginator(self._certs)
 
+    def get_waiter(self, waiter_name):
+        if waiter_name != "certificate_validated":
+            raise ValueError(f"Unknown waiter: {waiter_name}")
+
+        class Waiter:
+            def __init__(waiter_self, client):
+                waiter_self._client = client
+
+            def wait(waiter_self, CertificateArn=None, WaiterConfig=None):
+                # State never changes in memory, so a single check decides the outcome
+                response = waiter_self._client.describe_certificate(CertificateArn=CertificateArn)
+                if response["Certificate"]["Status"] != "ISSUED":
+                    raise WaiterError(waiter_name, "Max attempts exceeded", response)
+
+        return Waiter(self)
+
     def describe_certificate(self, CertificateArn=None):
         if CertificateArn not in self._certs:
             raise ResourceNotFoundException({"Error": {"Code": "ResourceNotFoundException", "Message": "Certificate not found"}}, "DescribeCertificate")
@@ -320,6 +370,106 @@ class MockACMClient:
         return {"CertificateArn": arn}
 
 
+class LoadBalancerNotFoundException(ClientError):
+    """ELBv2 LoadBalancerNotFoundException - same as botocore client."""
+    pass
+
+
+class TargetGroupNotFoundException(ClientError):
+    """ELBv2 TargetGroupNotFoundException - same as botocore client."""
+    pass
+
+
+class MockELBv2Client:
+    """In-memory ELBv2 client. State: load balancers and target groups by name, listeners by ARN."""
+
+    def __init__(self, state=None, region="us-east-1"):
+        self._region = region
+        if state is None:
+            state = {}
+        self._albs = state.setdefault("load_balancers", {})
+        self._tgs = state.setdefault("target_groups", {})
+        self._listeners = state.setdefault("listeners", {})
+
+    @property
+    def exceptions(self):
+        return type("Exceptions", (), {
+            "LoadBalancerNotFoundException": LoadBalancerNotFoundException,
+            "TargetGroupNotFoundException": TargetGroupNotFoundException,
+        })()
+
+    @property
+    def state(self):
+        return {"load_balancers": dict(self._albs), "target_groups": dict(self._tgs), "listeners": dict(self._listeners)}
+
+    def _make_arn(self, kind, name):
+        return f"arn:aws:elasticloadbalancing:{self._region}:123456789012:{kind}/{name}"
+
+    def get_waiter(self, waiter_name):
+        class Waiter:
+            def wait(waiter_self, **kwargs):
+                pass
+
+        return Waiter()
+
+    def get_paginator(self, operation_name):
+        if operation_name != "describe_listeners":
+            raise ValueError(f"Unknown paginator: {operation_name}")
+
+        class Paginator:
+            def __init__(pag_self, client):
+                pag_self._client = client
+
+            def paginate(pag_self, LoadBalancerArn=None, **kwargs):
+                yield pag_self._client.describe_listeners(LoadBalancerArn=LoadBalancerArn)
+
+        return Paginator(self)
+
+    def describe_load_balancers(self, Names=None, LoadBalancerArns=None):
+        found = [self._albs[n] for n in (Names or []) if n in self._albs]
+        if Names and not found:
+            raise LoadBalancerNotFoundException({"Error": {"Code": "LoadBalancerNotFound", "Message": "Load balancer not found"}}, "DescribeLoadBalancers")
+        return {"LoadBalancers": [dict(a) for a in found]}
+
+    def create_load_balancer(self, Name=None, **kwargs):
+        arn = self._make_arn("loadbalancer/app", Name)
+        self._albs[Name] = {"LoadBalancerArn": arn, "LoadBalancerName": Name, "DNSName": f"{Name}.{self._region}.elb.amazonaws.com"}
+        return {"LoadBalancers": [dict(self._albs[Name])]}
+
+    def describe_target_groups(self, Names=None, TargetGroupArns=None):
+        found = [self._tgs[n] for n in (Names or []) if n in self._tgs]
+        if Names and not found:
+            raise TargetGroupNotFoundException({"Error": {"Code": "TargetGroupNotFound", "Message": "Target group not found"}}, "DescribeTargetGroups")
+        return {"TargetGroups": [dict(t) for t in found]}
+
+    def create_target_group(self, Name=None, HealthCheckPath="/", **kwargs):
+        arn = self._make_arn("targetgroup", Name)
+        self._tgs[Name] = {"TargetGroupArn": arn, "TargetGroupName": Name, "HealthCheckPath": HealthCheckPath}
+        return {"TargetGroups": [dict(self._tgs[Name])]}
+
+    def modify_target_group(self, TargetGroupArn=None, HealthCheckPath=None, **kwargs):
+        for tg in self._tgs.values():
+            if tg["TargetGroupArn"] == TargetGroupArn and HealthCheckPath is not None:
+                tg["HealthCheckPath"] = HealthCheckPath
+        return {}
+
+    def describe_listeners(self, LoadBalancerArn=None):
+        return {"Listeners": [dict(l) for l in self._listeners.get(LoadBalancerArn, [])]}
+
+    def create_listener(self, LoadBalancerArn=None, Protocol=None, Port=None, DefaultActions=None, **kwargs):
+        listeners = self._listeners.setdefault(LoadBalancerArn, [])
+        arn = f"{LoadBalancerArn.replace(':loadbalancer/', ':listener/')}/{len(listeners) + 1}"
+        listeners.append({"ListenerArn": arn, "Protocol": Protocol, "Port": Port, "DefaultActions": list(DefaultActions or [])})
+        return {"Listeners": [dict(listeners[-1])]}
+
+    def modify_listener(self, ListenerArn=None, DefaultActions=None, **kwargs):
+        for listeners in self._listeners.values():
+            for l in listeners:
+                if l["ListenerArn"] == ListenerArn and DefaultActions is not None:
+                    l["DefaultActions"] = list(DefaultActions)
+        return {}
+
+
 class MockSTSClient:
     """In-memory STS client."""
 
@@ -342,9 +492,10 @@ class MockSession:
         self._route53_state = {}
         self._cloudfront_state = {}
         self._acm_state = {}
+        self._elbv2_state = {}
         self._sts = MockSTSClient()
 
-    def client(self, service_name, region_name=None):
+    def client(self, service_name, region_name=None, config=None):
         region = region_name or self.region_name
         if service_name == "s3":
             return MockS3Client(self._s3_state)
@@ -354,6 +505,8 @@ class MockSession:
             return MockCloudFrontClient(self._cloudfront_state)
         if service_name == "acm":
             return MockACMClient(self._acm_state, region=region or "us-east-1")
+        if service_name == "elbv2":
+            return MockELBv2Client(self._elbv2_state, region=region or "us-east-1")
         if service_name == "sts":
             return self._sts
         raise ValueError(f"Unknown service: {service_name}")
@@ -363,6 +516,7 @@ class MockSession:
         self._route53_state.clear()
         self._cloudfront_state.clear()
         self._acm_state.clear()
+        self._elbv2_state.clear()
 
     def seed_route53_hosted_zone(self, zone_id, name):
         """Add a hosted zone for tests (e.g. find_hosted_zone)."""
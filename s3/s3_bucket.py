@@ -4,8 +4,8 @@ S3 bucket management and file upload.
 """
 import sys
 import os
-import boto3
 from botocore.exceptions import ClientError
+from aws import utils
 
 
 def create_s3_bucket(s3_client, bucket_name, region, allow_create=False):
@@ -159,10 +159,9 @@ def set_bucket_policy_for_cloudfront(s3_client, bucket_name, allow_create=False)
             ]
         }
         
-        import json
         s3_client.put_bucket_policy(
             Bucket=bucket_name,
-            Policy=json.dumps(bucket_policy)
+            Policy=utils.compact_json(bucket_policy)
         )
         print(f"Set bucket policy for public read access")
     except ClientError as e:
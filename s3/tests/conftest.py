@@ -0,0 +1,41 @@
+"""Shared fixtures for the s3 and aws module tests."""
+import os
+import sys
+import pytest
+
+_repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _repo_root not in sys.path:
+    sys.path.insert(0, _repo_root)
+
+import aws.acm as acm
+import aws.alb as alb
+import aws.cloudfront as cloudfront
+import aws.clients as clients
+import aws.config as aws_config
+import aws.ecr as ecr
+import aws.events as events
+import aws.route53 as route53
+import aws.vpc as vpc
+
+
+def _clear_caches():
+    acm._invalidate_cert_cache()
+    alb._invalidate_alb_cache()
+    cloudfront._invalidate_distribution_cache()
+    cloudfront._inflight_invalidations.clear()
+    aws_config._CFG_CACHE.clear()
+    clients.get_account_id.cache_clear()
+    clients._clients.clear()
+    ecr._ecr_logins.clear()
+    events._existing_rules.clear()
+    route53._invalidate_hosted_zone_cache()
+    vpc._invalidate_security_group_cache()
+
+
+@pytest.fixture(autouse=True)
+def reset_module_caches(tmp_path, monkeypatch):
+    """Clear process-wide lookup caches and point disk caches at a temp dir so tests don't see each other's state."""
+    monkeypatch.setenv("DEPLOY_CACHE_DIR", str(tmp_path / "cache"))
+    _clear_caches()
+    yield
+    _clear_caches()
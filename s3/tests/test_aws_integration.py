@@ -1,7 +1,8 @@
-"""Unit tests for aws modules (route53, acm, cloudfront) using mock boto3 clients."""
+"""Unit tests for aws modules (route53, acm, alb, cloudfront) using mock boto3 clients."""
+import json
 import os
 import sys
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 import pytest
 
 _repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,15 +13,21 @@ from s3.mock_boto3 import (
     MockRoute53Client,
     MockACMClient,
     MockCloudFrontClient,
+    MockELBv2Client,
     MockSession,
+    MockSTSClient,
     ResourceNotFoundException,
+    ClientError,
 )
 
 
 # Import aws modules from repo root
 import aws.route53 as route53
 import aws.acm as acm
+import aws.alb as alb
 import aws.cloudfront as cloudfront
+import aws.config as aws_config
+import aws.deploy as aws_deploy
 
 
 class TestRoute53WithMock:
@@ -42,6 +49,36 @@ class TestRoute53WithMock:
         assert zone_name == "example.com"
         assert record_name == "app"
 
+    def test_find_hosted_zone_lists_zones_once_and_prefers_deepest(self):
+        client = MagicMock()
+        pages = [
+            {"HostedZones": [{"Id": "/hostedzone/Z1", "Name": "example.com."}]},
+            {"HostedZones": [{"Id": "/hostedzone/Z2", "Name": "app.example.com."}]},
+            {"HostedZones": [{"Id": "/hostedzone/Z3", "Name": "other.com."}]},
+        ]
+        consumed = []
+
+        def paginate(**kwargs):
+            for page in pages:
+                consumed.append(page)
+                yield page
+
+        client.get_paginator.return_value.paginate.side_effect = paginate
+        zone_id, record_name, _ = route53.find_hosted_zone(client, "api.app.example.com")
+        assert (zone_id, record_name) == ("/hostedzone/Z2", "api")
+        assert client.get_paginator.call_count == 1
+        assert len(consumed) == 3
+        # Later lookups, e.g. for validation records, are answered from the full listing
+        consumed.clear()
+        zone_id, record_name, _ = route53.find_hosted_zone(client, "_abc.app.example.com")
+        assert (zone_id, record_name) == ("/hostedzone/Z2", "_abc")
+        assert consumed == []
+        # Without a full listing, an exact match ends the listing early
+        route53._invalidate_hosted_zone_cache()
+        zone_id, record_name, _ = route53.find_hosted_zone(client, "example.com")
+        assert (zone_id, record_name) == ("/hostedzone/Z1", "example.com")
+        assert len(consumed) == 1
+
     def test_find_hosted_zone_not_found(self):
         client = MockRoute53Client()
         zone_id, record_name, zone_name = route53.find_hosted_zone(client, "unknown.com")
@@ -81,6 +118,15 @@ class TestRoute53WithMock:
         assert len(records) == 1
         assert records[0]["Type"] == "CNAME"
 
+    def test_create_validation_record_no_zone_exits(self):
+        client = MockRoute53Client()
+        with pytest.raises(SystemExit):
+            route53.create_validation_record(
+                client,
+                {"name": "_abc123.unknown.com.", "type": "CNAME", "value": "xyz.acm-validations.aws."},
+                allow_create=True,
+            )
+
 
 class TestACMWithMock:
     """Tests for aws.acm using MockACMClient."""
@@ -110,6 +156,161 @@ class TestACMWithMock:
         found = acm.find_certificate(client, "example.com", "us-east-1")
         assert found == "arn:aws:acm:us-east-1:123:certificate/1"
 
+    def test_find_certificate_wildcard_on_parent_domain(self):
+        client = MockACMClient(region="us-east-1")
+        client._certs["arn:aws:acm:us-east-1:123:certificate/1"] = {
+            "CertificateArn": "arn:aws:acm:us-east-1:123:certificate/1",
+            "DomainName": "other.com",
+            "Status": "ISSUED",
+            "SubjectAlternativeNames": ["other.com"],
+        }
+        client._certs["arn:aws:acm:us-east-1:123:certificate/2"] = {
+            "CertificateArn": "arn:aws:acm:us-east-1:123:certificate/2",
+            "DomainName": "*.example.com",
+            "Status": "ISSUED",
+            "SubjectAlternativeNames": ["*.example.com"],
+        }
+        found = acm.find_certificate(client, "app.example.com", "us-east-1")
+        assert found == "arn:aws:acm:us-east-1:123:certificate/2"
+        assert acm.find_certificate(client, "app.other.com", "us-east-1") is None
+
+    def test_find_certificate_uses_summaries_without_describe(self):
+        client = MockACMClient(region="us-east-1")
+        client._certs["arn:aws:acm:us-east-1:123:certificate/1"] = {
+            "CertificateArn": "arn:aws:acm:us-east-1:123:certificate/1",
+            "DomainName": "example.com",
+            "Status": "ISSUED",
+            "SubjectAlternativeNames": ["example.com", "www.example.com"],
+        }
+        with patch.object(client, "describe_certificate", side_effect=AssertionError("describe not expected")):
+            found = acm.find_certificate(client, "www.example.com", "us-east-1")
+        assert found == "arn:aws:acm:us-east-1:123:certificate/1"
+
+    def test_find_certificate_describes_truncated_certificates_only_on_miss(self):
+        client = MockACMClient(region="us-east-1")
+        client._certs["arn:aws:acm:us-east-1:123:certificate/1"] = {
+            "CertificateArn": "arn:aws:acm:us-east-1:123:certificate/1",
+            "DomainName": "example.com",
+            "Status": "ISSUED",
+            "SubjectAlternativeNames": ["example.com", "www.example.com", "*.api.example.com"],
+            "SummarySANLimit": 1,
+        }
+        with patch.object(client, "describe_certificate", wraps=client.describe_certificate) as describe:
+            assert acm.find_certificate(client, "example.com", "us-east-1") == "arn:aws:acm:us-east-1:123:certificate/1"
+            assert describe.call_count == 0
+            assert acm.find_certificate(client, "v1.api.example.com", "us-east-1") == "arn:aws:acm:us-east-1:123:certificate/1"
+            assert acm.find_certificate(client, "www.example.com", "us-east-1") == "arn:aws:acm:us-east-1:123:certificate/1"
+            assert describe.call_count == 1
+
+    def test_concurrent_find_certificate_shares_one_listing(self):
+        import threading
+        import time
+        client = MockACMClient(region="us-east-1")
+        client._certs["arn:aws:acm:us-east-1:123:certificate/1"] = {
+            "CertificateArn": "arn:aws:acm:us-east-1:123:certificate/1",
+            "DomainName": "*.example.com",
+            "Status": "ISSUED",
+            "SubjectAlternativeNames": ["*.example.com"],
+        }
+        real_get_paginator = client.get_paginator
+        calls = []
+
+        def slow_get_paginator(name):
+            calls.append(name)
+            time.sleep(0.1)
+            return real_get_paginator(name)
+
+        results = []
+        with patch.object(client, "get_paginator", side_effect=slow_get_paginator):
+            threads = [
+                threading.Thread(target=lambda d=d: results.append(acm.find_certificate(client, d, "us-east-1")))
+                for d in ["a.example.com", "a.example.com", "b.example.com", "c.example.com"]
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        assert results == ["arn:aws:acm:us-east-1:123:certificate/1"] * 4
+        assert len(calls) == 1
+
+    def test_find_certificate_stops_listing_at_issued_exact_match(self):
+        client = MockACMClient(region="us-east-1")
+        pages_read = []
+
+        def summary(n, domain):
+            return {"CertificateArn": f"arn:{n}", "DomainName": domain, "Status": "ISSUED",
+                    "SubjectAlternativeNameSummaries": [domain]}
+
+        class Paginator:
+            def paginate(self, **kwargs):
+                for n, page in enumerate([[summary(1, "example.com")], [summary(2, "*.other.com")]]):
+                    pages_read.append(n)
+                    yield {"CertificateSummaryList": page}
+
+        with patch.object(client, "get_paginator", return_value=Paginator()):
+            assert acm.find_certificate(client, "example.com", "us-east-1") == "arn:1"
+            assert pages_read == [0]
+            # A later lookup the first page can't answer resumes the same listing
+            assert acm.find_certificate(client, "app.other.com", "us-east-1") == "arn:2"
+            assert pages_read == [0, 1]
+
+    def test_find_certificate_caches_result(self):
+        client = MockACMClient(region="us-east-1")
+        client._certs["arn:aws:acm:us-east-1:123:certificate/1"] = {
+            "CertificateArn": "arn:aws:acm:us-east-1:123:certificate/1",
+            "DomainName": "example.com",
+            "Status": "ISSUED",
+            "SubjectAlternativeNames": ["example.com"],
+        }
+        assert acm.find_certificate(client, "example.com", "us-east-1") == "arn:aws:acm:us-east-1:123:certificate/1"
+        # Cached: the lookup no longer depends on ACM state
+        client._certs.clear()
+        assert acm.find_certificate(client, "example.com", "us-east-1") == "arn:aws:acm:us-east-1:123:certificate/1"
+
+    def test_find_certificate_reuses_disk_cache_across_runs(self):
+        client = MockACMClient(region="us-east-1")
+        client._certs["arn:aws:acm:us-east-1:123:certificate/1"] = {
+            "CertificateArn": "arn:aws:acm:us-east-1:123:certificate/1",
+            "DomainName": "example.com",
+            "Status": "ISSUED",
+            "SubjectAlternativeNames": ["example.com"],
+        }
+        assert acm.find_certificate(client, "example.com", "us-east-1", "123") == "arn:aws:acm:us-east-1:123:certificate/1"
+        acm._invalidate_cert_cache()  # A new process starts with empty memory caches
+        with patch.object(client, "get_paginator", side_effect=AssertionError("listing not expected")):
+            assert acm.find_certificate(client, "example.com", "us-east-1", "123") == "arn:aws:acm:us-east-1:123:certificate/1"
+
+    def test_find_certificate_drops_stale_disk_entry(self):
+        client = MockACMClient(region="us-east-1")
+        client._certs["arn:aws:acm:us-east-1:123:certificate/1"] = {
+            "CertificateArn": "arn:aws:acm:us-east-1:123:certificate/1",
+            "DomainName": "example.com",
+            "Status": "ISSUED",
+            "SubjectAlternativeNames": ["example.com"],
+        }
+        acm.find_certificate(client, "example.com", "us-east-1", "123")
+        acm._invalidate_cert_cache()
+        client._certs.clear()
+        assert acm.find_certificate(client, "example.com", "us-east-1", "123") is None
+        assert acm.utils.load_json_cache(acm.CERT_DISK_CACHE) == {}
+
+    def test_request_certificate_invalidates_negative_cache(self):
+        client = MockACMClient(region="us-east-1")
+        assert acm.find_certificate(client, "example.com", "us-east-1") is None
+        arn = acm.request_certificate(client, "example.com", "us-east-1", allow_create=True)
+        assert acm.find_certificate(client, "example.com", "us-east-1") == arn
+
+    def test_request_certificate_seeds_lookup_cache(self):
+        client = MockACMClient(region="us-east-1")
+        arn = acm.request_certificate(client, "app.example.com", "us-east-1", allow_create=True)
+        with patch.object(client, "get_paginator", side_effect=AssertionError("listing not expected")):
+            assert acm.find_certificate(client, "app.example.com", "us-east-1") == arn
+
+    def test_parse_domain(self):
+        assert acm._parse_domain("example.com") == (False, None, None)
+        assert acm._parse_domain("app.example.com") == (True, "example.com", "*.example.com")
+        assert acm._parse_domain("a.b.example.com") == (True, "b.example.com", "*.b.example.com")
+
     def test_get_certificate_validation_records(self):
         client = MockACMClient(region="us-east-1")
         response = client.request_certificate(DomainName="example.com", ValidationMethod="DNS")
@@ -132,12 +333,133 @@ class TestACMWithMock:
         result = acm.wait_for_certificate_validation(client, "arn:test", timeout_minutes=1)
         assert result is True
 
+    def test_wait_for_certificate_validation_pending_returns_false(self):
+        client = MockACMClient(region="us-east-1")
+        response = client.request_certificate(DomainName="example.com", ValidationMethod="DNS")
+        clock = [0.0]
+        with patch("aws.acm.time.monotonic", side_effect=lambda: clock[0]), \
+                patch("aws.acm.time.sleep", side_effect=lambda s: clock.__setitem__(0, clock[0] + s)) as sleep:
+            result = acm.wait_for_certificate_validation(client, response["CertificateArn"], timeout_minutes=1)
+        assert result is False
+        # Polled every VALIDATION_POLL_INTERVAL seconds until the minute was up
+        assert sum(c.args[0] for c in sleep.call_args_list) == 60
+
+    def test_wait_for_certificate_validation_stops_when_cancelled(self):
+        import threading
+        client = MockACMClient(region="us-east-1")
+        response = client.request_certificate(DomainName="example.com", ValidationMethod="DNS")
+        cancel = threading.Event()
+        cancel.set()
+        result = acm.wait_for_certificate_validation(
+            client, response["CertificateArn"], timeout_minutes=30, cancel_event=cancel)
+        assert result is False
+
     def test_describe_certificate_not_found_raises(self):
         client = MockACMClient(region="us-east-1")
         with pytest.raises(ResourceNotFoundException):
             client.describe_certificate(CertificateArn="arn:aws:acm:us-east-1:123:certificate/nonexistent")
 
 
+class TestALBWithMock:
+    """Tests for aws.alb using MockELBv2Client."""
+
+    def test_existing_alb_lookup_is_cached(self):
+        client = MockELBv2Client()
+        client.create_load_balancer(Name="myapp-alb")
+        with patch.object(client, "describe_load_balancers", wraps=client.describe_load_balancers) as describe:
+            first = alb.create_application_load_balancer(client, None, "myapp", "vpc-1", [], "sg-1")
+            second = alb.create_application_load_balancer(client, None, "myapp", "vpc-1", [], "sg-1")
+        assert first == second
+        assert describe.call_count == 1
+
+    def test_missing_alb_is_not_cached(self):
+        client = MockELBv2Client()
+        alb_arn, _ = alb.create_application_load_balancer(client, None, "myapp", "vpc-1", [], "sg-1", allow_create=True)
+        assert alb.create_application_load_balancer(client, None, "myapp", "vpc-1", [], "sg-1")[0] == alb_arn
+
+    def test_target_group_cache_invalidated_on_health_check_update(self):
+        client = MockELBv2Client()
+        tg_arn = alb.create_target_group(client, "vpc-1", "myapp", allow_create=True)
+        assert alb.create_target_group(client, "vpc-1", "myapp", health_check_path="/ready") == tg_arn
+        with patch.object(client, "modify_target_group", wraps=client.modify_target_group) as modify:
+            alb.create_target_group(client, "vpc-1", "myapp", health_check_path="/ready")
+        assert modify.call_count == 0
+        assert client.state["target_groups"]["myapp-tg"]["HealthCheckPath"] == "/ready"
+
+    def test_new_alb_skips_listener_describe(self):
+        client = MockELBv2Client()
+        alb_arn, _ = alb.create_application_load_balancer(client, None, "myapp", "vpc-1", [], "sg-1", allow_create=True)
+        with patch.object(client, "describe_listeners", side_effect=AssertionError("describe not expected")):
+            listener_arn = alb.create_listener(client, alb_arn, "tg-1", allow_create=True)
+        assert client.state["listeners"][alb_arn][0]["ListenerArn"] == listener_arn
+
+    def test_listener_cache_invalidated_on_create(self):
+        client = MockELBv2Client()
+        alb_arn, _ = alb.create_application_load_balancer(client, None, "myapp", "vpc-1", [], "sg-1", allow_create=True)
+        with pytest.raises(SystemExit):
+            alb.create_listener(client, alb_arn, "tg-1")
+        listener_arn = alb.create_listener(client, alb_arn, "tg-1", allow_create=True)
+        with patch.object(client, "describe_listeners", wraps=client.describe_listeners) as describe:
+            assert alb.create_listener(client, alb_arn, "tg-1") == listener_arn
+            assert alb.create_listener(client, alb_arn, "tg-1") == listener_arn
+        assert describe.call_count == 1
+
+    def _wait_clients(self, health_responses):
+        ecs_client = MagicMock()
+        ecs_client.describe_services.return_value = {"services": [{
+            "loadBalancers": [{"targetGroupArn": "tg-1"}], "runningCount": 1, "desiredCount": 1,
+        }]}
+        elbv2_client = MagicMock()
+        elbv2_client.describe_target_health.side_effect = [
+            {"TargetHealthDescriptions": [{"TargetHealth": h} for h in targets]} for targets in health_responses
+        ]
+        return elbv2_client, ecs_client
+
+    def test_wait_for_healthy_targets_returns_on_first_healthy(self):
+        elbv2_client, ecs_client = self._wait_clients([
+            [],
+            [{"State": "initial", "Reason": "Elb.RegistrationInProgress"}],
+            [{"State": "healthy"}],
+        ])
+        with patch("aws.alb.time.sleep"):
+            assert alb.wait_for_healthy_targets(elbv2_client, ecs_client, "c", "s", "tg-1") is True
+        assert elbv2_client.describe_target_health.call_count == 3
+        # All desired tasks were running on the first poll, so ECS isn't asked again
+        assert ecs_client.describe_services.call_count == 1
+
+    def test_wait_for_healthy_targets_requires_load_balancer_config(self):
+        elbv2_client, ecs_client = self._wait_clients([[]])
+        ecs_client.describe_services.return_value = {"services": [{"loadBalancers": [], "runningCount": 0, "desiredCount": 1}]}
+        with patch("aws.alb.time.sleep") as sleep:
+            assert alb.wait_for_healthy_targets(elbv2_client, ecs_client, "c", "s", "tg-1") is False
+        assert sleep.call_count == 0
+
+    def _fake_clock(self):
+        clock = [0.0]
+        return (patch("aws.alb.time.monotonic", side_effect=lambda: clock[0]),
+                patch("aws.alb.time.sleep", side_effect=lambda s: clock.__setitem__(0, clock[0] + s)),
+                clock)
+
+    def test_wait_for_healthy_targets_gives_up_on_terminal_failures(self):
+        failing = [{"State": "unhealthy", "Reason": "Target.FailedHealthChecks"}]
+        elbv2_client, ecs_client = self._wait_clients([failing] * 100)
+        monotonic, sleep, clock = self._fake_clock()
+        with monotonic, sleep:
+            assert alb.wait_for_healthy_targets(elbv2_client, ecs_client, "c", "s", "tg-1") is False
+        # Gave up once the targets had failed for the whole window, well before the timeout
+        assert alb.TERMINAL_FAILURE_WINDOW <= clock[0] < alb.TERMINAL_FAILURE_WINDOW + alb.POLL_MAX_DELAY
+
+    def test_wait_for_healthy_targets_waits_out_task_replacement(self):
+        # The old target drains and fails health checks for a while before ECS's
+        # replacement registers and passes
+        failing = [{"State": "draining", "Reason": "Target.DeregistrationInProgress"}]
+        elbv2_client, ecs_client = self._wait_clients([failing] * 12 + [[{"State": "healthy"}]])
+        monotonic, sleep, clock = self._fake_clock()
+        with monotonic, sleep:
+            assert alb.wait_for_healthy_targets(elbv2_client, ecs_client, "c", "s", "tg-1") is True
+        assert clock[0] < alb.TERMINAL_FAILURE_WINDOW
+
+
 class TestCloudfrontWithMock:
     """Tests for aws.cloudfront using MockCloudFrontClient."""
 
@@ -156,3 +478,818 @@ class TestCloudfrontWithMock:
         assert inv_id is not None
         assert len(client.state["invalidations"]) == 1
         assert client.state["invalidations"][0]["Paths"] == ["/*"]
+
+    def _add_distribution(self, client, alias):
+        client.create_distribution(DistributionConfig={
+            "CallerReference": alias,
+            "Aliases": {"Quantity": 1, "Items": [alias]},
+            "Origins": {"Quantity": 1, "Items": [{"Id": "alb-origin", "DomainName": "alb.example.com",
+                                                   "CustomOriginConfig": {"OriginProtocolPolicy": "http-only"}}]},
+            "DefaultCacheBehavior": {},
+            "Enabled": True,
+            "Comment": "test",
+            "PriceClass": "PriceClass_All",
+            "ViewerCertificate": {"CloudFrontDefaultCertificate": True},
+        })
+
+    def test_existing_distribution_lookup_is_cached(self):
+        client = MockCloudFrontClient()
+        self._add_distribution(client, "app.example.com")
+        first = cloudfront.create_cloudfront_distribution(client, "alb.example.com", "app.example.com", "us-east-1")
+        with patch.object(client, "get_paginator", side_effect=AssertionError("listing not expected")):
+            second = cloudfront.create_cloudfront_distribution(client, "alb.example.com", "app.example.com", "us-east-1")
+        assert first == second == ("de1.cloudfront.net", "E1")
+
+    def test_existing_distribution_update_skipped_when_signature_unchanged(self):
+        client = MockCloudFrontClient()
+        self._add_distribution(client, "app.example.com")
+        client._distributions["E1"]["Config"]["PriceClass"] = "PriceClass_100"
+        cloudfront.create_cloudfront_distribution(client, "alb.example.com", "app.example.com", "us-east-1",
+                                                  certificate_arn="arn:cert")
+        config = client._distributions["E1"]["Config"]
+        assert config["PriceClass"] == "PriceClass_All"
+        assert config["ViewerCertificate"]["ACMCertificateArn"] == "arn:cert"
+        cloudfront._invalidate_distribution_cache()
+        with patch.object(client, "get_distribution_config", wraps=client.get_distribution_config) as get_config:
+            cloudfront.create_cloudfront_distribution(client, "alb.example.com", "app.example.com", "us-east-1",
+                                                      certificate_arn="arn:cert")
+            assert get_config.call_count == 0
+            assert "E1" not in cloudfront._prefetched_configs
+            # A different certificate changes the signature, so the config is checked again,
+            # using the copy read while verifying the indexed distribution
+            cloudfront._invalidate_distribution_cache()
+            cloudfront.create_cloudfront_distribution(client, "alb.example.com", "app.example.com", "us-east-1",
+                                                      certificate_arn="arn:cert2")
+            assert get_config.call_count == 0
+        assert client._distributions["E1"]["Config"]["ViewerCertificate"]["ACMCertificateArn"] == "arn:cert2"
+
+    def test_signature_skip_rechecks_distribution_changed_elsewhere(self):
+        client = MockCloudFrontClient()
+        self._add_distribution(client, "app.example.com")
+        cloudfront.create_cloudfront_distribution(client, "alb.example.com", "app.example.com", "us-east-1",
+                                                  certificate_arn="arn:cert")
+        cloudfront._invalidate_distribution_cache()
+        # The disk-index lookup reads the same ETag that was recorded, so the update is skipped
+        # and the config read on the way isn't kept around
+        cloudfront.create_cloudfront_distribution(client, "alb.example.com", "app.example.com", "us-east-1",
+                                                  certificate_arn="arn:cert")
+        assert "E1" not in cloudfront._prefetched_configs
+        # Someone switches the origin back to https-only outside this tool
+        dist = client._distributions["E1"]
+        dist["Config"]["Origins"]["Items"][0]["CustomOriginConfig"]["OriginProtocolPolicy"] = "https-only"
+        dist["ETag"] = "etag-E1-edited"
+        cloudfront._invalidate_distribution_cache()
+        cloudfront.create_cloudfront_distribution(client, "alb.example.com", "app.example.com", "us-east-1",
+                                                  certificate_arn="arn:cert")
+        origin = client._distributions["E1"]["Config"]["Origins"]["Items"][0]
+        assert origin["CustomOriginConfig"]["OriginProtocolPolicy"] == "http-only"
+
+    def test_distribution_scan_caches_other_aliases(self):
+        client = MockCloudFrontClient()
+        self._add_distribution(client, "one.example.com")
+        self._add_distribution(client, "two.example.com")
+        assert cloudfront.find_distribution_by_alias(client, "two.example.com")["Id"] == "E2"
+        with patch.object(client, "get_paginator", side_effect=AssertionError("listing not expected")):
+            assert cloudfront.find_distribution_by_alias(client, "one.example.com")["Id"] == "E1"
+
+    def test_distribution_found_from_disk_index_without_listing(self):
+        client = MockCloudFrontClient()
+        self._add_distribution(client, "app.example.com")
+        first = cloudfront.find_distribution_by_alias(client, "app.example.com")
+        cloudfront._invalidate_distribution_cache()
+        with patch.object(client, "get_paginator", side_effect=AssertionError("listing not expected")):
+            dist = cloudfront.find_distribution_by_alias(client, "app.example.com")
+        assert dist["Id"] == first["Id"]
+        assert dist["DomainName"] == first["DomainName"]
+
+    def test_deleted_distribution_dropped_from_disk_index(self):
+        client = MockCloudFrontClient()
+        self._add_distribution(client, "app.example.com")
+        cloudfront.find_distribution_by_alias(client, "app.example.com")
+        cloudfront._invalidate_distribution_cache()
+        client._distributions.clear()
+        assert cloudfront.find_distribution_by_alias(client, "app.example.com") is None
+        assert "app.example.com" not in cloudfront.utils.load_json_cache(cloudfront.DIST_INDEX_FILE)
+
+    def test_find_alb_origin(self):
+        s3_origin = {"Id": "s3-origin"}
+        named = {"Id": "my-ALB"}
+        exact = {"Id": "alb-origin"}
+        assert cloudfront._find_alb_origin({"Origins": {"Items": [s3_origin, named, exact]}}) is exact
+        assert cloudfront._find_alb_origin({"Origins": {"Items": [s3_origin, named]}}) is named
+        assert cloudfront._find_alb_origin({"Origins": {"Items": [s3_origin]}}) is None
+
+    def test_create_distribution_fills_template_without_mutating_it(self):
+        client = MockCloudFrontClient()
+        _, dist_id = cloudfront.create_cloudfront_distribution(
+            client, "alb.example.com", "new.example.com", "us-east-1",
+            allow_create=True, certificate_arn="arn:cert")
+        config = client.state["distributions"][dist_id]["Config"]
+        assert config["Aliases"]["Items"] == ["new.example.com"]
+        assert config["Origins"]["Items"][0]["DomainName"] == "alb.example.com"
+        assert config["ViewerCertificate"]["ACMCertificateArn"] == "arn:cert"
+        assert cloudfront._CF_TEMPLATE["Aliases"]["Items"] is None
+        assert cloudfront._CF_TEMPLATE["Origins"]["Items"][0]["DomainName"] is None
+
+    def test_diff_distribution_config(self):
+        config = {
+            "PriceClass": "PriceClass_100",
+            "ViewerCertificate": {"CloudFrontDefaultCertificate": True},
+            "Origins": {"Items": [{"Id": "alb-origin", "CustomOriginConfig": {"OriginProtocolPolicy": "https-only"}}]},
+        }
+        desired = cloudfront._desired_distribution_settings("arn:cert")
+        updated, changes = cloudfront._diff_distribution_config(config, desired)
+        assert len(changes) == 3
+        assert updated["ViewerCertificate"]["ACMCertificateArn"] == "arn:cert"
+        assert updated["PriceClass"] == "PriceClass_All"
+        assert updated["Origins"]["Items"][0]["CustomOriginConfig"]["OriginProtocolPolicy"] == "http-only"
+        # The input config is left untouched
+        assert config["Origins"]["Items"][0]["CustomOriginConfig"]["OriginProtocolPolicy"] == "https-only"
+        again, changes = cloudfront._diff_distribution_config(updated, desired)
+        assert changes == [] and again is updated
+
+    def test_wait_for_cloudfront_deployment(self):
+        client = MockCloudFrontClient()
+        self._add_distribution(client, "app.example.com")
+        assert cloudfront.wait_for_cloudfront_deployment(client, "E1") is True
+        client._distributions["E1"]["Status"] = "InProgress"
+        assert cloudfront.wait_for_cloudfront_deployment(client, "E1", timeout_minutes=1) is False
+
+    def test_invalidation_paths_are_coalesced(self):
+        assert cloudfront._coalesce_invalidation_paths(["/a.html", "/*", "/a.html"]) == ["/*"]
+        assert cloudfront._coalesce_invalidation_paths(["/img/*", "/img/logo.png", "/index.html"]) == ["/img/*", "/index.html"]
+
+    def test_invalidation_waits_for_oldest_when_at_quota(self):
+        client = MockCloudFrontClient()
+        first = cloudfront.invalidate_cloudfront_cache(client, "E1")
+        real_create = client.create_invalidation
+        attempts = []
+
+        def create_at_quota(**kwargs):
+            attempts.append(kwargs)
+            if len(attempts) == 1:
+                raise ClientError({"Error": {"Code": "TooManyInvalidationsInProgress", "Message": ""}}, "CreateInvalidation")
+            return real_create(**kwargs)
+
+        with patch.object(client, "create_invalidation", side_effect=create_at_quota), \
+                patch.object(client, "get_waiter", wraps=client.get_waiter) as get_waiter:
+            cloudfront.invalidate_cloudfront_cache(client, "E1")
+        get_waiter.assert_called_once_with("invalidation_completed")
+        assert len(attempts) == 2
+        assert first not in cloudfront._inflight_invalidations["E1"]
+
+
+class TestLightweightDeploy:
+    """Tests for aws.deploy.deploy_lightweight_public_app with MagicMock clients."""
+
+    def _session(self, tasks):
+        ecs_client = MagicMock()
+        ecs_client.list_tasks.return_value = {"taskArns": [t["taskArn"] for t in tasks]}
+        ecs_client.describe_tasks.return_value = {"tasks": tasks}
+        ec2_client = MagicMock()
+        clients_by_service = {"ecs": ecs_client, "ec2": ec2_client, "route53": MagicMock()}
+        session = MagicMock(region_name="us-east-2")
+        session.client.side_effect = AssertionError("clients come from clients.get_client")
+        session.clients_by_service = clients_by_service
+        return session, ecs_client, ec2_client
+
+    def _task(self, arn, **details):
+        return {"taskArn": arn, "lastStatus": "RUNNING", "attachments": [{
+            "type": "ElasticNetworkInterface",
+            "details": [{"name": name, "value": value} for name, value in details.items()],
+        }]}
+
+    def _deploy(self, session):
+        config = {"public": {"domain": "app.example.com"}}
+        with patch("aws.deploy.route53.create_or_update_dns_record") as record, patch("aws.deploy.time.sleep"), \
+                patch("aws.deploy.clients.get_client",
+                      side_effect=lambda service, region, profile: session.clients_by_service[service]) as get_client:
+            aws_deploy.deploy_lightweight_public_app(
+                session, config, ["subnet-1"], "sg-1", "td", "cluster", "svc", 1, True, True,
+                region="us-east-2", profile="dev")
+        assert {c.args[1:] for c in get_client.call_args_list} == {("us-east-2", "dev")}
+        return record
+
+    def test_waits_with_tasks_running_waiter_then_describes_once(self):
+        session, ecs_client, _ = self._session([self._task("t1", publicIPv4Address="1.2.3.4")])
+        record = self._deploy(session)
+        ecs_client.get_waiter.assert_called_once_with("tasks_running")
+        assert ecs_client.describe_tasks.call_count == 1
+        ecs_client.describe_services.assert_not_called()
+        assert record.call_args[0][2] == "1.2.3.4"
+
+    def test_existing_ingress_rule_costs_one_call(self, capsys):
+        session, _, ec2_client = self._session([self._task("t1", publicIPv4Address="1.2.3.4")])
+        ec2_client.authorize_security_group_ingress.side_effect = ClientError(
+            {"Error": {"Code": "InvalidPermission.Duplicate", "Message": "exists"}}, "AuthorizeSecurityGroupIngress")
+        self._deploy(session)
+        assert not ec2_client.describe_security_groups.called
+        assert "already allows inbound traffic on port 8080" in capsys.readouterr().out
+
+    def test_public_ips_looked_up_in_one_eni_batch(self):
+        session, _, ec2_client = self._session([
+            self._task("t1", networkInterfaceId="eni-1"),
+            self._task("t2", networkInterfaceId="eni-2"),
+        ])
+        paginate = ec2_client.get_paginator.return_value.paginate
+        paginate.return_value = [{"NetworkInterfaces": [
+            {"NetworkInterfaceId": "eni-2", "Association": {"PublicIp": "5.6.7.8"}},
+            {"NetworkInterfaceId": "eni-1"},
+        ]}]
+        record = self._deploy(session)
+        ec2_client.get_paginator.assert_called_once_with("describe_network_interfaces")
+        assert paginate.call_count == 1
+        assert paginate.call_args.kwargs["Filters"] == [{"Name": "network-interface-id", "Values": ["eni-1", "eni-2"]}]
+        assert record.call_args[0][2] == "5.6.7.8"
+
+
+class TestCertificateOverlap:
+    """Tests for requesting the CloudFront certificate in the background."""
+
+    def test_certificate_request_runs_in_background(self):
+        import threading
+        release = threading.Event()
+
+        def certificate_for_domain(acm_client, route53_client, domain, allow_create, account_id, cancel_event):
+            release.wait(5)
+            return f"arn:cert:{domain}"
+
+        with patch("aws.deploy._certificate_for_domain", side_effect=certificate_for_domain), \
+                patch("aws.deploy.clients.get_client"):
+            future, _ = aws_deploy._start_certificate_request("us-east-2", None, "app.example.com", True, "123")
+            # The caller gets control back while the certificate is still pending
+            assert not future.done()
+            # A daemon thread, so a failing deploy can exit without waiting for it
+            assert any(t.name == "certificate-request" and t.daemon for t in threading.enumerate())
+            release.set()
+            assert future.result(timeout=5) == "arn:cert:app.example.com"
+
+    def test_cancelled_request_exits_without_blocking(self):
+        def certificate_for_domain(acm_client, route53_client, domain, allow_create, account_id, cancel_event):
+            # Stands in for the validation wait; returns as soon as the deploy gives up
+            cancel_event.wait(30)
+            sys.exit(1)
+
+        with patch("aws.deploy._certificate_for_domain", side_effect=certificate_for_domain), \
+                patch("aws.deploy.clients.get_client"):
+            future, cancel = aws_deploy._start_certificate_request("us-east-2", None, "app.example.com", True, "123")
+            cancel.set()
+            with pytest.raises(SystemExit):
+                future.result(timeout=5)
+
+
+    def test_missing_distribution_fails_before_service_update(self):
+        route53_client = MockRoute53Client()
+        route53_client.add_hosted_zone("/hostedzone/Z123", "example.com")
+        cert_future = MagicMock()
+        cert_future.result.return_value = "arn:cert"
+        with patch("aws.deploy.clients.get_client"), pytest.raises(SystemExit):
+            aws_deploy._prepare_cdn(route53_client, MockCloudFrontClient(), "app.example.com", "123",
+                                    False, None, certificate_future=cert_future)
+
+    def test_prepared_dns_record_is_written_by_setup(self):
+        route53_client = MockRoute53Client()
+        route53_client.add_hosted_zone("/hostedzone/Z123", "example.com")
+        cert_future = MagicMock()
+        cert_future.result.return_value = "arn:cert"
+        with patch("aws.deploy.clients.get_client"):
+            cert_arn, dns_record = aws_deploy._prepare_cdn(
+                route53_client, MockCloudFrontClient(), "app.example.com", "123", True, None,
+                certificate_future=cert_future)
+        assert cert_arn == "arn:cert"
+        assert dns_record == ("/hostedzone/Z123", "app.example.com.", None)
+        with patch("aws.deploy.cloudfront.create_cloudfront_distribution", return_value=("d1.cloudfront.net", "E1")), \
+                patch("aws.deploy.route53.find_hosted_zone") as find_zone:
+            result = aws_deploy._setup_cdn(route53_client, MagicMock(), "app.example.com", "alb.example.com",
+                                           "us-east-2", True, cert_arn, dns_record)
+        assert result == ("d1.cloudfront.net", "E1")
+        find_zone.assert_not_called()
+        records = route53_client.state["record_sets"]["/hostedzone/Z123"]
+        assert records[0]["AliasTarget"]["DNSName"] == "d1.cloudfront.net."
+
+class TestDeploymentProbes:
+    """Tests for the HTTP checks run by aws.deploy after a public deploy."""
+
+    def test_probes_run_concurrently_and_score_partial_success(self):
+        import threading
+        barrier = threading.Barrier(2, timeout=5)
+
+        def request(method, url, **kwargs):
+            # Both probes must be in flight at the same time to get past the barrier
+            barrier.wait()
+            return MagicMock(status=404, reason="Not Found", headers={})
+
+        with patch.object(aws_deploy._http, "request", side_effect=request) as sent, \
+                patch("aws.deploy._wait_for_dns"), patch("aws.deploy._wait_for_first_response"), \
+                patch("aws.deploy.time.sleep"):
+            aws_deploy.test_deployment_http_requests(
+                {"domain": "app.example.com", "mode": "lightweight"}, "d1.cloudfront.net")
+        # Two 4xx answers score 0.5 each, which is enough to pass on the first attempt
+        assert sent.call_count == 2
+        assert barrier.broken is False
+
+    def test_attempt_ends_once_enough_probes_succeed(self):
+        import threading
+        release = threading.Event()
+
+        def request(method, url, **kwargs):
+            if "cloudfront" in url:
+                release.wait(5)
+            return MagicMock(status=200, headers={})
+
+        try:
+            with patch.object(aws_deploy._http, "request", side_effect=request), \
+                    patch("aws.deploy._wait_for_dns"), patch("aws.deploy._wait_for_first_response"), \
+                    patch("aws.deploy.time.sleep"):
+                aws_deploy.test_deployment_http_requests(
+                    {"domain": "app.example.com", "mode": "lightweight"}, "d1.cloudfront.net")
+            # Returned while the CloudFront probe was still blocked
+            assert not release.is_set()
+        finally:
+            release.set()
+
+    def test_warmup_stops_at_first_response(self):
+        import urllib3
+        failures = [urllib3.exceptions.NewConnectionError(None, "refused")] * 2
+        with patch.object(aws_deploy._http, "request", side_effect=failures + [MagicMock(status=502)]) as sent, \
+                patch("aws.deploy.time.sleep") as sleep:
+            assert aws_deploy._wait_for_first_response("https://app.example.com", 30) is True
+        assert sent.call_count == 3
+        assert sleep.call_count == 2
+
+    def test_warmup_never_runs_past_max_wait(self):
+        import urllib3
+        clock = [0.0]
+
+        def request(method, url, timeout=None, **kwargs):
+            # Every request hangs until its timeout cuts it off
+            clock[0] += timeout.total
+            raise urllib3.exceptions.ReadTimeoutError(None, url, "timed out")
+
+        with patch.object(aws_deploy._http, "request", side_effect=request), \
+                patch("aws.deploy.time.monotonic", side_effect=lambda: clock[0]), \
+                patch("aws.deploy.time.sleep", side_effect=lambda s: clock.__setitem__(0, clock[0] + s)) as sleep:
+            assert aws_deploy._wait_for_first_response("https://app.example.com", 5) is False
+        assert clock[0] == 5
+        sleep.assert_not_called()
+
+    def test_dns_wait_stops_once_domain_resolves(self):
+        import socket
+        answers = [socket.gaierror("not yet"), socket.gaierror("not yet"), "1.2.3.4"]
+        with patch("aws.deploy.socket.gethostbyname", side_effect=answers) as resolve, \
+                patch("aws.deploy.time.sleep") as sleep:
+            assert aws_deploy._wait_for_dns("app.example.com") is True
+        assert resolve.call_count == 3
+        # Checks start half a second apart and slow down from there
+        assert [c.args[0] for c in sleep.call_args_list] == [0.5, 1.0]
+
+    def test_probe_uses_head_and_falls_back_to_get(self):
+        responses = [MagicMock(status=405, headers={}), MagicMock(status=200, headers={})]
+        with patch.object(aws_deploy._http, "request", side_effect=responses) as sent:
+            score, _ = aws_deploy._probe_url("https://app.example.com")
+        assert score == 1
+        assert [c.args[0] for c in sent.call_args_list] == ["HEAD", "GET"]
+
+
+class TestClients:
+    """Tests for aws.clients session reuse and client configuration."""
+
+    def test_get_session_is_shared_per_profile_and_region(self):
+        import aws.clients as clients
+        with patch.object(clients, "_sessions", {}):
+            first = clients.get_session(None, "us-east-1")
+            assert clients.get_session(None, "us-east-1") is first
+            assert clients.get_session(None, "us-west-2") is not first
+
+    def test_credentials_resolved_once_per_profile(self, monkeypatch):
+        import aws.clients as clients
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIDEXAMPLE")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+        with patch.object(clients, "_sessions", {}), patch.object(clients, "_credential_providers", {}):
+            east = clients.get_session(None, "us-east-1")
+            west = clients.get_session(None, "us-west-2")
+            assert east.get_credentials() is west.get_credentials()
+            assert east.get_credentials().access_key == "AKIDEXAMPLE"
+            assert (east.region_name, west.region_name) == ("us-east-1", "us-west-2")
+
+    def test_make_client_uses_tuned_config(self):
+        import aws.clients as clients
+        with patch.object(clients, "_sessions", {}):
+            client = clients.make_client("acm", "us-east-1")
+        assert client.meta.config.max_pool_connections == 32
+        assert client.meta.config.retries["mode"] == "adaptive"
+        assert client.meta.config.connect_timeout == 5
+        assert client.meta.config.read_timeout == 30
+
+    def test_session_clients_default_to_tuned_config(self):
+        import aws.clients as clients
+        with patch.object(clients, "_sessions", {}):
+            client = clients.get_session(None, "us-east-1").client("ec2")
+        assert client.meta.config.retries["mode"] == "adaptive"
+        assert client.meta.config.read_timeout == 30
+
+    def test_get_client_is_memoized(self):
+        import aws.clients as clients
+        with patch.object(clients, "_sessions", {}), patch.object(clients, "_clients", {}):
+            first = clients.get_client("sts", "us-east-1")
+            assert clients.get_client("sts", "us-east-1") is first
+            assert clients.get_client("sts", "us-west-2") is not first
+
+    def test_get_account_id_calls_sts_once(self):
+        import aws.clients as clients
+        sts = MockSTSClient()
+        with patch.object(clients, "get_client", return_value=sts) as get_client, \
+                patch.object(sts, "get_caller_identity", wraps=sts.get_caller_identity) as identity:
+            assert clients.get_account_id("p", "us-east-1") == clients.get_account_id("p", "us-east-1")
+        assert identity.call_count == 1
+        get_client.assert_called_once_with("sts", "us-east-1", "p")
+
+
+FARGATE_CONFIG = """
+platform: fargate
+app_name: myapp
+aws:
+  region: us-east-2
+task:
+  cpu: 256
+  memory: 512
+  ephemeral_storage: 21gb
+"""
+
+
+class TestConfig:
+    """Tests for aws.config.load_config."""
+
+    def test_load_config_is_cached_until_file_changes(self, tmp_path):
+        path = tmp_path / "deploy.yaml"
+        path.write_text(FARGATE_CONFIG)
+        first = aws_config.load_config(str(path))
+        assert first["app_name"] == "myapp"
+        assert first["ephemeral_storage"] == 21
+        first["app_name"] = "mutated"
+        with patch("aws.config.yaml.load", side_effect=AssertionError("parse not expected")):
+            assert aws_config.load_config(str(path))["app_name"] == "myapp"
+        path.write_text(FARGATE_CONFIG.replace("myapp", "otherapp"))
+        assert aws_config.load_config(str(path))["app_name"] == "otherapp"
+
+    def test_load_config_reports_all_missing_fields(self, tmp_path):
+        path = tmp_path / "deploy.yaml"
+        path.write_text("platform: fargate\ntask:\n  cpu: 256\n")
+        with pytest.raises(aws_config.ConfigError) as excinfo:
+            aws_config.load_config(str(path))
+        assert len(excinfo.value.problems) == 4
+        for field in ("'app_name'", "'memory'", "'ephemeral_storage'", "'region'"):
+            assert field in str(excinfo.value)
+        assert "'cpu'" not in str(excinfo.value)
+
+    def test_load_config_errors_do_not_exit(self, tmp_path):
+        good = tmp_path / "good.yaml"
+        good.write_text(FARGATE_CONFIG)
+        bad = tmp_path / "bad.yaml"
+        bad.write_text(FARGATE_CONFIG.replace("21gb", "lots"))
+        with pytest.raises(aws_config.ConfigError):
+            aws_config.load_config(str(bad))
+        with pytest.raises(aws_config.ConfigError):
+            aws_config.load_config(str(tmp_path / "missing.yaml"))
+        assert aws_config.load_config(str(good))["app_name"] == "myapp"
+
+
+class TestRunCommand:
+    """Tests for aws.utils.run_command."""
+
+    def test_argument_list_runs_without_a_shell(self, capsys):
+        import aws.utils as utils
+        # A shell would expand $HOME; an argument list passes it through untouched
+        utils.run_command([sys.executable, "-c", "import sys; print(sys.argv[1])", "$HOME"], "failed", stream_output=True)
+        assert capsys.readouterr().out.strip() == "$HOME"
+        result = utils.run_command([sys.executable, "-c", "print('captured')"], "failed")
+        assert result.stdout.strip() == "captured"
+
+    def test_failed_command_exits(self):
+        import aws.utils as utils
+        with pytest.raises(SystemExit):
+            utils.run_command([sys.executable, "-c", "raise SystemExit(3)"], "failed")
+
+
+class TestSecurityGroups:
+    """Tests for aws.vpc security group lookups with a MagicMock EC2 client."""
+
+    def test_alb_group_found_with_app_group_in_one_call(self):
+        import aws.vpc as vpc
+        ec2_client = MagicMock()
+        ec2_client.describe_vpcs.return_value = {"Vpcs": [{"VpcId": "vpc-1"}]}
+        ec2_client.describe_subnets.return_value = {"Subnets": [{"SubnetId": "s-1"}, {"SubnetId": "s-2"}]}
+        ec2_client.describe_security_groups.return_value = {"SecurityGroups": [
+            {"GroupName": "app-sg", "GroupId": "sg-app"},
+            {"GroupName": "app-alb-sg", "GroupId": "sg-alb"},
+        ]}
+        _, sg_id, vpc_id = vpc.get_default_vpc_resources(ec2_client, "app")
+        assert sg_id == "sg-app"
+        assert vpc.create_alb_security_group(ec2_client, vpc_id, "app") == "sg-alb"
+        assert ec2_client.describe_security_groups.call_count == 1
+        names = ec2_client.describe_security_groups.call_args.kwargs["Filters"][1]["Values"]
+        assert names == ["app-sg", "app-alb-sg"]
+
+
+class TestDockerPing:
+    """Tests for the aws.docker daemon readiness checks."""
+
+    def test_socket_ping_short_circuits_docker_info(self, tmp_path, monkeypatch):
+        import socket
+        import threading
+        import aws.docker as docker
+        path = str(tmp_path / "d.sock")
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+
+        def answer():
+            conn, _ = server.accept()
+            with conn:
+                assert conn.recv(1024).startswith(b"GET /_ping ")
+                conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nOK")
+
+        thread = threading.Thread(target=answer)
+        thread.start()
+        monkeypatch.setenv("DOCKER_HOST", "unix://" + path)
+        with patch.object(docker.subprocess, "run") as run:
+            assert docker.ensure_docker_running() is True
+        thread.join()
+        server.close()
+        run.assert_not_called()
+
+    def test_tcp_docker_host_is_pinged_directly(self, monkeypatch):
+        import socket
+        import threading
+        import aws.docker as docker
+        server = socket.create_server(("127.0.0.1", 0))
+        port = server.getsockname()[1]
+
+        def answer():
+            conn, _ = server.accept()
+            with conn:
+                conn.recv(1024)
+                conn.sendall(b"HTTP/1.1 200 OK\r\n\r\nOK")
+
+        thread = threading.Thread(target=answer)
+        thread.start()
+        monkeypatch.setenv("DOCKER_HOST", f"tcp://127.0.0.1:{port}")
+        monkeypatch.delenv("DOCKER_TLS_VERIFY", raising=False)
+        assert docker._docker_endpoints() == [("127.0.0.1", port)]
+        assert docker._ping_docker(("127.0.0.1", port)) is True
+        thread.join()
+        server.close()
+        monkeypatch.setenv("DOCKER_TLS_VERIFY", "1")
+        assert docker._docker_endpoints() == []
+
+    def test_missing_socket_falls_back_to_docker_info(self, tmp_path, monkeypatch):
+        import aws.docker as docker
+        monkeypatch.setenv("DOCKER_HOST", "unix://" + str(tmp_path / "none.sock"))
+        with patch.object(docker.subprocess, "run", return_value=MagicMock(returncode=0)) as run:
+            assert docker.ensure_docker_running() is True
+        assert run.call_args.args[0] == ["docker", "info"]
+
+
+class TestECRLogin:
+    """Tests for aws.ecr login and push with a MagicMock ECR client."""
+
+    def test_login_uses_api_token_once_per_session(self):
+        import base64
+        from datetime import datetime, timedelta, timezone
+        import aws.ecr as ecr
+        ecr_client = MagicMock()
+        ecr_client.get_authorization_token.return_value = {"authorizationData": [{
+            "authorizationToken": base64.b64encode(b"AWS:secret").decode(),
+            "expiresAt": datetime.now(timezone.utc) + timedelta(hours=12),
+        }]}
+        registry = "123.dkr.ecr.us-east-1.amazonaws.com"
+        with patch.object(ecr.utils, "run_command") as run:
+            ecr.login_to_ecr(ecr_client, registry)
+            ecr.login_to_ecr(ecr_client, registry)
+        assert ecr_client.get_authorization_token.call_count == 1
+        assert run.call_count == 1
+        assert run.call_args.args[0] == ["docker", "login", "--username", "AWS", "--password-stdin", registry]
+        assert run.call_args.kwargs["input"] == "secret"
+
+    def test_build_pushes_directly_to_ecr_tag(self):
+        import aws.ecr as ecr
+        with patch.object(ecr.clients, "get_account_id", return_value="123"), \
+                patch.object(ecr.docker, "ensure_docker_running"), \
+                patch.object(ecr, "login_to_ecr") as login, \
+                patch.object(ecr.utils, "run_command") as run:
+            image_name = ecr.build_and_push_image(MagicMock(), "repo", "us-east-1", None,
+                                                  build_context="app")
+        login.assert_called_once()
+        assert run.call_count == 1
+        command = run.call_args.args[0]
+        assert "--push" in command and "--load" not in command
+        assert command[-1] == "app"
+        assert command[command.index("-f") + 1] == os.path.join("app", "Dockerfile")
+        assert command[command.index("-t") + 1] == image_name
+        assert image_name.startswith("123.dkr.ecr.us-east-1.amazonaws.com/repo:latest-")
+
+
+class TestIAMRole:
+    """Tests for aws.iam role policy sync with a MagicMock IAM client."""
+
+    def test_policies_attached_and_detached(self):
+        import aws.iam as iam
+        iam_client = MagicMock()
+        iam_client.exceptions.NoSuchEntityException = type("NoSuchEntityException", (Exception,), {})
+        iam_client.delete_role_policy.side_effect = iam_client.exceptions.NoSuchEntityException()
+        iam_client.list_attached_role_policies.return_value = {"AttachedPolicies": [
+            {"PolicyArn": "arn:keep"}, {"PolicyArn": "arn:old"},
+        ]}
+        role_arn = iam.ensure_ecs_execution_role(iam_client, "123", ["arn:keep", "arn:new1", "arn:new2"])
+        assert role_arn == "arn:aws:iam::123:role/ecsTaskExecutionRole"
+        attached = {c.kwargs["PolicyArn"] for c in iam_client.attach_role_policy.call_args_list}
+        assert attached == {"arn:new1", "arn:new2"}
+        iam_client.detach_role_policy.assert_called_once_with(RoleName="ecsTaskExecutionRole", PolicyArn="arn:old")
+        iam_client.get_role.assert_not_called()
+        iam_client.create_role.assert_not_called()
+
+    def test_recent_sync_is_reused_until_policies_change(self):
+        import aws.iam as iam
+        iam_client = MagicMock()
+        iam_client.exceptions.NoSuchEntityException = type("NoSuchEntityException", (Exception,), {})
+        iam_client.delete_role_policy.side_effect = iam_client.exceptions.NoSuchEntityException()
+        iam_client.list_attached_role_policies.return_value = {"AttachedPolicies": [{"PolicyArn": "arn:a"}]}
+        iam.ensure_ecs_execution_role(iam_client, "123", ["arn:a"])
+        iam.ensure_ecs_execution_role(iam_client, "123", ["arn:a"])
+        assert iam_client.list_attached_role_policies.call_count == 1
+        iam.ensure_ecs_execution_role(iam_client, "123", ["arn:a", "arn:b"])
+        assert iam_client.list_attached_role_policies.call_count == 2
+
+    def test_missing_role_is_created_with_all_policies(self):
+        import aws.iam as iam
+        iam_client = MagicMock()
+        iam_client.exceptions.NoSuchEntityException = type("NoSuchEntityException", (Exception,), {})
+        iam_client.list_attached_role_policies.side_effect = iam_client.exceptions.NoSuchEntityException()
+        iam.ensure_ecs_execution_role(iam_client, "123", ["arn:a", "arn:b"], allow_create=True)
+        iam_client.create_role.assert_called_once()
+        attached = {c.kwargs["PolicyArn"] for c in iam_client.attach_role_policy.call_args_list}
+        assert attached == {"arn:a", "arn:b"}
+
+    def test_failed_attach_is_raised(self):
+        import aws.iam as iam
+        iam_client = MagicMock()
+        iam_client.attach_role_policy.side_effect = RuntimeError("denied")
+        with pytest.raises(RuntimeError):
+            iam._sync_role_policies(iam_client, "role", ["arn:a", "arn:b"], [])
+        assert iam_client.attach_role_policy.call_count == 2
+
+
+class TestLogGroups:
+    """Tests for aws.logs with a MagicMock CloudWatch Logs client."""
+
+    def test_existing_log_group_described_once(self):
+        import aws.logs as logs
+        logs_client = MagicMock()
+        logs_client.describe_log_groups.return_value = {"logGroups": [{"logGroupName": "/ecs/app"}]}
+        logs.ensure_cloudwatch_log_group(logs_client, "/ecs/app")
+        assert logs_client.describe_log_groups.call_count == 1
+        assert logs_client.describe_log_groups.call_args.kwargs["limit"] == 1
+        logs_client.create_log_group.assert_not_called()
+
+    def test_create_allowed_skips_describe(self):
+        import aws.logs as logs
+        logs_client = MagicMock()
+        logs_client.exceptions.ResourceAlreadyExistsException = type("ResourceAlreadyExistsException", (Exception,), {})
+        logs_client.create_log_group.side_effect = logs_client.exceptions.ResourceAlreadyExistsException()
+        logs.ensure_cloudwatch_log_group(logs_client, "/ecs/app", allow_create=True)
+        logs_client.describe_log_groups.assert_not_called()
+        logs_client.put_retention_policy.assert_not_called()
+
+
+class TestEventCapture:
+    """Tests for aws.events with MagicMock EventBridge and Logs clients."""
+
+    def _clients(self):
+        events_client = MagicMock()
+        events_client.exceptions.ResourceNotFoundException = type("ResourceNotFoundException", (Exception,), {})
+        events_client.put_targets.return_value = {"FailedEntryCount": 0, "FailedEntries": []}
+        logs_client = MagicMock()
+        logs_client.exceptions.ResourceAlreadyExistsException = type("ResourceAlreadyExistsException", (Exception,), {})
+        logs_client.describe_log_groups.side_effect = lambda logGroupNamePrefix, **kwargs: {
+            "logGroups": [{"logGroupName": logGroupNamePrefix}]
+        }
+        return events_client, logs_client
+
+    def test_steady_state_is_put_rule_and_put_targets(self):
+        import aws.events as events
+        events_client, logs_client = self._clients()
+        events.enable_event_capture(events_client, logs_client, "c", "us-east-1", "123", allow_create=True)
+        events_client.describe_rule.assert_not_called()
+        events_client.list_targets_by_rule.assert_not_called()
+        events_client.remove_targets.assert_not_called()
+        assert events_client.put_targets.call_args.kwargs["Targets"][0]["Id"] == "ecs-events-c"
+        pattern = events_client.put_rule.call_args.kwargs["EventPattern"]
+        assert ", " not in pattern and ": " not in pattern
+        assert json.loads(pattern)["source"] == ["aws.ecs"]
+
+    def test_rule_checked_once_when_creation_disabled(self):
+        import aws.events as events
+        events_client, logs_client = self._clients()
+        for _ in range(2):
+            events.enable_event_capture(events_client, logs_client, "c", "us-east-1", "123")
+        assert events_client.describe_rule.call_count == 1
+        assert events_client.put_rule.call_count == 2
+        events_client.describe_rule.side_effect = events_client.exceptions.ResourceNotFoundException()
+        with pytest.raises(SystemExit):
+            events.enable_event_capture(events_client, logs_client, "other", "us-east-1", "123")
+        assert events_client.put_rule.call_count == 2
+
+
+class TestCluster:
+    """Tests for aws.ecs.ensure_cluster with a MagicMock ECS client."""
+
+    def test_new_cluster_created_fully_configured(self):
+        import aws.ecs as ecs
+        ecs_client = MagicMock()
+        ecs_client.describe_clusters.return_value = {"clusters": [{"clusterName": "c", "status": "INACTIVE"}]}
+        ecs.ensure_cluster(ecs_client, "c", allow_create=True)
+        kwargs = ecs_client.create_cluster.call_args.kwargs
+        assert kwargs["capacityProviders"] == ["FARGATE", "FARGATE_SPOT"]
+        assert kwargs["settings"] == [{"name": "containerInsights", "value": "enhanced"}]
+        ecs_client.put_cluster_capacity_providers.assert_not_called()
+        ecs_client.update_cluster_settings.assert_not_called()
+
+    def test_configured_cluster_is_not_written(self):
+        import aws.ecs as ecs
+        ecs_client = MagicMock()
+        cluster = {
+            "clusterName": "c", "status": "ACTIVE",
+            "capacityProviders": ["FARGATE_SPOT", "FARGATE"], "defaultCapacityProviderStrategy": [],
+            "settings": [{"name": "containerInsights", "value": "enhanced"}],
+        }
+        ecs_client.describe_clusters.return_value = {"clusters": [cluster]}
+        ecs.ensure_cluster(ecs_client, "c")
+        ecs_client.put_cluster_capacity_providers.assert_not_called()
+        ecs_client.update_cluster_settings.assert_not_called()
+        # Only the setting that drifted is written back
+        cluster["settings"] = [{"name": "containerInsights", "value": "disabled"}]
+        ecs.ensure_cluster(ecs_client, "c")
+        ecs_client.put_cluster_capacity_providers.assert_not_called()
+        ecs_client.update_cluster_settings.assert_called_once()
+
+
+class TestService:
+    """Tests for aws.ecs.create_or_update_service with a MagicMock ECS client."""
+
+    def _service(self, **overrides):
+        service = {
+            "status": "ACTIVE", "taskDefinition": "arn:td:1", "desiredCount": 1, "runningCount": 1,
+            "capacityProviderStrategy": [{"capacityProvider": "FARGATE_SPOT", "weight": 1, "base": 0}],
+            "networkConfiguration": {"awsvpcConfiguration": {
+                "subnets": ["s-2", "s-1"], "securityGroups": ["sg-1"], "assignPublicIp": "ENABLED",
+            }},
+            "loadBalancers": [], "deployments": [{"status": "PRIMARY"}],
+        }
+        service.update(overrides)
+        return service
+
+    def _deploy(self, ecs_client, task_definition_arn):
+        import aws.ecs as ecs
+        ecs.create_or_update_service(ecs_client, "c", "svc", task_definition_arn, 1, True, ["s-1", "s-2"], "sg-1")
+
+    def test_settled_service_with_same_config_is_not_updated(self):
+        ecs_client = MagicMock()
+        ecs_client.describe_services.return_value = {"services": [self._service()]}
+        self._deploy(ecs_client, "arn:td:1")
+        ecs_client.update_service.assert_not_called()
+
+    def test_new_task_definition_updates_without_forcing(self):
+        ecs_client = MagicMock()
+        ecs_client.describe_services.return_value = {"services": [self._service()]}
+        self._deploy(ecs_client, "arn:td:2")
+        assert ecs_client.update_service.call_args.kwargs["forceNewDeployment"] is False
+        # Same revision but tasks not all running: redeploy it
+        ecs_client.describe_services.return_value = {"services": [self._service(runningCount=0)]}
+        self._deploy(ecs_client, "arn:td:1")
+        assert ecs_client.update_service.call_args.kwargs["forceNewDeployment"] is True
+
+
+class TestPackageImports:
+    """Tests for the lazy exports of the aws package."""
+
+    def test_fix_cloudfront_help_does_not_load_boto3(self):
+        import subprocess
+        code = (
+            "import runpy, sys\n"
+            "sys.argv = ['fix_cloudfront', '--help']\n"
+            "try:\n"
+            "    runpy.run_module('aws.fix_cloudfront', run_name='__main__')\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print('boto3' in sys.modules)\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=_repo_root,
+                                capture_output=True, text=True, check=True)
+        assert result.stdout.strip().endswith("False")
+
+    def test_exports_resolve_on_first_use(self):
+        import aws
+        assert aws.deploy_to_fargate is aws_deploy.deploy_to_fargate
+        assert aws.ConfigError is aws_config.ConfigError
+        with pytest.raises(AttributeError):
+            aws.not_exported
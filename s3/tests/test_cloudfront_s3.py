@@ -2,6 +2,7 @@
 import os
 import sys
 import pytest
+from unittest.mock import patch
 
 _repo_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if _repo_root not in sys.path:
@@ -54,6 +55,27 @@ class TestCreateCloudfrontDistributionForS3:
         assert cf_domain1 == cf_domain2
         assert len(client.state["distributions"]) == 1
 
+    def test_existing_distribution_found_without_listing_on_later_runs(self):
+        from aws import cloudfront
+        client = MockCloudFrontClient()
+        cloudfront_s3.create_cloudfront_distribution_for_s3(
+            client, "my-bucket", "us-east-1", "app.example.com", "us-east-1",
+            allow_create=True, certificate_arn=None
+        )
+        # First lookup lists distributions and records the alias on disk
+        _, cf_id = cloudfront_s3.create_cloudfront_distribution_for_s3(
+            client, "my-bucket", "us-east-1", "app.example.com", "us-east-1",
+            allow_create=False, certificate_arn=None
+        )
+        # A new process starts with an empty in-memory cache
+        cloudfront._invalidate_distribution_cache()
+        with patch.object(client, "get_paginator", side_effect=AssertionError("listing not expected")):
+            _, cf_id_again = cloudfront_s3.create_cloudfront_distribution_for_s3(
+                client, "my-bucket", "us-east-1", "app.example.com", "us-east-1",
+                allow_create=False, certificate_arn=None
+            )
+        assert cf_id_again == cf_id
+
     def test_no_existing_dist_allow_create_false_exits(self):
         client = MockCloudFrontClient()
         with pytest.raises(SystemExit):
@@ -46,7 +46,7 @@ class TestDeployToS3Validation:
             with open(os.path.join(d, "index.html"), "w") as f:
                 f.write("<html></html>")
             mock_session = MockSession()
-            with patch("s3.deploy.boto3.Session", return_value=mock_session):
+            with patch("aws.clients.get_session", return_value=mock_session):
                 deploy.deploy_to_s3(
                     config_dict={"app_name": "from_dict"},
                     region="us-east-1",
@@ -59,7 +59,7 @@ class TestDeployToS3Validation:
         with tempfile.TemporaryDirectory() as d:
             with open(os.path.join(d, "index.html"), "w") as f:
                 f.write("<html></html>")
-            with patch("s3.deploy.boto3.Session", return_value=MockSession()):
+            with patch("aws.clients.get_session", return_value=MockSession()):
                 with pytest.raises(SystemExit):
                     deploy.deploy_to_s3(
                         app_name="myapp",
@@ -73,7 +73,7 @@ class TestDeployToS3Validation:
         with tempfile.TemporaryDirectory() as d:
             with open(os.path.join(d, "index.html"), "w") as f:
                 f.write("<html></html>")
-            with patch("s3.deploy.boto3.Session", return_value=MockSession()):
+            with patch("aws.clients.get_session", return_value=MockSession()):
                 with pytest.raises(SystemExit):
                     deploy.deploy_to_s3(
                         app_name="myapp",
@@ -87,7 +87,7 @@ class TestDeployToS3Validation:
         with tempfile.TemporaryDirectory() as d:
             with open(os.path.join(d, "index.html"), "w") as f:
                 f.write("<html></html>")
-            with patch("s3.deploy.boto3.Session", return_value=MockSession()):
+            with patch("aws.clients.get_session", return_value=MockSession()):
                 with pytest.raises(SystemExit):
                     deploy.deploy_to_s3(
                         app_name="myapp",
@@ -101,7 +101,7 @@ class TestDeployToS3Validation:
         with tempfile.TemporaryDirectory() as d:
             with open(os.path.join(d, "index.html"), "w") as f:
                 f.write("<html></html>")
-            with patch("s3.deploy.boto3.Session", return_value=MockSession()):
+            with patch("aws.clients.get_session", return_value=MockSession()):
                 with pytest.raises(SystemExit):
                     deploy.deploy_to_s3(
                         app_name="myapp",
@@ -120,7 +120,7 @@ class TestDeployToS3S3Only:
             with open(os.path.join(d, "index.html"), "w") as f:
                 f.write("<html></html>")
             mock_session = MockSession()
-            with patch("s3.deploy.boto3.Session", return_value=mock_session):
+            with patch("aws.clients.get_session", return_value=mock_session):
                 deploy.deploy_to_s3(
                     app_name="myapp",
                     region="us-east-1",
@@ -139,7 +139,7 @@ class TestDeployToS3S3Only:
             with open(os.path.join(d, "index.html"), "w") as f:
                 f.write("<html></html>")
             mock_session = MockSession()
-            with patch("s3.deploy.boto3.Session", return_value=mock_session):
+            with patch("aws.clients.get_session", return_value=mock_session):
                 deploy.deploy_to_s3(
                     app_name="MyApp",
                     region="us-east-1",
@@ -154,7 +154,7 @@ class TestDeployToS3S3Only:
             with open(os.path.join(d, "index.html"), "w") as f:
                 f.write("<html></html>")
             mock_session = MockSession()
-            with patch("s3.deploy.boto3.Session", return_value=mock_session):
+            with patch("aws.clients.get_session", return_value=mock_session):
                 deploy.deploy_to_s3(
                     app_name="myapp",
                     region="us-east-1",
@@ -171,7 +171,7 @@ class TestDeployToS3S3Only:
                 f.write("<html></html>")
             mock_session = MockSession()
             # No bucket pre-created; allow_create=False
-            with patch("s3.deploy.boto3.Session", return_value=mock_session):
+            with patch("aws.clients.get_session", return_value=mock_session):
                 with pytest.raises(SystemExit):
                     deploy.deploy_to_s3(
                         app_name="myapp",
@@ -194,7 +194,7 @@ class TestDeployToS3WithPublicDomain:
             mock_session.seed_route53_hosted_zone("/hostedzone/Z123", "example.com")
             cert_arn = "arn:aws:acm:us-east-1:123456789012:certificate/cert-123"
             mock_session.seed_acm_certificate(cert_arn, "app.example.com", status="ISSUED")
-            with patch("s3.deploy.boto3.Session", return_value=mock_session):
+            with patch("aws.clients.get_session", return_value=mock_session):
                 deploy.deploy_to_s3(
                     app_name="myapp",
                     region="us-east-1",
@@ -215,7 +215,7 @@ class TestDeployToS3WithPublicDomain:
             mock_session = MockSession()
             mock_session.seed_route53_hosted_zone("/hostedzone/Z123", "example.com")
             # No certificate_id -> request_certificate path; no cert pre-seeded
-            with patch("s3.deploy.boto3.Session", return_value=mock_session):
+            with patch("aws.clients.get_session", return_value=mock_session):
                 deploy.deploy_to_s3(
                     app_name="myapp",
                     region="us-east-1",
@@ -236,7 +236,7 @@ class TestDeployToS3BucketNameGeneration:
             with open(os.path.join(d, "index.html"), "w") as f:
                 f.write("<html></html>")
             mock_session = MockSession()
-            with patch("s3.deploy.boto3.Session", return_value=mock_session):
+            with patch("aws.clients.get_session", return_value=mock_session):
                 deploy.deploy_to_s3(
                     app_name="my_app_name",
                     region="us-east-1",